@@ -6,27 +6,63 @@ En Sitios webs con integración para Telegram (User-Side)
 
 import hashlib
 import imagehash
+import numpy as np
 from PIL import Image
 import requests
 from io import BytesIO
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 import json
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Set
 import argparse
 import sys
 import os
 import asyncio
-import logging
+import math
+import re
+import codecs
+import threading
+import multiprocessing
+import sqlite3
+import mmap
+import csv
+import tarfile
+import zipfile
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from queue import SimpleQueue
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.robotparser import RobotFileParser
+from requests.adapters import HTTPAdapter
 
 # ============================================================================
 # CONFIGURACIÓN DE TELEGRAM
 # ============================================================================
 try:
-    from telethon import TelegramClient, events
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    from telethon import TelegramClient, events, utils
     from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
-    from telethon.tl.functions.messages import GetHistoryRequest
+    from telethon.errors import FloodWaitError
     TELETHON_AVAILABLE = True
 except ImportError:
     TELETHON_AVAILABLE = False
@@ -106,6 +142,23 @@ class TelegramLoopManager:
             return future.result()
         else:
             return loop.run_until_complete(coro)
+    
+    @classmethod
+    def run_until_interrupted(cls, coro):
+        """
+        Como run_async, pero ante Ctrl+C cancela la corrutina y espera a que
+        termine, para que sus bloques finally (limpieza, exportación) se ejecuten
+        """
+        loop = cls.get_loop()
+        if loop.is_running():
+            return cls.run_async(coro)
+        task = loop.create_task(coro)
+        try:
+            return loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+            raise
 
 # ============================================================================
 # FUNCIONES DE DISPLAY
@@ -148,34 +201,2068 @@ def print_telegram(message: str):
     """Imprime mensaje relacionado con Telegram"""
     print(f"{Colors.BLUE}📱 {message}{Colors.ENDC}")
 
+# ============================================================================
+# DESCARGAS HTTP CONCURRENTES
+# ============================================================================
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class HostRateLimiter:
+    """
+    Limita las conexiones simultáneas y la frecuencia de peticiones por host.
+    Reemplaza la pausa fija entre imágenes: hosts distintos no se esperan entre sí.
+    """
+    def __init__(self, max_connections: int = 4, requests_per_second: float = 10.0):
+        self.max_connections = max(1, max_connections)
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._async_semaphores = {}
+        self._next_slot = {}
+        self._host_intervals = {}
+
+    def set_host_interval(self, host: str, seconds: float):
+        """Espaciado mínimo propio de un host (p. ej. Crawl-delay de robots.txt)"""
+        with self._lock:
+            self._host_intervals[host.lower()] = seconds
+
+    def _reserve(self, host: str) -> float:
+        """Reserva el próximo turno del host y devuelve cuánto hay que esperar"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = start + max(self.min_interval, self._host_intervals.get(host, 0.0))
+        return start - now
+
+    @contextmanager
+    def slot(self, url: str):
+        """Reserva una conexión para el host de la URL respetando su ritmo"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.max_connections)
+        semaphore.acquire()
+        try:
+            delay = self._reserve(host)
+            if delay > 0:
+                time.sleep(delay)
+            yield
+        finally:
+            semaphore.release()
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """Versión asíncrona de slot() para el escáner sobre el event loop"""
+        host = urlparse(url).netloc.lower()
+        semaphore = self._async_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._async_semaphores[host] = asyncio.Semaphore(self.max_connections)
+        async with semaphore:
+            delay = self._reserve(host)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+
+def create_http_session(pool_size: int = 10) -> requests.Session:
+    """Crea una sesión HTTP con keep-alive y pool de conexiones compartido"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = DEFAULT_USER_AGENT
+    return session
+
+def content_type_charset(content_type: str):
+    """Charset declarado en una cabecera Content-Type, o None"""
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+# ============================================================================
+# EXTRACCIÓN DE IMÁGENES DE HTML EN STREAMING
+# ============================================================================
+# Formatos a ignorar que saturan el output o son incompatibles
+IGNORED_EXTENSIONS = ('.svg', '.gif', '.ico', '.pdf', '.js', '.css')
+
+# Declaraciones background/background-image de CSS y las url(...) que contienen
+CSS_BACKGROUND_RE = re.compile(r'background(?:-image)?\s*:([^;}]*)', re.IGNORECASE)
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)', re.IGNORECASE)
+
+def best_srcset_candidate(srcset: str) -> str:
+    """URL de mayor resolución (descriptor w o x) de un atributo srcset, o ''"""
+    best, best_size = '', -1.0
+    for candidate in srcset.split(','):
+        parts = candidate.split()
+        if not parts:
+            continue
+        size = 0.0
+        if len(parts) > 1 and parts[1][-1:].lower() in ('w', 'x'):
+            try:
+                size = float(parts[1][:-1])
+            except ValueError:
+                pass
+        if size > best_size:
+            best, best_size = parts[0], size
+    return best
+
+class _StreamingHTMLParser(HTMLParser):
+    """Adaptador de html.parser (librería estándar) para ImageURLExtractor"""
+    def __init__(self, extractor):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+        self._style = None
+
+    def handle_starttag(self, tag, attrs):
+        self.extractor._start(tag, {name: value or '' for name, value in attrs})
+        if tag == 'style':
+            self._style = []
+
+    def handle_endtag(self, tag):
+        if tag == 'style' and self._style is not None:
+            self.extractor._add_css(''.join(self._style))
+            self._style = None
+        self.extractor._end(tag)
+
+    def handle_data(self, data):
+        if self._style is not None:
+            self._style.append(data)
+
+class ImageURLExtractor:
+    """
+    Extrae las URLs de imágenes de un HTML que llega por bloques, sin construir el
+    árbol de la página: <img> (src, data-src, srcset, data-srcset), <source> dentro
+    de <picture>, background-image en atributos style y bloques <style>, respetando
+    <base href>. feed() devuelve las imágenes nuevas [(índice, URL absoluta)] en
+    cuanto aparecen. Usa el parser incremental de lxml si está instalado
+    (descartando los nodos ya procesados) y si no html.parser.
+    """
+    def __init__(self, page_url: str, encoding: str = None, collect_links: bool = False):
+        self.base_url = page_url
+        self.count = 0
+        # Enlaces <a>/<area> (sin fragmento) para el crawler; se recogen con take_links()
+        self.collect_links = collect_links
+        self._links = []
+        self._base_seen = False
+        self._picture_depth = 0
+        self._seen = set()
+        self._new = []
+        self._decoder = None
+        self._parser = None
+        if LXML_AVAILABLE:
+            try:
+                self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+            except LookupError:
+                self._parser = etree.HTMLPullParser(events=('start', 'end'))
+        else:
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+            except LookupError:
+                self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            self._parser = _StreamingHTMLParser(self)
+
+    def feed(self, chunk: bytes) -> List[tuple]:
+        """Procesa un bloque del cuerpo y devuelve las imágenes encontradas en él"""
+        if self._decoder is None:
+            self._parser.feed(chunk)
+            self._read_lxml_events()
+        else:
+            self._parser.feed(self._decoder.decode(chunk))
+        return self._take()
+
+    def close(self) -> List[tuple]:
+        """Termina el documento y devuelve las imágenes que quedaban pendientes"""
+        if self._decoder is None:
+            try:
+                self._parser.close()
+            except etree.LxmlError:
+                pass  # documento vacío o truncado: se conserva lo ya extraído
+            self._read_lxml_events()
+        else:
+            self._parser.feed(self._decoder.decode(b'', final=True))
+            self._parser.close()
+        return self._take()
+
+    def _take(self) -> List[tuple]:
+        new, self._new = self._new, []
+        return new
+
+    def take_links(self) -> List[str]:
+        """Devuelve los enlaces encontrados desde la última llamada"""
+        links, self._links = self._links, []
+        return links
+
+    def _read_lxml_events(self):
+        for event, element in self._parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if event == 'start':
+                self._start(tag.lower(), element.attrib)
+                continue
+            if tag.lower() == 'style' and element.text:
+                self._add_css(element.text)
+            self._end(tag.lower())
+            # Liberar el nodo ya procesado y sus hermanos anteriores
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def _start(self, tag: str, attrs):
+        if tag == 'base' and not self._base_seen and attrs.get('href'):
+            self._base_seen = True
+            self.base_url = urljoin(self.base_url, attrs.get('href').strip())
+        elif tag == 'picture':
+            self._picture_depth += 1
+        elif tag == 'img':
+            # La primera fuente utilizable (src suele ser un marcador en lazy-loading)
+            for value in (attrs.get('src'), attrs.get('data-src'),
+                          best_srcset_candidate(attrs.get('srcset') or ''),
+                          best_srcset_candidate(attrs.get('data-srcset') or '')):
+                if self._add(value):
+                    break
+        elif tag == 'source' and self._picture_depth:
+            self._add(best_srcset_candidate(attrs.get('srcset') or attrs.get('data-srcset') or '')
+                      or attrs.get('src'))
+        elif tag in ('a', 'area') and self.collect_links and attrs.get('href'):
+            if 'nofollow' not in (attrs.get('rel') or '').lower():
+                link = urldefrag(urljoin(self.base_url, attrs.get('href').strip()))[0]
+                if urlparse(link).scheme in ('http', 'https'):
+                    self._links.append(link)
+        style = attrs.get('style')
+        if style:
+            self._add_css(style)
+
+    def _end(self, tag: str):
+        if tag == 'picture' and self._picture_depth:
+            self._picture_depth -= 1
+
+    def _add_css(self, css: str):
+        for declaration in CSS_BACKGROUND_RE.finditer(css):
+            for url_match in CSS_URL_RE.finditer(declaration.group(1)):
+                self._add(url_match.group(2))
+
+    def _add(self, value) -> bool:
+        """Registra una URL de imagen; False si no es una URL http(s) utilizable"""
+        value = (value or '').strip()
+        if not value or value.startswith('data:'):
+            return False
+        image_url = urljoin(self.base_url, value)
+        if urlparse(image_url).scheme not in ('http', 'https'):
+            return False
+        if image_url not in self._seen:
+            self._seen.add(image_url)
+            self.count += 1
+            self._new.append((self.count, image_url))
+        return True
+
+# ============================================================================
+# RASTREO WEB (CRAWLER)
+# ============================================================================
+# Enlaces que no se encolan como páginas (recursos que no son HTML)
+CRAWL_SKIPPED_EXTENSIONS = IGNORED_EXTENSIONS + (
+    '.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.avif', '.mp4', '.webm', '.mp3',
+    '.zip', '.rar', '.gz', '.tar', '.7z', '.exe', '.dmg', '.apk', '.doc', '.docx', '.xls', '.xlsx',
+    '.woff', '.woff2', '.ttf', '.xml', '.json', '.rss')
+
+def normalize_url(url: str) -> str:
+    """Forma canónica de una URL para deduplicar: sin fragmento, host en minúsculas y sin puerto por defecto"""
+    parsed = urlparse(urldefrag(url)[0])
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    return parsed._replace(scheme=scheme, netloc=netloc, path=parsed.path or '/').geturl()
+
+class BloomFilter:
+    """
+    Conjunto probabilístico de tamaño fijo: sin falsos negativos y con una tasa de
+    falsos positivos cercana a error_rate mientras no se superen capacity elementos
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Añade el elemento; devuelve False si (probablemente) ya estaba"""
+        new = False
+        for p in self._positions(item):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+class SeenSet:
+    """
+    URLs ya vistas por el crawler: un set exacto mientras es pequeño, que pasa a un
+    filtro de Bloom de bloom_capacity elementos al superar exact_limit para que la
+    memoria no crezca con el rastreo
+    """
+    def __init__(self, exact_limit: int = 100000, bloom_capacity: int = 10000000):
+        self.exact_limit = exact_limit
+        self.bloom_capacity = bloom_capacity
+        self._items = set()
+
+    @property
+    def probabilistic(self) -> bool:
+        return isinstance(self._items, BloomFilter)
+
+    def __len__(self) -> int:
+        return self._items.count if self.probabilistic else len(self._items)
+
+    def add(self, item: str) -> bool:
+        """Añade la URL; devuelve False si ya se había visto"""
+        if self.probabilistic:
+            return self._items.add(item)
+        if item in self._items:
+            return False
+        self._items.add(item)
+        if len(self._items) > self.exact_limit:
+            bloom = BloomFilter(max(self.bloom_capacity, 2 * self.exact_limit))
+            for seen in self._items:
+                bloom.add(seen)
+            self._items = bloom
+        return True
+
+class RobotsPolicy:
+    """
+    Caché de robots.txt por host para el crawler asíncrono. Si el robots.txt no
+    existe o no se puede leer, se permite todo. El Crawl-delay se aplica al
+    limitador de ritmo por host.
+    """
+    def __init__(self, user_agent: str, rate_limiter: "HostRateLimiter"):
+        self.user_agent = user_agent
+        self.rate_limiter = rate_limiter
+        self._parsers = {}
+
+    async def allowed(self, session, url: str) -> bool:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        parser = self._parsers.get(origin)
+        if parser is None:
+            parser = self._parsers[origin] = asyncio.ensure_future(self._fetch(session, origin))
+        robots = await parser
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    async def _fetch(self, session, origin: str):
+        robots_url = f"{origin}/robots.txt"
+        try:
+            async with self.rate_limiter.async_slot(robots_url):
+                async with session.get(robots_url) as response:
+                    if response.status >= 400:
+                        return None
+                    text = await response.text(errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        robots = RobotFileParser(robots_url)
+        robots.parse(text.splitlines())
+        delay = robots.crawl_delay(self.user_agent)
+        if delay:
+            self.rate_limiter.set_host_interval(urlparse(origin).netloc, float(delay))
+        return robots
+
+# ============================================================================
+# MOTOR DE HASHING
+# ============================================================================
+# Lado del buffer compartido en escala de grises del que se derivan los cuatro
+# hashes perceptuales en modo reducido (--fast-hashing). Frente a imagehash sobre
+# la imagen completa la mayoría coinciden, pero en JPEG con textura o poco
+# contraste llegan a diferir en ~12 bits de pHash y ~20 de aHash (dHash ~7,
+# wHash ~4), más que el umbral por defecto (5); por eso no es el modo por defecto
+# y con él conviene subir --threshold.
+HASH_WORK_SIZE = 256
+
+HASH_FUNCTIONS = {
+    "ahash": imagehash.average_hash,
+    "phash": imagehash.phash,
+    "dhash": imagehash.dhash,
+    "whash": imagehash.whash,
+}
+
+def compute_perceptual_hashes(img: Image.Image, reduced: bool = False, hash_types=None) -> Dict[str, str]:
+    """
+    Calcula aHash, pHash, dHash y wHash decodificando y pasando a grises una sola vez.
+    Con reduced=False (por defecto) el resultado es idéntico bit a bit a llamar a
+    imagehash sobre la imagen original; con reduced=True los JPEG se decodifican a
+    tamaño reducido con draft() y la imagen se escala una sola vez a HASH_WORK_SIZE,
+    mucho más rápido pero con los bits de diferencia indicados en HASH_WORK_SIZE.
+    Si se indica hash_types solo se calculan esos tipos (sin ninguno no se decodifica).
+    """
+    selected = [t for t in HASH_FUNCTIONS if hash_types is None or t in hash_types]
+    if not selected:
+        return {}
+
+    reduce_to = None
+    if reduced and min(img.size) > HASH_WORK_SIZE:
+        reduce_to = HASH_WORK_SIZE
+        if img.format == 'JPEG':
+            img.draft('L', (HASH_WORK_SIZE, HASH_WORK_SIZE))
+
+    gray = img.convert('L')
+    if reduce_to:
+        gray = gray.resize((reduce_to, reduce_to), Image.LANCZOS)
+
+    return {hash_type: str(HASH_FUNCTIONS[hash_type](gray)) for hash_type in selected}
+
+class ImageRejected(ValueError):
+    """
+    Imagen descartada sin decodificarla (o cuya decodificación se abortó). kind es
+    la categoría que se cuenta en las estadísticas: "not_image", "too_large",
+    "too_many_pixels", "too_many_frames", "too_large_decoded", "timeout",
+    "memory" o "crashed".
+    """
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+    def __reduce__(self):
+        # Para que viaje intacta desde los procesos de HashingExecutor
+        return type(self), (self.kind, str(self))
+
+def decoded_pixel_bytes(mode: str) -> int:
+    """Bytes por píxel que ocupa en memoria una imagen de Pillow en ese modo"""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+def check_decode_limits(img: Image.Image, reduced: bool = False, max_pixels: int = 0, max_frames: int = 0,
+                        max_decoded_bytes: int = 0):
+    """
+    Comprueba con la cabecera, antes de decodificar, los píxeles, los fotogramas y
+    la memoria que ocuparía el fotograma decodificado (con la reducción por draft()
+    de los JPEG si reduced). Lanza ImageRejected si se supera algún límite (0 = sin límite).
+    """
+    width, height = img.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageRejected("too_many_pixels", f"{width}x{height} píxeles (límite {max_pixels})")
+    if max_frames:
+        frames = getattr(img, 'n_frames', 1)
+        if frames > max_frames:
+            raise ImageRejected("too_many_frames", f"{frames} fotogramas (límite {max_frames})")
+    if max_decoded_bytes:
+        pixel_bytes = decoded_pixel_bytes(img.mode)
+        if reduced and img.format == 'JPEG' and min(width, height) > HASH_WORK_SIZE:
+            # draft() decodifica a 1/2, 1/4 o 1/8 y en grises (salvo CMYK)
+            ratio = min(width // HASH_WORK_SIZE, height // HASH_WORK_SIZE)
+            scale = next(factor for factor in (8, 4, 2, 1) if ratio >= factor)
+            width, height = -(-width // scale), -(-height // scale)
+            if img.mode in ('L', 'RGB', 'YCbCr'):
+                pixel_bytes = 1
+        decoded = width * height * pixel_bytes
+        if decoded > max_decoded_bytes:
+            raise ImageRejected("too_large_decoded", f"{decoded} bytes decodificados (límite {max_decoded_bytes})")
+
+def open_image_limited(image_data: bytes, reduced: bool = False, limits: Dict = None) -> Image.Image:
+    """Abre una imagen (solo cabecera) y aplica check_decode_limits con limits"""
+    try:
+        img = Image.open(BytesIO(image_data))
+    except Image.DecompressionBombError as e:
+        raise ImageRejected("too_many_pixels", str(e))
+    if limits:
+        check_decode_limits(img, reduced, **limits)
+    return img
+
+def hash_image_bytes(image_data: bytes, hash_types: List[str] = None, reduced: bool = False,
+                     limits: Dict = None) -> Dict[str, str]:
+    """
+    Calcula los hashes perceptuales de una imagen en bytes, rechazando antes de
+    decodificar las que superan limits (ver check_decode_limits).
+    Función de módulo para poder ejecutarse en los procesos de HashingExecutor.
+    """
+    try:
+        return compute_perceptual_hashes(open_image_limited(image_data, reduced, limits),
+                                         reduced=reduced, hash_types=hash_types)
+    except MemoryError:
+        raise ImageRejected("memory", "memoria insuficiente al decodificar")
+
+def hash_target_bytes(image_data: bytes, limits: Dict = None) -> Dict[str, str]:
+    """
+    Hashes completos de una imagen objetivo (MD5 + perceptuales sin reducción),
+    igual que add_target_hash. Se ejecuta en los procesos de HashingExecutor.
+    """
+    hashes = {"md5": hashlib.md5(image_data).hexdigest()}
+    try:
+        hashes.update(compute_perceptual_hashes(open_image_limited(image_data, False, limits), reduced=False))
+    except MemoryError:
+        raise ImageRejected("memory", "memoria insuficiente al decodificar")
+    return hashes
+
+def _limit_worker_memory(extra_bytes: int):
+    """
+    Inicializador de los procesos de hashing: limita su espacio de direcciones a
+    lo que ya usan más extra_bytes, para que una imagen patológica produzca un
+    MemoryError en el proceso en lugar de llevar el sistema al swap
+    """
+    if not RESOURCE_AVAILABLE or not extra_bytes:
+        return
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * mmap.PAGESIZE
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = current + extra_bytes
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (OSError, ValueError):
+        pass  # sin /proc (no Linux) o límite no permitido: se sigue sin tope
+
+# Bytes máximos que se leen buscando una cabecera de imagen reconocible, salvo que
+# el archivo empiece con la firma de un formato conocido (p. ej. un JPEG con EXIF o
+# perfil ICC grandes antes de las dimensiones), que se lee hasta el límite de bytes
+IMAGE_SNIFF_BYTES = 64 * 1024
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'II*\x00', b'MM\x00*', b'BM')
+
+def sniff_image_header(data: bytes, complete: bool = False, max_pixels: int = 0) -> tuple:
+    """
+    Identifica formato y dimensiones leyendo solo la cabecera (Image.open no
+    decodifica los píxeles). Devuelve (formato, (ancho, alto)), o None si hacen
+    falta más bytes; lanza ImageRejected si no es una imagen o tiene más de
+    max_pixels píxeles.
+    """
+    if data.lstrip()[:1] in (b'<', b'{', b'['):
+        raise ImageRejected("not_image", "el contenido es texto (HTML/XML/JSON), no una imagen")
+    try:
+        with Image.open(BytesIO(data)) as img:
+            image_format, size = img.format, img.size
+    except Image.DecompressionBombError as e:
+        raise ImageRejected("too_many_pixels", str(e))
+    except Exception:
+        known = data.startswith(IMAGE_SIGNATURES) or (data[:4] == b'RIFF' and data[8:12] == b'WEBP')
+        if complete or (len(data) >= IMAGE_SNIFF_BYTES and not known):
+            raise ImageRejected("not_image", "formato de imagen no reconocido")
+        return None
+    if max_pixels and size[0] * size[1] > max_pixels:
+        raise ImageRejected("too_many_pixels", f"{size[0]}x{size[1]} píxeles (límite {max_pixels})")
+    return image_format, size
+
+class LimitedImageBody:
+    """
+    Acumula el cuerpo de una descarga de imagen por bloques y lo corta en cuanto
+    se sabe que no sirve: Content-Length o bytes leídos por encima de max_bytes,
+    o una cabecera que no es de imagen o tiene demasiados píxeles (ImageRejected).
+    """
+    def __init__(self, max_bytes: int = 0, max_pixels: int = 0, content_length=None):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.header = None
+        self._data = bytearray()
+        try:
+            declared = int(content_length) if content_length is not None else None
+        except ValueError:
+            declared = None
+        if max_bytes and declared is not None and declared > max_bytes:
+            raise ImageRejected("too_large", f"{declared} bytes declarados (límite {max_bytes})")
+
+    def add(self, chunk: bytes):
+        self._data.extend(chunk)
+        if self.max_bytes and len(self._data) > self.max_bytes:
+            raise ImageRejected("too_large", f"más de {self.max_bytes} bytes")
+        if self.header is None:
+            self.header = sniff_image_header(self._data, max_pixels=self.max_pixels)
+
+    def finish(self) -> bytes:
+        """Cuerpo completo, tras comprobar la cabecera si aún no se había podido"""
+        if self.header is None:
+            self.header = sniff_image_header(self._data, complete=True, max_pixels=self.max_pixels)
+        return bytes(self._data)
+
+def _hash_worker_main(connection, memory_limit: int):
+    """
+    Bucle de un proceso de HashingExecutor: recibe (fn, args) por la tubería,
+    responde (True, resultado) o (False, excepción) y termina con None
+    """
+    _limit_worker_memory(memory_limit)
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            connection.send(reply)
+        except OSError:
+            return
+        except Exception as e:
+            # Resultado o excepción que no se puede serializar
+            connection.send((False, RuntimeError(repr(e))))
+
+class HashingExecutor:
+    """
+    Ejecuta el hashing perceptual (CPU) en procesos aparte para no bloquear el
+    event loop de Telegram ni los hilos de descarga, y usar varios núcleos. Con
+    workers=0 hashea en el hilo que llama.
+    limits (max_pixels, max_frames, max_decoded_bytes) se comprueban antes de
+    decodificar cada imagen. Como sandbox opcional, memory_limit limita la memoria
+    extra de cada proceso y timeout aborta una decodificación colgada; ambos
+    necesitan procesos, así que fuerzan al menos uno.
+    Cada proceso tiene un hilo que le pasa los trabajos de uno en uno: el timeout
+    cuenta desde que el proceso empieza el trabajo (no mientras espera en la cola)
+    y, si se agota o el proceso muere, solo se reemplaza ese proceso.
+    """
+    def __init__(self, workers: int = 0, limits: Dict = None, memory_limit: int = 0, timeout: float = 0.0):
+        self.limits = limits or None
+        self.memory_limit = max(0, memory_limit)
+        self.timeout = max(0.0, timeout)
+        self.workers = max(0, workers)
+        if (self.memory_limit or self.timeout) and not self.workers:
+            self.workers = 1
+        self._jobs = SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start_workers(self):
+        """Arranca los hilos de los procesos la primera vez que se usan (o tras shutdown)"""
+        if len(self._threads) < self.workers:
+            with self._lock:
+                while len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._serve, daemon=True,
+                                              name=f"hashing-{len(self._threads)}")
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _spawn(self) -> tuple:
+        """
+        Proceso de hashing nuevo con el límite de memoria del sandbox. Se crean de a
+        uno para que ningún proceso herede el extremo de la tubería de otro (si no,
+        la muerte de ese otro no se detectaría)
+        """
+        with self._lock:
+            connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_hash_worker_main, args=(child_connection, self.memory_limit),
+                                              daemon=True)
+            process.start()
+            child_connection.close()
+        return process, connection
+
+    @staticmethod
+    def _kill(process, connection):
+        """Mata un proceso de hashing colgado o roto"""
+        process.kill()
+        process.join()
+        connection.close()
+
+    def _serve(self):
+        """
+        Hilo dueño de un proceso de hashing: le pasa los trabajos de la cola de uno
+        en uno y lo reemplaza si supera el timeout o muere a mitad de un trabajo
+        """
+        process = connection = None
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            job, fn, args = item
+            if not job.set_running_or_notify_cancel():
+                continue  # cancelado mientras esperaba en la cola
+            if process is None:
+                process, connection = self._spawn()
+            try:
+                connection.send((fn, args))
+                if connection.poll(self.timeout or None):
+                    ok, value = connection.recv()
+                else:
+                    self._kill(process, connection)
+                    process = None
+                    ok, value = False, ImageRejected("timeout", f"la decodificación superó {self.timeout:g}s")
+            except (EOFError, OSError):
+                self._kill(process, connection)
+                process = None
+                ok, value = False, ImageRejected("crashed", "el proceso de decodificación terminó de forma anómala")
+            except Exception as e:
+                ok, value = False, e  # argumentos o resultado que no se pueden serializar
+            if ok:
+                job.set_result(value)
+            else:
+                job.set_exception(value)
+        if process is not None:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join()
+            connection.close()
+
+    def hash(self, image_data: bytes, hash_types: List[str] = None, reduced: bool = False) -> Dict[str, str]:
+        """Hashea de forma bloqueante (desde hilos o código síncrono)"""
+        return self.submit(hash_image_bytes, image_data, hash_types, reduced, self.limits).result()
+
+    def submit(self, fn, *args) -> Future:
+        """
+        Envía una función de módulo a los procesos de hashing; sin procesos la ejecuta
+        en el acto. Si la decodificación supera el timeout o el proceso muere (p. ej.
+        por falta de memoria) el trabajo termina con ImageRejected("timeout") o
+        ImageRejected("crashed"); los demás trabajos siguen en sus procesos.
+        """
+        job = Future()
+        if not self.workers:
+            try:
+                job.set_result(fn(*args))
+            except Exception as e:
+                job.set_exception(e)
+            return job
+        self._start_workers()
+        self._jobs.put((job, fn, args))
+        return job
+
+    async def hash_async(self, image_data: bytes, hash_types: List[str] = None, reduced: bool = False) -> Dict[str, str]:
+        """Hashea fuera del event loop (en los procesos de hashing o en un hilo)"""
+        if not self.workers:
+            return await asyncio.get_running_loop().run_in_executor(None, hash_image_bytes, image_data,
+                                                                    hash_types, reduced, self.limits)
+        return await asyncio.wrap_future(self.submit(hash_image_bytes, image_data, hash_types, reduced, self.limits))
+
+    def shutdown(self):
+        """Detiene los procesos de hashing cuando terminan los trabajos pendientes"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(None)
+        for thread in threads:
+            thread.join()
+
+# ============================================================================
+# ÍNDICE DE HASHES OBJETIVO (BK-TREE)
+# ============================================================================
+HASH_TYPES = ["md5", "phash", "ahash", "dhash", "whash"]
+PERCEPTUAL_HASH_TYPES = ["phash", "ahash", "dhash", "whash"]
+
+def parse_hash(hash_str: str):
+    """
+    Convierte un hash hexadecimal en (valor entero, cantidad de bits).
+    Replica la interpretación de imagehash.hex_to_hash; devuelve None si no es válido.
+    """
+    try:
+        value = int(hash_str, 16)
+    except (TypeError, ValueError):
+        return None
+    hash_size = math.isqrt(len(hash_str) * 4)
+    return value, max(hash_size * hash_size, value.bit_length())
+
+if hasattr(int, "bit_count"):
+    def hamming_distance(value1: int, value2: int) -> int:
+        """Distancia de Hamming entre dos hashes enteros (popcount del XOR)"""
+        return (value1 ^ value2).bit_count()
+else:
+    def hamming_distance(value1: int, value2: int) -> int:
+        """Distancia de Hamming entre dos hashes enteros (popcount del XOR)"""
+        return bin(value1 ^ value2).count('1')
+
+class BKTree:
+    """
+    Árbol BK sobre hashes enteros con distancia de Hamming.
+    Cada nodo es [valor, ids, hijos] donde hijos se indexa por distancia.
+    """
+    def __init__(self):
+        self.root = None
+        self.node_count = 0
+        self.item_count = 0
+
+    def add(self, value: int, item_id: str):
+        """Inserta un valor asociado a un ID"""
+        self.item_count += 1
+        if self.root is None:
+            self.root = [value, {item_id}, {}]
+            self.node_count = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].add(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, {item_id}, {}]
+                self.node_count += 1
+                return
+            node = child
+
+    def remove(self, value: int, item_id: str):
+        """Quita un ID del nodo con el valor indicado (el nodo queda como ruta)"""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item_id in node[1]:
+                    node[1].discard(item_id)
+                    self.item_count -= 1
+                return
+            node = node[2].get(distance)
+
+    def search(self, value: int, threshold: int) -> List[tuple]:
+        """Devuelve [(id, distancia)] de todos los valores a distancia <= threshold"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= threshold:
+                for item_id in node[1]:
+                    results.append((item_id, distance))
+            low, high = distance - threshold, distance + threshold
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+class TargetHashIndex:
+    """
+    Índice en memoria de los hashes objetivo. Mantiene un BK-tree por tipo de
+    hash perceptual (y longitud en bits) y un diccionario para coincidencias
+    exactas (MD5 y valores no hexadecimales). Devuelve los mismos resultados
+    que comparar contra cada objetivo con compare_hashes.
+    """
+    def __init__(self, target_hashes: Dict[str, Dict] = None):
+        self.rebuild(target_hashes or {})
+
+    @classmethod
+    def from_targets(cls, target_hashes: Dict[str, Dict]):
+        """Construye el índice; las subclases pueden aprovechar un snapshot binario"""
+        return cls(target_hashes)
+
+    def rebuild(self, target_hashes: Dict[str, Dict]):
+        """Reconstruye el índice completo desde la base de datos"""
+        self.trees = {}
+        self.exact = {}
+        self.entries = {}
+        self.type_counts = {}
+        self.positions = {}
+        self._next_position = 0
+        for target_id, target_data in target_hashes.items():
+            self.add(target_id, target_data)
+
+    def add(self, target_id: str, target_data: Dict):
+        """Agrega (o reemplaza) los hashes de un objetivo"""
+        if target_id in self.entries:
+            self.remove(target_id, keep_position=True)
+        if target_id not in self.positions:
+            self.positions[target_id] = self._next_position
+            self._next_position += 1
+
+        self.entries[target_id] = self._index_hashes(target_id, target_data.get("hashes") or {})
+
+    def _index_hashes(self, target_id: str, hashes: Dict[str, str]) -> List[tuple]:
+        """Inserta los hashes de un objetivo y devuelve sus entradas (para poder quitarlos)"""
+        entries = []
+        for hash_type, hash_value in hashes.items():
+            if hash_type not in HASH_TYPES:
+                continue
+            self.type_counts[hash_type] = self.type_counts.get(hash_type, 0) + 1
+            parsed = parse_hash(hash_value) if hash_type != "md5" else None
+            if parsed is None:
+                key = (hash_type, hash_value)
+                self.exact.setdefault(key, set()).add(target_id)
+                entries.append((False, key, None))
+            else:
+                value, bits = parsed
+                tree_key = (hash_type, bits)
+                self._store_add(tree_key, value, target_id)
+                entries.append((True, tree_key, value))
+        return entries
+
+    def remove(self, target_id: str, keep_position: bool = False):
+        """Quita un objetivo del índice"""
+        for in_tree, key, value in self.entries.pop(target_id, []):
+            self.type_counts[key[0]] -= 1
+            if in_tree:
+                self._store_remove(key, value, target_id)
+            else:
+                ids = self.exact.get(key)
+                if ids is not None:
+                    ids.discard(target_id)
+                    if not ids:
+                        del self.exact[key]
+        if not keep_position:
+            self.positions.pop(target_id, None)
+
+    def lookup_exact(self, hash_type: str, hash_value: str) -> List[str]:
+        """IDs de los objetivos con ese valor exacto (O(1), p. ej. para MD5)"""
+        return sorted(self._exact_ids((hash_type, hash_value)), key=self.positions.get)
+
+    def _exact_ids(self, key: tuple):
+        """IDs guardados para un valor exacto (tipo, valor)"""
+        return self.exact.get(key, ())
+
+    def hash_types(self) -> List[str]:
+        """Tipos de hash presentes en al menos un objetivo"""
+        return [t for t in HASH_TYPES if self.type_counts.get(t, 0) > 0]
+
+    def _store_add(self, tree_key, value: int, target_id: str):
+        """Inserta un hash entero en la estructura de búsqueda"""
+        self.trees.setdefault(tree_key, BKTree()).add(value, target_id)
+
+    def _store_remove(self, tree_key, value: int, target_id: str):
+        """Quita un hash entero de la estructura de búsqueda"""
+        tree = self.trees[tree_key]
+        tree.remove(value, target_id)
+        # Compactar árboles con demasiados nodos vacíos tras borrados
+        if tree.node_count > 2 * tree.item_count + 64:
+            self._rebuild_tree(tree_key)
+
+    def _rebuild_tree(self, tree_key):
+        """Reconstruye un BK-tree a partir de las entradas vigentes"""
+        tree = BKTree()
+        for target_id, entries in self.entries.items():
+            for in_tree, key, value in entries:
+                if in_tree and key == tree_key:
+                    tree.add(value, target_id)
+        self.trees[tree_key] = tree
+
+    def _search(self, tree_key, queries: List[tuple], threshold: int) -> List[tuple]:
+        """
+        Busca varios hashes enteros a la vez.
+        Recibe [(índice, valor)] y devuelve [(índice, target_id, distancia)].
+        """
+        tree = self.trees.get(tree_key)
+        if tree is None:
+            return []
+        results = []
+        for idx, value in queries:
+            for target_id, distance in tree.search(value, threshold):
+                results.append((idx, target_id, distance))
+        return results
+
+    def query(self, image_hashes: Dict[str, str], threshold: int) -> List[tuple]:
+        """
+        Busca los objetivos que coinciden con los hashes de una imagen.
+        Devuelve [(target_id, {hash_type: distancia})] en el orden de la base de datos.
+        """
+        return self.query_batch([image_hashes], threshold)[0]
+
+    def query_batch(self, batch: List[Dict[str, str]], threshold: int) -> List[List[tuple]]:
+        """Igual que query() pero para un lote de imágenes; devuelve una lista por imagen"""
+        hits = [{} for _ in batch]
+        for hash_type in HASH_TYPES:
+            pending = {}
+            for idx, image_hashes in enumerate(batch):
+                image_value = image_hashes.get(hash_type)
+                if image_value is None:
+                    continue
+                parsed = parse_hash(image_value) if hash_type != "md5" else None
+                if parsed is None:
+                    for target_id in self._exact_ids((hash_type, image_value)):
+                        hits[idx].setdefault(target_id, {})[hash_type] = 0
+                else:
+                    value, bits = parsed
+                    pending.setdefault((hash_type, bits), []).append((idx, value))
+            for tree_key, queries in pending.items():
+                for idx, target_id, distance in self._search(tree_key, queries, threshold):
+                    hits[idx].setdefault(target_id, {})[hash_type] = distance
+        return [sorted(image_hits.items(), key=lambda item: self.positions[item[0]])
+                for image_hits in hits]
+
+def _popcount_uint8_table():
+    """Tabla de bits encendidos para cada valor de un byte"""
+    return np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+_POPCOUNT_TABLE = _popcount_uint8_table()
+
+def popcount_uint64(values):
+    """Popcount elemento a elemento de un array uint64"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+class _HashColumn:
+    """Hashes de un tipo en un array uint64 contiguo, con sus target_ids"""
+    def __init__(self):
+        self.ids = []
+        self.pending = []
+        self.values = np.zeros(0, dtype=np.uint64)
+        self.dirty = False
+
+    def add(self, value: int, target_id: str):
+        self.ids.append(target_id)
+        self.pending.append(value)
+        self.dirty = True
+
+    def remove(self, value: int, target_id: str):
+        self._compact()
+        for pos, item_id in enumerate(self.ids):
+            if item_id == target_id and int(self.values[pos]) == value:
+                del self.ids[pos]
+                self.values = np.delete(self.values, pos)
+                return
+
+    def array(self):
+        self._compact()
+        return self.values
+
+    def _compact(self):
+        if self.dirty:
+            self.values = np.concatenate([self.values, np.array(self.pending, dtype=np.uint64)])
+            self.pending = []
+            self.dirty = False
+
+class VectorHashMatcher(TargetHashIndex):
+    """
+    Variante del índice que guarda cada tipo de hash de hasta 64 bits en un
+    array uint64 contiguo y calcula las distancias de un lote completo de
+    imágenes contra todos los objetivos con XOR + popcount vectorizado.
+    Los hashes de más de 64 bits siguen usando BK-trees.
+    """
+    # Máximo de celdas (consultas x objetivos) por bloque de cálculo
+    MAX_BLOCK_CELLS = 4_000_000
+
+    def rebuild(self, target_hashes: Dict[str, Dict]):
+        self.columns = {}
+        self._snapshot_targets = None
+        self._md5_keys = None
+        super().rebuild(target_hashes)
+
+    @classmethod
+    def from_targets(cls, target_hashes: Dict[str, Dict]):
+        if not isinstance(target_hashes, SnapshotTargets):
+            return cls(target_hashes)
+        index = cls.__new__(cls)
+        index._load_snapshot(target_hashes)
+        return index
+
+    def _load_snapshot(self, targets: "SnapshotTargets"):
+        """
+        Carga las columnas directamente desde los arrays del snapshot, sin recorrer
+        los objetivos. Las entradas por objetivo (necesarias para quitar o reemplazar)
+        se generan recién en la primera modificación.
+        """
+        snapshot = targets.snapshot
+        ids = snapshot.ids
+        self.trees = {}
+        self.exact = {}
+        self.columns = {}
+        self.entries = None
+        self._snapshot_targets = targets
+        self._md5_keys = None
+        self.positions = {target_id: position for position, target_id in enumerate(ids)}
+        self._next_position = len(ids)
+        self.type_counts = {}
+        for hash_type, (values, present) in snapshot.columns.items():
+            mask = present.astype(bool)
+            column = _HashColumn()
+            column.values = values[mask]
+            column.ids = [ids[position] for position in np.flatnonzero(mask).tolist()]
+            self.columns[(hash_type, 64)] = column
+            self.type_counts[hash_type] = len(column.ids)
+        if snapshot.md5 is not None:
+            # MD5 ordenados para búsqueda binaria, sin crear un dict por objetivo
+            md5_values, present = snapshot.md5
+            positions = np.flatnonzero(present)
+            keys = np.ascontiguousarray(md5_values[positions]).view('S16').ravel()
+            order = np.argsort(keys, kind='stable')
+            self._md5_keys = keys[order]
+            self._md5_positions = positions[order]
+            self.type_counts["md5"] = len(positions)
+        for position in snapshot.loose:
+            self._index_hashes(ids[position], snapshot.metadata(position)["hashes"])
+
+    def _exact_ids(self, key: tuple):
+        ids = self.exact.get(key, ())
+        if key[0] != "md5" or self._md5_keys is None:
+            return ids
+        try:
+            packed = bytes.fromhex(key[1])
+        except ValueError:
+            return ids
+        if len(packed) != 16 or packed.hex() != key[1]:
+            return ids
+        low = np.searchsorted(self._md5_keys, packed, side='left')
+        high = np.searchsorted(self._md5_keys, packed, side='right')
+        if low == high:
+            return ids
+        snapshot_ids = self._snapshot_targets.snapshot.ids
+        return set(ids).union(snapshot_ids[position] for position in self._md5_positions[low:high].tolist())
+
+    def _ensure_entries(self):
+        """Tras cargar un snapshot, reconstruye el índice completo antes de modificarlo"""
+        if self.entries is None:
+            self.rebuild(self._snapshot_targets)
+
+    def add(self, target_id: str, target_data: Dict):
+        self._ensure_entries()
+        super().add(target_id, target_data)
+
+    def remove(self, target_id: str, keep_position: bool = False):
+        self._ensure_entries()
+        super().remove(target_id, keep_position)
+
+    def _store_add(self, tree_key, value: int, target_id: str):
+        if tree_key[1] > 64:
+            return super()._store_add(tree_key, value, target_id)
+        self.columns.setdefault(tree_key, _HashColumn()).add(value, target_id)
+
+    def _store_remove(self, tree_key, value: int, target_id: str):
+        if tree_key[1] > 64:
+            return super()._store_remove(tree_key, value, target_id)
+        self.columns[tree_key].remove(value, target_id)
+
+    def _search(self, tree_key, queries: List[tuple], threshold: int) -> List[tuple]:
+        if tree_key[1] > 64:
+            return super()._search(tree_key, queries, threshold)
+        column = self.columns.get(tree_key)
+        if column is None or threshold < 0:
+            return []
+        targets = column.array()
+        if not len(targets):
+            return []
+
+        query_values = np.array([value for _, value in queries], dtype=np.uint64)
+        block = max(1, self.MAX_BLOCK_CELLS // len(query_values))
+        results = []
+        for start in range(0, len(targets), block):
+            distances = popcount_uint64(query_values[:, None] ^ targets[None, start:start + block])
+            rows, cols = np.nonzero(distances <= threshold)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                results.append((queries[row][0], column.ids[start + col], int(distances[row, col])))
+        return results
+
+MATCHERS = {
+    "bktree": TargetHashIndex,
+    "vector": VectorHashMatcher,
+}
+
+# ============================================================================
+# SNAPSHOT BINARIO DE OBJETIVOS
+# ============================================================================
+SNAPSHOT_MAGIC = b"IHDSNAP1"
+
+def _align8(value: int) -> int:
+    return (value + 7) & ~7
+
+def database_fingerprint(path: str):
+    """Tamaño y fecha de modificación de la base (y de su WAL); None si no existe"""
+    if not os.path.exists(path):
+        return None
+    fingerprint = []
+    for file_path in (path, f"{path}-wal"):
+        try:
+            stat = os.stat(file_path)
+            fingerprint += [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            fingerprint += [0, 0]
+    return fingerprint
+
+class TargetSnapshot:
+    """
+    Snapshot binario de solo lectura de la base de objetivos, abierto con mmap:
+    un array uint64 por tipo de hash perceptual de 64 bits (más su máscara de
+    presencia), los MD5 empaquetados en 16 bytes y una sección de metadatos JSON
+    por objetivo indexada por offsets. Formato: magia, longitud de la cabecera,
+    cabecera JSON con las secciones y secciones alineadas a 8 bytes.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} no es un snapshot de objetivos")
+        header_length = int.from_bytes(self._mmap[8:12], 'little')
+        self.header = json.loads(self._mmap[16:16 + header_length])
+        self._data_start = _align8(16 + header_length)
+        self.fingerprint = self.header["fingerprint"]
+        self.count = self.header["count"]
+        self.ids = json.loads(self._section("ids"))
+        self.meta_offsets = self._array("meta.offsets", np.uint64)
+        self.columns = {hash_type: (self._array(f"hash.{hash_type}", np.uint64),
+                                    self._array(f"hash.{hash_type}.present", np.uint8))
+                        for hash_type in self.header["columns"]}
+        self.md5 = None
+        if "md5" in self.header["sections"]:
+            self.md5 = (self._array("md5", np.uint8).reshape(-1, 16), self._array("md5.present", np.uint8))
+        # Posiciones cuyos hashes no caben en los arrays y quedan en los metadatos
+        self.loose = self.header["loose"]
+
+    @classmethod
+    def open_if_fresh(cls, path: str, fingerprint):
+        """Abre el snapshot si existe y se generó desde la misma versión de la base"""
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return snapshot if snapshot.fingerprint == fingerprint else None
+
+    def _section(self, name: str) -> bytes:
+        offset, length = self.header["sections"][name]
+        start = self._data_start + offset
+        return self._mmap[start:start + length]
+
+    def _array(self, name: str, dtype):
+        offset, length = self.header["sections"][name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize,
+                             offset=self._data_start + offset)
+
+    def metadata(self, position: int) -> Dict:
+        """Metadatos del objetivo en esa posición (sin los hashes empaquetados)"""
+        start = self._data_start + self.header["sections"]["meta"][0]
+        return json.loads(self._mmap[start + int(self.meta_offsets[position]):
+                                     start + int(self.meta_offsets[position + 1])])
+
+    def target(self, position: int) -> Dict:
+        """Reconstruye el diccionario completo de un objetivo"""
+        target_data = self.metadata(position)
+        hashes = {}
+        if self.md5 is not None and self.md5[1][position]:
+            hashes["md5"] = self.md5[0][position].tobytes().hex()
+        for hash_type, (values, present) in self.columns.items():
+            if present[position]:
+                hashes[hash_type] = f"{int(values[position]):016x}"
+        hashes.update(target_data.get("hashes", {}))
+        # Todos los tipos guardados, incluidos los no estándar, en su orden original
+        order = target_data.pop("hash_order", None)
+        target_data["hashes"] = {t: hashes[t] for t in order} if order else hashes
+        return target_data
+
+    @staticmethod
+    def build(path: str, targets: Dict[str, Dict], fingerprint):
+        """Genera el snapshot de targets (escritura atómica)"""
+        ids = list(targets)
+        count = len(ids)
+        columns = {t: (np.zeros(count, dtype=np.uint64), np.zeros(count, dtype=np.uint8))
+                   for t in PERCEPTUAL_HASH_TYPES}
+        md5_values = np.zeros((count, 16), dtype=np.uint8)
+        md5_present = np.zeros(count, dtype=np.uint8)
+        meta_blobs = []
+        loose = []
+        for position, target_id in enumerate(ids):
+            target_data = targets[target_id]
+            leftover = {}
+            packed_types = []
+            for hash_type, hash_value in (target_data.get("hashes") or {}).items():
+                # Solo se empaquetan los valores que se reconstruyen idénticos
+                if hash_type == "md5" and len(hash_value) == 32:
+                    try:
+                        packed = bytes.fromhex(hash_value)
+                    except ValueError:
+                        packed = None
+                    if packed is not None and packed.hex() == hash_value:
+                        md5_values[position] = np.frombuffer(packed, dtype=np.uint8)
+                        md5_present[position] = 1
+                        packed_types.append(hash_type)
+                        continue
+                elif hash_type in columns:
+                    parsed = parse_hash(hash_value)
+                    if parsed and parsed[1] == 64 and f"{parsed[0]:016x}" == hash_value:
+                        columns[hash_type][0][position] = parsed[0]
+                        columns[hash_type][1][position] = 1
+                        packed_types.append(hash_type)
+                        continue
+                leftover[hash_type] = hash_value
+            meta = {k: v for k, v in target_data.items() if k != "hashes"}
+            if leftover:
+                meta["hashes"] = leftover
+                loose.append(position)
+            # target() reconstruye MD5, columnas y sueltos en ese orden; si el original
+            # difiere (p. ej. un tipo no estándar en medio) se guarda el orden explícito
+            original_order = list(target_data.get("hashes") or {})
+            if original_order != [t for t in HASH_TYPES if t in packed_types] + list(leftover):
+                meta["hash_order"] = original_order
+            meta_blobs.append(json.dumps(meta).encode())
+        
+        meta_offsets = np.zeros(count + 1, dtype=np.uint64)
+        meta_offsets[1:] = np.cumsum([len(blob) for blob in meta_blobs], dtype=np.uint64)
+        sections = [("ids", json.dumps(ids).encode()), ("meta.offsets", meta_offsets.tobytes()),
+                    ("meta", b"".join(meta_blobs))]
+        used_columns = [t for t, (_, present) in columns.items() if present.any()]
+        for hash_type in used_columns:
+            values, present = columns[hash_type]
+            sections += [(f"hash.{hash_type}", values.tobytes()), (f"hash.{hash_type}.present", present.tobytes())]
+        if md5_present.any():
+            sections += [("md5", md5_values.tobytes()), ("md5.present", md5_present.tobytes())]
+        
+        layout = {}
+        offset = 0
+        for name, data in sections:
+            layout[name] = [offset, len(data)]
+            offset = _align8(offset + len(data))
+        header = json.dumps({"count": count, "fingerprint": fingerprint, "columns": used_columns,
+                             "loose": loose, "sections": layout}).encode()
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + len(header).to_bytes(4, 'little') + bytes(4) + header)
+            f.write(bytes(_align8(16 + len(header)) - 16 - len(header)))
+            for name, data in sections:
+                f.write(data)
+                f.write(bytes(_align8(len(data)) - len(data)))
+        os.replace(tmp_path, path)
+
+class SnapshotTargets(MutableMapping):
+    """
+    Vista perezosa tipo dict de los objetivos de un snapshot: cada objetivo se
+    decodifica al pedirlo. La primera modificación carga todo en un dict normal.
+    """
+    def __init__(self, snapshot: TargetSnapshot):
+        self.snapshot = snapshot
+        self._positions = None
+        self._decoded = {}
+        self._data = None
+
+    def _position(self, target_id: str) -> int:
+        if self._positions is None:
+            self._positions = {tid: position for position, tid in enumerate(self.snapshot.ids)}
+        return self._positions[target_id]
+
+    def _materialize(self) -> Dict[str, Dict]:
+        if self._data is None:
+            self._data = {target_id: self[target_id] for target_id in self.snapshot.ids}
+        return self._data
+
+    def __getitem__(self, target_id: str) -> Dict:
+        if self._data is not None:
+            return self._data[target_id]
+        target_data = self._decoded.get(target_id)
+        if target_data is None:
+            target_data = self._decoded[target_id] = self.snapshot.target(self._position(target_id))
+        return target_data
+
+    def __setitem__(self, target_id: str, target_data: Dict):
+        self._materialize()[target_id] = target_data
+
+    def __delitem__(self, target_id: str):
+        del self._materialize()[target_id]
+
+    def __iter__(self):
+        return iter(self._data if self._data is not None else self.snapshot.ids)
+
+    def __len__(self) -> int:
+        return len(self._data) if self._data is not None else self.snapshot.count
+
+    def __contains__(self, target_id) -> bool:
+        if self._data is not None:
+            return target_id in self._data
+        try:
+            self._position(target_id)
+            return True
+        except KeyError:
+            return False
+
+    def clear(self):
+        self._data = {}
+
+# ============================================================================
+# CACHÉ PERSISTENTE DE RESULTADOS
+# ============================================================================
+class PersistentLRUCache:
+    """
+    Diccionario con desalojo LRU acotado a max_entries que se guarda en un
+    archivo JSON. Es seguro entre hilos (lo usan los hilos de descarga web).
+    El archivo se lee en el primer uso, no al crearla, para que los comandos
+    que no escanean no paguen el parseo de la caché al arrancar.
+    """
+    def __init__(self, cache_file: str = "hash_cache.json", max_entries: int = 50000):
+        self.cache_file = cache_file
+        self.max_entries = max(0, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries = None
+
+    def _load(self) -> OrderedDict:
+        entries = OrderedDict()
+        if not self.max_entries:
+            return entries
+        try:
+            with open(self.cache_file, 'r') as f:
+                entries = OrderedDict(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print_warning(f"No se pudo leer la caché {self.cache_file} ({e}). Se empieza vacía.")
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entries
+
+    def _loaded(self) -> OrderedDict:
+        """Entradas de la caché, leyendo el archivo la primera vez (con el lock tomado)"""
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._loaded())
+
+    def get(self, key: str, is_valid=None):
+        """
+        Devuelve el valor (marcándolo como usado recientemente) o None.
+        is_valid permite descartar entradas que ya no sirven; cuentan como fallo.
+        """
+        with self._lock:
+            entries = self._loaded()
+            value = entries.get(key)
+            if value is not None and is_valid is not None and not is_valid(value):
+                value = None
+            if value is None:
+                self.misses += 1
+            else:
+                entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def peek(self, key: str):
+        """Devuelve el valor sin contarlo como acierto/fallo ni cambiar su posición"""
+        with self._lock:
+            return self._loaded().get(key)
+
+    def put(self, key: str, value):
+        """Guarda un valor y desaloja los menos usados si se supera el límite"""
+        if not self.max_entries:
+            return
+        with self._lock:
+            entries = self._loaded()
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """Escribe la caché (de forma atómica) si cambió desde la última vez"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = list(self._entries.items())
+            self._dirty = False
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(dict(snapshot), f)
+        os.replace(tmp_file, self.cache_file)
+
+# ============================================================================
+# CHECKPOINTS DE ESCANEO DE TELEGRAM
+# ============================================================================
+class TelegramCheckpointStore:
+    """
+    Guarda por chat el ID del mensaje más alto ya procesado, para que los
+    escaneos siguientes solo lean los mensajes nuevos (min_id). El archivo se
+    lee recién cuando un escaneo de Telegram consulta o avanza un checkpoint.
+    """
+    def __init__(self, checkpoint_file: str = "telegram_checkpoints.json"):
+        self.checkpoint_file = checkpoint_file
+        self._checkpoints = None
+
+    @property
+    def checkpoints(self) -> Dict[str, Dict]:
+        if self._checkpoints is None:
+            self._checkpoints = self._load()
+        return self._checkpoints
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print_warning(f"No se pudo leer {self.checkpoint_file} ({e}). Se escaneará desde cero.")
+            return {}
+
+    def save(self):
+        """Escribe el archivo de forma atómica para no dejarlo a medias"""
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.checkpoints, f, indent=2)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def get(self, chat_id) -> int:
+        """ID del último mensaje procesado del chat (0 si nunca se escaneó)"""
+        return self.checkpoints.get(str(chat_id), {}).get("last_message_id", 0)
+
+    def update(self, chat_id, last_message_id: int, chat_name: str = ""):
+        """Avanza el checkpoint del chat (nunca lo retrocede) y lo persiste"""
+        if last_message_id <= self.get(chat_id):
+            return
+        self.checkpoints[str(chat_id)] = {
+            "last_message_id": last_message_id,
+            "name": chat_name,
+            "updated": datetime.now().isoformat()
+        }
+        self.save()
+
+# ============================================================================
+# REGISTRO DE COINCIDENCIAS (JSONL)
+# ============================================================================
+class MatchLog:
+    """
+    Registro de solo anexado con una coincidencia JSON por línea. Cada línea se
+    entrega al sistema operativo al escribirse y se hace fsync como mucho cada
+    fsync_interval segundos; el archivo rota al superar max_bytes o rotate_interval
+    segundos y de los rotados se conservan los backup_count más recientes (0 =
+    todos), como RotatingFileHandler. En memoria solo quedan los contadores y las
+    últimas max_recent coincidencias. Es seguro entre hilos.
+    """
+    def __init__(self, log_file: str = "matches_log.jsonl", max_recent: int = 1000,
+                 max_bytes: int = 50 * 1024 * 1024, rotate_interval: float = 0.0,
+                 fsync_interval: float = 5.0, backup_count: int = 10):
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.fsync_interval = fsync_interval
+        self.backup_count = max(0, backup_count)
+        self.recent = deque(maxlen=max(1, max_recent))
+        self.total = 0
+        self.by_source = {}
+        self.last = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._last_sync = 0.0
+        self._last_rotation = ("", 0)
+        self._unsynced = False
+        # Tramos [archivo, offset inicial] escritos en esta sesión (para exportar)
+        self._segments = []
+
+    def _open(self):
+        self._file = open(self.log_file, 'ab')
+        self._size = self._file.tell()
+        self._opened_at = self._last_sync = time.monotonic()
+        self._segments.append([self.log_file, self._size])
+
+    def _rotated_name(self) -> str:
+        root, ext = os.path.splitext(self.log_file)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # En el mismo segundo el sufijo sigue creciendo aunque _prune haya borrado
+        # los anteriores, para que el rotado más nuevo nunca ordene como el más viejo
+        n = self._last_rotation[1] + 1 if self._last_rotation[0] == stamp else 0
+        while True:
+            candidate = f"{root}.{stamp}_{n}{ext}" if n else f"{root}.{stamp}{ext}"
+            if not os.path.exists(candidate):
+                self._last_rotation = (stamp, n)
+                return candidate
+            n += 1
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._file = None
+        rotated = self._rotated_name()
+        os.replace(self.log_file, rotated)
+        self._segments[-1][0] = rotated
+        self._prune()
+
+    def _rotated_files(self) -> List[str]:
+        """Registros rotados existentes, del más antiguo al más reciente"""
+        directory, name = os.path.split(self.log_file)
+        root, ext = os.path.splitext(name)
+        pattern = re.compile(rf"{re.escape(root)}\.(\d{{8}}_\d{{6}})(?:_(\d+))?{re.escape(ext)}")
+        found = []
+        for entry in os.listdir(directory or '.'):
+            match = pattern.fullmatch(entry)
+            if match:
+                found.append((match.group(1), int(match.group(2) or 0), os.path.join(directory, entry)))
+        return [path for _, _, path in sorted(found)]
+
+    def _prune(self):
+        """Borra los registros rotados más antiguos que excedan backup_count"""
+        if not self.backup_count:
+            return
+        for path in self._rotated_files()[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def append(self, match: Dict):
+        """Anexa una coincidencia al registro y actualiza los contadores"""
+        line = (json.dumps(match, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            if self._file is not None and self._size and (
+                    (self.max_bytes and self._size + len(line) > self.max_bytes) or
+                    (self.rotate_interval and time.monotonic() - self._opened_at >= self.rotate_interval)):
+                self._rotate()
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            self._unsynced = True
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            self.total += 1
+            source = match.get('source', 'Desconocido')
+            self.by_source[source] = self.by_source.get(source, 0) + 1
+            self.last = match
+            self.recent.append(match)
+
+    def sync(self):
+        """Fuerza el fsync de las líneas pendientes"""
+        with self._lock:
+            self._sync()
+
+    def mark(self) -> tuple:
+        """Posición actual del registro, para exportar solo lo escrito después"""
+        with self._lock:
+            return (len(self._segments), 0) if self._file is None else (len(self._segments) - 1, self._size)
+
+    def export(self, filename: str, since: tuple = (0, 0)) -> int:
+        """
+        Copia a un JSON (lista) las coincidencias de esta sesión escritas desde
+        since, leyendo el registro en disco línea a línea (sin las de registros
+        rotados ya borrados por backup_count). Devuelve cuántas copió.
+        """
+        with self._lock:
+            segments = [list(segment) for segment in self._segments]
+            end = self._size
+        first, offset = since
+        count = 0
+        with open(filename, 'w') as out:
+            out.write("[")
+            for index in range(first, len(segments)):
+                path, start = segments[index]
+                if index == first:
+                    start = max(start, offset)
+                limit = end if index == len(segments) - 1 else None
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
+                    continue
+                with f:
+                    f.seek(start)
+                    position = start
+                    for line in f:
+                        position += len(line)
+                        if limit is not None and position > limit:
+                            break
+                        line = line.strip()
+                        if line:
+                            out.write(",\n  " if count else "\n  ")
+                            out.write(line.decode('utf-8'))
+                            count += 1
+            out.write("\n]\n" if count else "]\n")
+        return count
+
+    def close(self):
+        """Hace fsync de lo pendiente y cierra el archivo"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+# ============================================================================
+# ALMACENAMIENTO DE OBJETIVOS
+# ============================================================================
+# Extensiones con las que la base de datos de objetivos se guarda en SQLite
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+class JsonTargetStore:
+    """
+    Backend original: todos los objetivos en un archivo JSON que se reescribe
+    completo en cada cambio (o una sola vez al salir de transaction()).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # Se lee recién con load() o con el primer cambio (si se arrancó desde un snapshot)
+        self._targets = None
+        self._depth = 0
+        self._dirty = False
+
+    def load(self) -> Dict[str, Dict]:
+        """Devuelve el diccionario de objetivos; el store lo mantiene como propio"""
+        try:
+            with open(self.path, 'r') as f:
+                self._targets = json.load(f)
+        except FileNotFoundError:
+            print_warning(f"Archivo {self.path} no encontrado. Creando nuevo...")
+            self._targets = {}
+        return self._targets
+
+    def _loaded(self) -> Dict[str, Dict]:
+        if self._targets is None:
+            self.load()
+        return self._targets
+
+    def _write(self):
+        if self._depth:
+            self._dirty = True
+            return
+        with open(self.path, 'w') as f:
+            json.dump(self._targets, f, indent=2)
+        self._dirty = False
+
+    def put(self, target_id: str, target_data: Dict):
+        self._loaded()[target_id] = target_data
+        self._write()
+
+    def delete(self, target_id: str):
+        self._loaded().pop(target_id, None)
+        self._write()
+
+    def replace_all(self, targets: Dict[str, Dict]):
+        if targets is not self._targets:
+            self._targets = dict(targets)
+        self._write()
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varios cambios en una sola escritura del archivo"""
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if not self._depth and self._dirty:
+                self._write()
+
+    def close(self):
+        pass
+
+class SQLiteTargetStore:
+    """
+    Objetivos en SQLite (modo WAL) con tablas indexadas de objetivos, hashes y tags.
+    Cada cambio escribe solo las filas del objetivo; transaction() agrupa muchos
+    cambios en un único commit. El orden de inserción se conserva con el rowid.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS targets (
+            id TEXT PRIMARY KEY,
+            description TEXT NOT NULL DEFAULT '',
+            source TEXT,
+            added_date TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS hashes (
+            target_id TEXT NOT NULL REFERENCES targets(id) ON DELETE CASCADE,
+            hash_type TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (target_id, hash_type)
+        );
+        CREATE INDEX IF NOT EXISTS idx_hashes_type_value ON hashes(hash_type, value);
+        CREATE TABLE IF NOT EXISTS tags (
+            target_id TEXT NOT NULL REFERENCES targets(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (target_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+    """
+    # Campos con columna propia; el resto se guarda como JSON en "extra"
+    COLUMNS = ("description", "source", "added_date")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        self._depth = 0
+
+    def load(self) -> Dict[str, Dict]:
+        targets = {}
+        for target_id, description, source, added_date, extra in self.conn.execute(
+                "SELECT id, description, source, added_date, extra FROM targets ORDER BY rowid"):
+            target_data = {"description": description, "tags": [], "added_date": added_date,
+                           "source": source, "hashes": {}}
+            if extra:
+                target_data.update(json.loads(extra))
+            targets[target_id] = target_data
+        for target_id, tag in self.conn.execute("SELECT target_id, tag FROM tags ORDER BY target_id, position"):
+            targets[target_id]["tags"].append(tag)
+        # En orden de inserción: mismos tipos (incluidos los no estándar) y mismo orden que en el JSON original
+        for target_id, hash_type, value in self.conn.execute(
+                "SELECT target_id, hash_type, value FROM hashes ORDER BY rowid"):
+            targets[target_id]["hashes"][hash_type] = value
+        return targets
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varios cambios en un único commit (rollback si hay un error)"""
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if not self._depth:
+                self.conn.rollback()
+            raise
+        self._depth -= 1
+        if not self._depth:
+            self.conn.commit()
+
+    def _insert(self, target_id: str, target_data: Dict):
+        extra = {k: v for k, v in target_data.items() if k not in self.COLUMNS + ("tags", "hashes")}
+        self.conn.execute(
+            "INSERT INTO targets (id, description, source, added_date, extra) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET description = excluded.description, source = excluded.source, "
+            "added_date = excluded.added_date, extra = excluded.extra",
+            (target_id, target_data.get("description", ""), target_data.get("source"),
+             target_data.get("added_date"), json.dumps(extra) if extra else None))
+        self.conn.execute("DELETE FROM hashes WHERE target_id = ?", (target_id,))
+        self.conn.execute("DELETE FROM tags WHERE target_id = ?", (target_id,))
+        self.conn.executemany("INSERT INTO hashes (target_id, hash_type, value) VALUES (?, ?, ?)",
+                              [(target_id, t, v) for t, v in target_data.get("hashes", {}).items()])
+        self.conn.executemany("INSERT INTO tags (target_id, position, tag) VALUES (?, ?, ?)",
+                              [(target_id, i, tag) for i, tag in enumerate(target_data.get("tags") or [])])
+
+    def put(self, target_id: str, target_data: Dict):
+        with self.transaction():
+            self._insert(target_id, target_data)
+
+    def delete(self, target_id: str):
+        with self.transaction():
+            self.conn.execute("DELETE FROM targets WHERE id = ?", (target_id,))
+
+    def replace_all(self, targets: Dict[str, Dict]):
+        with self.transaction():
+            self.conn.execute("DELETE FROM targets")
+            for target_id, target_data in targets.items():
+                self._insert(target_id, target_data)
+
+    def close(self):
+        self.conn.close()
+
+def open_target_store(path: str):
+    """Elige el backend de objetivos según la extensión del archivo"""
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteTargetStore(path)
+    return JsonTargetStore(path)
+
+def migrate_json_to_sqlite(json_path: str, sqlite_path: str) -> int:
+    """Importa en una sola transacción una base de objetivos JSON a SQLite"""
+    with open(json_path, 'r') as f:
+        targets = json.load(f)
+    store = SQLiteTargetStore(sqlite_path)
+    try:
+        with store.transaction():
+            for target_id, target_data in targets.items():
+                store.put(target_id, target_data)
+    finally:
+        store.close()
+    return len(targets)
+
+# ============================================================================
+# IMPORTACIÓN MASIVA DE OBJETIVOS
+# ============================================================================
+IMPORT_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+IMPORT_ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+class NearDuplicateIndex:
+    """
+    Detecta hashes a distancia <= max_distance por el principio del palomar: cada
+    hash se parte en max_distance + 1 segmentos y dos hashes a esa distancia
+    comparten al menos uno idéntico, así que solo se comparan esos candidatos.
+    """
+    def __init__(self, max_distance: int, bits: int = 64):
+        self.max_distance = max_distance
+        parts = max_distance + 1
+        bounds = [bits * i // parts for i in range(parts + 1)]
+        self.segments = [(low, (1 << (high - low)) - 1) for low, high in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.segments]
+
+    def add(self, value: int):
+        for table, (shift, mask) in zip(self.tables, self.segments):
+            table.setdefault((value >> shift) & mask, []).append(value)
+
+    def contains_near(self, value: int) -> bool:
+        for table, (shift, mask) in zip(self.tables, self.segments):
+            for candidate in table.get((value >> shift) & mask, ()):
+                if hamming_distance(candidate, value) <= self.max_distance:
+                    return True
+        return False
+
+def _hash_record(record: Dict, name: str) -> tuple:
+    """Normaliza una fila de CSV/JSONL a (descripción, tags, origen, hashes)"""
+    hashes = record.get("hashes") or {t: record[t] for t in HASH_TYPES if record.get(t)}
+    hashes = {t: str(v).strip().lower() for t, v in hashes.items() if t in HASH_TYPES and v}
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    return record.get("description") or "", tags, record.get("source") or name, hashes
+
+def iter_import_items(path: str):
+    """
+    Recorre una fuente de importación y produce ("image", nombre, bytes) por cada
+    imagen (directorio, zip o tar) o ("record", nombre, fila) por cada línea de
+    un CSV/JSONL de hashes ya calculados
+    """
+    lower = path.lower()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(IMPORT_IMAGE_EXTENSIONS):
+                    file_path = os.path.join(root, filename)
+                    with open(file_path, 'rb') as f:
+                        yield "image", file_path, f.read()
+    elif lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.lower().endswith(IMPORT_IMAGE_EXTENSIONS):
+                    yield "image", f"{path}:{member.filename}", archive.read(member)
+    elif lower.endswith(IMPORT_ARCHIVE_EXTENSIONS):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(IMPORT_IMAGE_EXTENSIONS):
+                    yield "image", f"{path}:{member.name}", archive.extractfile(member).read()
+    elif lower.endswith('.csv'):
+        with open(path, newline='') as f:
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                yield "record", f"{path}:{line_number}", {k.strip().lower(): v for k, v in row.items() if k}
+    elif lower.endswith(('.jsonl', '.ndjson')):
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield "record", f"{path}:{line_number}", json.loads(line)
+    else:
+        raise ValueError(f"Fuente no soportada: {path} (directorio, .zip, .tar[.gz|.bz2|.xz], .csv o .jsonl)")
+
 # ============================================================================
 # CLASE PRINCIPAL 
 # ============================================================================
 class ImageHashDetector:
-    def __init__(self, hash_database_file: str = "target_hashes.json"):
+    # Cantidad de imágenes hasheadas que se comparan juntas contra los objetivos
+    MATCH_BATCH_SIZE = 32
+
+    def __init__(self, hash_database_file: str = "target_hashes.json", matcher: str = "vector",
+                 reduced_decode: bool = False, hash_types: List[str] = None, exact_only: bool = False,
+                 fetch_workers: int = 8, per_host_connections: int = 4, per_host_rate: float = 10.0,
+                 hash_workers: int = 0, telegram_downloads: int = 4,
+                 thumbnail_first: bool = False, thumbnail_min_size: int = 128, suspicious_band: int = 6,
+                 verify_md5: bool = False, checkpoint_file: str = "telegram_checkpoints.json",
+                 full_rescan: bool = False, monitor_queue_size: int = 100,
+                 monitor_stats_interval: float = 60.0, cache_file: str = "hash_cache.json",
+                 cache_size: int = 50000, cache_ttl: float = 86400.0, use_snapshot: bool = True,
+                 match_log_file: str = "matches_log.jsonl", max_recent_matches: int = 1000,
+                 match_log_max_bytes: int = 50 * 1024 * 1024, match_log_rotate_interval: float = 0.0,
+                 match_log_backups: int = 10, max_image_bytes: int = 20 * 1024 * 1024, max_image_pixels: int = 40000000,
+                 max_image_frames: int = 500, max_decoded_bytes: int = 256 * 1024 * 1024,
+                 decode_memory_limit: int = 0, decode_timeout: float = 0.0):
         """
         Inicializa el detector de imágenes
         """
         self.hash_database_file = hash_database_file
-        self.target_hashes = self.load_target_hashes()
-        self.detected_matches = []
+        self.reduced_decode = reduced_decode
+        # Tipos de hash a calcular; None = los que usa la base de datos
+        self.hash_types = hash_types
+        # Si el MD5 coincide, reportar solo la coincidencia exacta sin decodificar
+        self.exact_only = exact_only
+        self.exact_shortcuts = 0
+        # Descargas web: pool de hilos, sesión compartida y límites por host
+        self.fetch_workers = max(1, fetch_workers)
+        self.http_session = create_http_session(max(self.fetch_workers, per_host_connections))
+        self.rate_limiter = HostRateLimiter(per_host_connections, per_host_rate)
+        # Hashing perceptual en procesos separados (0 = en el hilo que llama), con
+        # límites de decodificación y, opcionalmente, memoria y tiempo por proceso
+        self.hash_executor = HashingExecutor(
+            hash_workers, limits={"max_pixels": max_image_pixels, "max_frames": max_image_frames,
+                                  "max_decoded_bytes": max_decoded_bytes},
+            memory_limit=decode_memory_limit, timeout=decode_timeout)
+        # Snapshot binario para arrancar sin parsear la base; se regenera si la base cambia
+        self.snapshot_file = f"{hash_database_file}.snap" if use_snapshot else None
+        self.snapshot_status = "desactivado"
+        fingerprint = database_fingerprint(hash_database_file)
+        # JSON o SQLite según la extensión; target_hashes sigue siendo un dict en memoria
+        self.target_store = open_target_store(hash_database_file)
+        self.target_hashes = self.load_target_hashes(fingerprint)
+        self.matcher = matcher
+        self.hash_index = MATCHERS[matcher].from_targets(self.target_hashes)
+        # Las coincidencias se anexan a un registro JSONL; en memoria solo quedan
+        # contadores y las últimas max_recent_matches
+        self.match_log = MatchLog(match_log_file, max_recent_matches, match_log_max_bytes,
+                                  match_log_rotate_interval, backup_count=match_log_backups)
+        self.detected_matches = self.match_log.recent
         self.telegram_client = None
         self.telegram_connected = False
         self.telegram_user_info = None
+        # Descargas simultáneas de Telegram y fin de la última espera por FloodWait
+        self.telegram_downloads = max(1, telegram_downloads)
+        self._flood_wait_until = 0.0
+        # Matching por miniatura: solo se baja el archivo completo si la miniatura
+        # queda a threshold + suspicious_band de un objetivo (o si se verifica MD5)
+        self.thumbnail_first = thumbnail_first
+        self.thumbnail_min_size = thumbnail_min_size
+        self.suspicious_band = suspicious_band
+        self.verify_md5 = verify_md5
+        self.thumbnail_stats = {"discarded": 0, "full": 0}
+        # Último mensaje procesado por chat; full_rescan ignora los checkpoints
+        self.checkpoints = TelegramCheckpointStore(checkpoint_file)
+        self.full_rescan = full_rescan
+        # Cola acotada del monitor en tiempo real y cada cuánto se informan sus métricas
+        self.monitor_queue_size = max(1, monitor_queue_size)
+        self.monitor_stats_interval = monitor_stats_interval
+        # Caché persistente de hashes por URL, contenido (MD5) o archivo de Telegram;
+        # los resultados por URL se reutilizan sin descargar durante cache_ttl segundos
+        self.result_cache = PersistentLRUCache(cache_file, cache_size)
+        self.cache_ttl = cache_ttl
+        # Respuestas 304 (recursos revalidados con If-None-Match/If-Modified-Since)
+        self.http_not_modified = 0
+        # Las imágenes web se descargan en streaming y se cortan en cuanto la cabecera
+        # indica que no son imágenes o superan estos límites (0 = sin límite)
+        self.max_image_bytes = max_image_bytes
+        self.max_image_pixels = max_image_pixels
+        self.image_rejections = {"not_image": 0, "too_large": 0, "too_many_pixels": 0, "too_many_frames": 0,
+                                 "too_large_decoded": 0, "timeout": 0, "memory": 0, "crashed": 0}
         
-    def load_target_hashes(self) -> Dict[str, Dict]:
-        """Carga los hashes objetivo desde el archivo JSON"""
+    def close(self):
+        """Libera los recursos de fondo (pool de procesos de hashing, sesión HTTP, registro) y guarda la caché"""
+        self.hash_executor.shutdown()
+        self.http_session.close()
+        self.target_store.close()
+        self.match_log.close()
         try:
-            with open(self.hash_database_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print_warning(f"Archivo {self.hash_database_file} no encontrado. Creando nuevo...")
-            return {}
+            self.result_cache.save()
+        except OSError as e:
+            print_warning(f"No se pudo guardar la caché {self.result_cache.cache_file}: {e}")
+    
+    def load_target_hashes(self, fingerprint=None) -> Dict[str, Dict]:
+        """
+        Carga los hashes objetivo desde el snapshot binario si está al día con la
+        base (fingerprint); si no, desde la base de datos (JSON o SQLite), y
+        regenera el snapshot para el próximo arranque.
+        Los hashes se decodifican a enteros una sola vez al construir el índice.
+        """
+        if self.snapshot_file and fingerprint:
+            snapshot = TargetSnapshot.open_if_fresh(self.snapshot_file, fingerprint)
+            if snapshot is not None:
+                self.snapshot_status = "cargado"
+                return SnapshotTargets(snapshot)
+        
+        targets = self.target_store.load()
+        if self.snapshot_file and fingerprint and targets:
+            try:
+                TargetSnapshot.build(self.snapshot_file, targets, fingerprint)
+                self.snapshot_status = "regenerado"
+            except OSError as e:
+                print_warning(f"No se pudo generar el snapshot {self.snapshot_file}: {e}")
+        return targets
     
     def save_target_hashes(self):
-        """Guarda los hashes objetivo en el archivo JSON"""
-        with open(self.hash_database_file, 'w') as f:
-            json.dump(self.target_hashes, f, indent=2)
+        """Guarda todos los hashes objetivo (los cambios puntuales usan el store directamente)"""
+        self.target_store.replace_all(self.target_hashes)
     
     def reset_database(self):
         """
@@ -184,7 +2271,8 @@ class ImageHashDetector:
         print_section_header("BORRAR BASE DE DATOS")
         confirm = input(f"{Colors.RED}ADVERTENCIA:{Colors.ENDC} ¿Estás seguro de que quieres borrar TODOS los hashes ({len(self.target_hashes)})? (s/N): ").lower()
         if confirm == 's':
-            self.target_hashes = {}
+            self.target_hashes.clear()
+            self.hash_index.rebuild(self.target_hashes)
             self.save_target_hashes()
             print_success(f"💣 Base de datos {self.hash_database_file} reseteada y vaciada.")
         else:
@@ -197,7 +2285,8 @@ class ImageHashDetector:
         print_section_header("BORRAR HASH POR ID")
         if target_id in self.target_hashes:
             target_data = self.target_hashes.pop(target_id)
-            self.save_target_hashes()
+            self.hash_index.remove(target_id)
+            self.target_store.delete(target_id)
             print_success(f"Hash {Colors.BOLD}{target_id}{Colors.ENDC} ({target_data['description']}) eliminado de la base de datos.")
         else:
             print_error(f"ID de hash no encontrado: {target_id}")
@@ -216,12 +2305,13 @@ class ImageHashDetector:
             else:
                 img = Image.open(image_path)
             
-            # Calcular múltiples tipos de hash perceptual
+            # Calcular múltiples tipos de hash perceptual (sin reducción: la DB guarda valores exactos)
             print_info("Calculando hashes perceptuales...")
-            ahash = str(imagehash.average_hash(img))
-            phash = str(imagehash.phash(img))
-            dhash = str(imagehash.dhash(img))
-            whash = str(imagehash.whash(img))
+            perceptual = compute_perceptual_hashes(img, reduced=False)
+            ahash = perceptual["ahash"]
+            phash = perceptual["phash"]
+            dhash = perceptual["dhash"]
+            whash = perceptual["whash"]
             
             # Hash criptográfico MD5 del contenido original
             if not image_path.startswith('http'):
@@ -248,8 +2338,9 @@ class ImageHashDetector:
                     "whash": whash
                 }
             }
+            self.hash_index.add(hash_id, self.target_hashes[hash_id])
             
-            self.save_target_hashes()
+            self.target_store.put(hash_id, self.target_hashes[hash_id])
             print_success(f"Imagen agregada con ID: {Colors.BOLD}{hash_id}{Colors.ENDC}")
             print(f"   {Colors.CYAN}MD5:{Colors.ENDC}    {md5_hash}")
             print(f"   {Colors.CYAN}pHash:{Colors.ENDC}  {phash}")
@@ -277,116 +2368,358 @@ class ImageHashDetector:
                 hash_type: hash_value
             }
         }
-        self.save_target_hashes()
+        self.hash_index.add(hash_id, self.target_hashes[hash_id])
+        self.target_store.put(hash_id, self.target_hashes[hash_id])
         print_success(f"Hash manual agregado con ID: {Colors.BOLD}{hash_id}{Colors.ENDC}")
         print(f"   {Colors.CYAN}Tipo:{Colors.ENDC}  {hash_type}")
         print(f"   {Colors.CYAN}Valor:{Colors.ENDC} {hash_value}")
         return hash_id
     
+    # Objetivos importados por transacción y hashes en vuelo por proceso de hashing
+    IMPORT_BATCH_SIZE = 500
+    IMPORT_INFLIGHT_PER_WORKER = 4
+
+    def _next_target_id(self, prefix: str = "target") -> str:
+        """Primer ID libre con el prefijo dado"""
+        number = len(self.target_hashes) + 1
+        while f"{prefix}_{number}" in self.target_hashes:
+            number += 1
+        return f"{prefix}_{number}"
+
+    def import_targets(self, path: str, description: str = "", tags: List[str] = None,
+                       dedupe_distance: int = 2) -> Dict[str, int]:
+        """
+        Importa objetivos en bloque desde un directorio, un zip/tar de imágenes o un
+        CSV/JSONL de hashes. Las imágenes se hashean en paralelo en HashingExecutor;
+        los objetivos se guardan por lotes en una transacción y se descartan los
+        duplicados por MD5 o por pHash a dedupe_distance bits o menos (-1 = solo MD5).
+        """
+        print_section_header(f"IMPORTANDO OBJETIVOS: {path}")
+        stats = {"read": 0, "added": 0, "duplicates": 0, "failed": 0}
+        start = time.monotonic()
+        in_flight = deque()
+        max_in_flight = max(1, self.hash_executor.workers) * self.IMPORT_INFLIGHT_PER_WORKER
+        batch = []
+        
+        # pHash de los objetivos existentes, por longitud en bits
+        near_indexes = {}
+        if dedupe_distance >= 0:
+            for target_data in self.target_hashes.values():
+                parsed = parse_hash(target_data["hashes"].get("phash", ""))
+                if parsed:
+                    near_indexes.setdefault(parsed[1], NearDuplicateIndex(dedupe_distance, parsed[1])).add(parsed[0])
+        
+        def accept(target_description, target_tags, source, hashes):
+            """Descarta duplicados por MD5 o pHash cercano; si no lo es, lo agrega al lote"""
+            md5_hash = hashes.get("md5")
+            phash = parse_hash(hashes["phash"]) if dedupe_distance >= 0 and "phash" in hashes else None
+            near_index = None
+            if phash:
+                near_index = near_indexes.setdefault(phash[1], NearDuplicateIndex(dedupe_distance, phash[1]))
+            if ((md5_hash and self.hash_index.lookup_exact("md5", md5_hash))
+                    or (near_index and near_index.contains_near(phash[0]))):
+                stats["duplicates"] += 1
+                return
+            if near_index:
+                near_index.add(phash[0])
+            target_id = self._next_target_id()
+            self.target_hashes[target_id] = {
+                "description": target_description,
+                "tags": target_tags,
+                "added_date": datetime.now().isoformat(),
+                "source": source,
+                "hashes": hashes
+            }
+            self.hash_index.add(target_id, self.target_hashes[target_id])
+            batch.append(target_id)
+            stats["added"] += 1
+            if len(batch) >= self.IMPORT_BATCH_SIZE:
+                flush()
+        
+        def flush():
+            """Guarda el lote en una sola transacción"""
+            with self.target_store.transaction():
+                for target_id in batch:
+                    self.target_store.put(target_id, self.target_hashes[target_id])
+            batch.clear()
+            elapsed = time.monotonic() - start
+            print(f"   [{stats['read']} leídas | {stats['added']} agregadas | {stats['duplicates']} duplicadas | "
+                  f"{stats['failed']} errores] {stats['read'] / elapsed if elapsed else 0:.0f}/s", end='\r')
+        
+        def collect(name, future):
+            try:
+                hashes = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print_warning(f"No se pudo hashear {name}: {e}")
+                return
+            accept(description or os.path.basename(name), list(tags or []), name, hashes)
+        
+        # SQLite confirma cada lote; el JSON se reescribe una sola vez al final
+        whole_import = (nullcontext() if isinstance(self.target_store, SQLiteTargetStore)
+                        else self.target_store.transaction())
+        try:
+            with whole_import:
+                for kind, name, payload in iter_import_items(path):
+                    stats["read"] += 1
+                    if kind == "record":
+                        record_description, record_tags, source, hashes = _hash_record(payload, name)
+                        if not hashes:
+                            stats["failed"] += 1
+                            print_warning(f"Fila sin hashes válidos: {name}")
+                            continue
+                        accept(record_description or description, record_tags or list(tags or []), source, hashes)
+                        continue
+                    # Hashear en paralelo sin acumular más de max_in_flight imágenes en memoria
+                    future = self.hash_executor.submit(hash_target_bytes, payload, self.hash_executor.limits)
+                    in_flight.append((name, future))
+                    while len(in_flight) >= max_in_flight:
+                        collect(*in_flight.popleft())
+                while in_flight:
+                    collect(*in_flight.popleft())
+                if batch:
+                    flush()
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError, csv.Error) as e:
+            print_error(f"Error al leer {path}: {e}")
+        
+        elapsed = time.monotonic() - start
+        print()
+        print_success(f"Importación completada: {stats['added']} objetivos agregados, "
+                      f"{stats['duplicates']} duplicados omitidos, {stats['failed']} errores "
+                      f"({stats['read']} elementos en {elapsed:.1f}s)")
+        return stats
+    
+    def active_hash_types(self) -> List[str]:
+        """Tipos de hash a calcular en los escaneos (configurados o presentes en la DB)"""
+        if self.hash_types is not None:
+            return [t for t in HASH_TYPES if t in self.hash_types]
+        return self.hash_index.hash_types()
+
+    def _cached_hashes(self, cache_key: str, max_age: float = None) -> Dict[str, str]:
+        """
+        Hashes de la caché de resultados para cache_key, si cubren los tipos activos,
+        se calcularon con el mismo modo de decodificación y no tienen más de max_age segundos
+        """
+        now = time.time()
+        
+        def is_valid(entry):
+            return (self._usable_hashes(entry)
+                    and (max_age is None or now - entry.get("stored", 0) <= max_age))
+        
+        entry = self.result_cache.get(cache_key, is_valid)
+        if entry is None:
+            return {}
+        return {t: entry["hashes"][t] for t in self.active_hash_types()}
+    
+    def _usable_hashes(self, entry: Dict) -> bool:
+        """True si la entrada tiene todos los tipos activos y el mismo modo de decodificación"""
+        return (entry.get("reduced") == self.reduced_decode
+                and all(t in entry["hashes"] for t in self.active_hash_types()))
+    
+    def _revalidation(self, cache_key: str, usable=None) -> tuple:
+        """
+        Entrada vencida de la caché con ETag/Last-Modified y las cabeceras condicionales
+        para revalidarla. Devuelve (entrada, cabeceras) o (None, {}) si no se puede.
+        """
+        entry = self.result_cache.peek(cache_key)
+        if entry is None or (usable is not None and not usable(entry)):
+            return None, {}
+        headers = {}
+        if entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return (entry, headers) if headers else (None, {})
+    
+    def _not_modified(self, cache_key: str, entry: Dict) -> Dict:
+        """Respuesta 304: renueva la entrada revalidada y la devuelve"""
+        self.http_not_modified += 1
+        entry = dict(entry, stored=time.time())
+        self.result_cache.put(cache_key, entry)
+        return entry
+    
+    def _store_hashes(self, cache_key: str, image_hashes: Dict[str, str], **metadata):
+        """Guarda hashes en la caché de resultados (no los parciales del atajo exact_only)"""
+        if not image_hashes or not all(t in image_hashes for t in self.active_hash_types()):
+            return
+        self.result_cache.put(cache_key, {"hashes": image_hashes, "reduced": self.reduced_decode,
+                                          "stored": time.time(), **metadata})
+    
     def compute_image_hashes(self, image_url: str) -> Dict[str, str]:
-        """Calcula todos los hashes de una imagen desde URL"""
+        """Calcula todos los hashes de una imagen desde URL (o los toma de la caché)"""
+        cache_key = f"url:{image_url}"
+        cached = self._cached_hashes(cache_key, self.cache_ttl)
+        if cached:
+            return cached
+        entry, conditional_headers = self._revalidation(cache_key, self._usable_hashes)
         try:
-            response = requests.get(image_url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            img = Image.open(BytesIO(response.content))
-            
-            return {
-                "ahash": str(imagehash.average_hash(img)),
-                "phash": str(imagehash.phash(img)),
-                "dhash": str(imagehash.dhash(img)),
-                "whash": str(imagehash.whash(img)),
-                "md5": hashlib.md5(response.content).hexdigest()
-            }
-        except requests.exceptions.RequestException as req_err:
+            # El slot del host cubre toda la descarga, no solo las cabeceras
+            with self.rate_limiter.slot(image_url), \
+                    self.http_session.get(image_url, timeout=10, headers=conditional_headers,
+                                          stream=True) as response:
+                if response.status_code == 304 and entry:
+                    entry = self._not_modified(cache_key, entry)
+                    return {t: entry["hashes"][t] for t in self.active_hash_types()}
+                response.raise_for_status()
+                body = self._image_body(response.headers)
+                for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                    body.add(chunk)
+                image_data = body.finish()
+            image_hashes = self.compute_image_hashes_from_bytes(image_data)
+            self._store_hashes(cache_key, image_hashes, etag=response.headers.get('ETag'),
+                               last_modified=response.headers.get('Last-Modified'))
+            return image_hashes
+        except ImageRejected as e:
+            self.image_rejections[e.kind] += 1
+            return {}
+        except requests.exceptions.RequestException:
             return {}
         except Exception:
             return {}
     
+    def _image_body(self, headers) -> LimitedImageBody:
+        """Acumulador con los límites de descarga de imágenes web configurados"""
+        return LimitedImageBody(self.max_image_bytes, self.max_image_pixels, headers.get('Content-Length'))
+    
+    def _md5_precheck(self, image_data: bytes, hash_types: List[str]) -> tuple:
+        """
+        MD5 de los bytes crudos antes de decodificar: en modo exact_only una
+        coincidencia exacta evita la decodificación y los hashes perceptuales.
+        Devuelve (md5 o None, True si se puede omitir el resto).
+        """
+        md5_hash = hashlib.md5(image_data).hexdigest() if "md5" in hash_types else None
+        if md5_hash and self.exact_only and self.hash_index.lookup_exact("md5", md5_hash):
+            self.exact_shortcuts += 1
+            return md5_hash, True
+        return md5_hash, False
+    
     def compute_image_hashes_from_bytes(self, image_data: bytes) -> Dict[str, str]:
         """Calcula todos los hashes de una imagen desde bytes"""
         try:
-            img = Image.open(BytesIO(image_data))
+            hash_types = self.active_hash_types()
+            md5_hash, exact_hit = self._md5_precheck(image_data, hash_types)
+            if exact_hit:
+                return {"md5": md5_hash}
             
-            return {
-                "ahash": str(imagehash.average_hash(img)),
-                "phash": str(imagehash.phash(img)),
-                "dhash": str(imagehash.dhash(img)),
-                "whash": str(imagehash.whash(img)),
-                "md5": hashlib.md5(image_data).hexdigest()
-            }
-        except Exception as e:
+            # Los mismos bytes ya vistos (otra URL, un reenvío) no se vuelven a decodificar
+            content_key = f"md5:{md5_hash or hashlib.md5(image_data).hexdigest()}"
+            cached = self._cached_hashes(content_key)
+            if cached:
+                return cached
+            
+            image_hashes = self.hash_executor.hash(image_data, hash_types, self.reduced_decode)
+            if md5_hash:
+                image_hashes["md5"] = md5_hash
+            self._store_hashes(content_key, image_hashes)
+            return image_hashes
+        except ImageRejected as e:
+            self.image_rejections[e.kind] += 1
+            return {}
+        except Exception:
+            return {}
+    
+    async def compute_image_hashes_from_bytes_async(self, image_data: bytes) -> Dict[str, str]:
+        """Versión asíncrona: el hashing perceptual se ejecuta fuera del event loop"""
+        try:
+            hash_types = self.active_hash_types()
+            md5_hash, exact_hit = self._md5_precheck(image_data, hash_types)
+            if exact_hit:
+                return {"md5": md5_hash}
+            
+            content_key = f"md5:{md5_hash or hashlib.md5(image_data).hexdigest()}"
+            cached = self._cached_hashes(content_key)
+            if cached:
+                return cached
+            
+            image_hashes = await self.hash_executor.hash_async(image_data, hash_types, self.reduced_decode)
+            if md5_hash:
+                image_hashes["md5"] = md5_hash
+            self._store_hashes(content_key, image_hashes)
+            return image_hashes
+        except ImageRejected as e:
+            self.image_rejections[e.kind] += 1
+            return {}
+        except Exception:
             return {}
     
     def compare_hashes(self, hash1: str, hash2: str, threshold: int = 5) -> bool:
         """
         Compara dos hashes perceptuales (Hamming distance)
         """
-        try:
-            h1 = imagehash.hex_to_hash(hash1)
-            h2 = imagehash.hex_to_hash(hash2)
-            return (h1 - h2) <= threshold
-        except:
-            return hash1 == hash2 
+        parsed1 = parse_hash(hash1)
+        parsed2 = parse_hash(hash2)
+        if parsed1 is None or parsed2 is None or parsed1[1] != parsed2[1]:
+            return hash1 == hash2
+        return hamming_distance(parsed1[0], parsed2[0]) <= threshold
+    
+    def _find_matches(self, image_hashes: Dict[str, str], threshold: int = 5) -> List[tuple]:
+        """
+        Busca coincidencias usando el índice de hashes objetivo.
+        Devuelve [(target_id, target_data, match_type)] en el orden de la base de datos.
+        """
+        return self._find_matches_batch([image_hashes], threshold)[0]
+
+    def _find_matches_batch(self, batch: List[Dict[str, str]], threshold: int = 5) -> List[List[tuple]]:
+        """Igual que _find_matches() para un lote de imágenes, en una sola pasada del índice"""
+        results = []
+        for image_hits in self.hash_index.query_batch(batch, threshold):
+            image_results = []
+            for target_id, distances in image_hits:
+                match_type = []
+                for hash_type, distance in distances.items():
+                    if hash_type == "md5":
+                        match_type.append(f"{hash_type} (exacto)")
+                    else:
+                        match_type.append(f"{hash_type} (distancia: {distance})")
+                image_results.append((target_id, self.target_hashes[target_id], match_type))
+            results.append(image_results)
+        return results
     
     def check_image(self, image_url: str, source: str = "", threshold: int = 5) -> List[Dict]:
         """
         Verifica si una imagen coincide con alguna en la base de datos
         """
-        matches = []
         image_hashes = self.compute_image_hashes(image_url)
         
         if not image_hashes:
-            return matches
+            return []
         
-        # Comparar con cada hash objetivo
-        for target_id, target_data in self.target_hashes.items():
-            target_hashes = target_data.get("hashes")
-            
-            if not target_hashes:
-                continue
-                
-            match_found = False
-            match_type = []
-            
-            # Verificar cada tipo de hash
-            for hash_type in ["md5", "phash", "ahash", "dhash", "whash"]:
-                if hash_type in target_hashes and hash_type in image_hashes:
-                    if hash_type == "md5":
-                        if target_hashes[hash_type] == image_hashes[hash_type]:
-                            match_found = True
-                            match_type.append(f"{hash_type} (exacto)")
-                    else:
-                        if self.compare_hashes(target_hashes[hash_type], 
-                                              image_hashes[hash_type], 
-                                              threshold):
-                            match_found = True
-                            h1 = imagehash.hex_to_hash(target_hashes[hash_type])
-                            h2 = imagehash.hex_to_hash(image_hashes[hash_type])
-                            distance = h1 - h2
-                            match_type.append(f"{hash_type} (distancia: {distance})")
-            
-            if match_found:
-                match = {
-                    "target_id": target_id,
-                    "description": target_data["description"],
-                    "tags": target_data["tags"],
-                    "match_types": match_type,
-                    "found_url": image_url,
-                    "source": source,
-                    "timestamp": datetime.now().isoformat()
-                }
-                matches.append(match)
-                self.detected_matches.append(match)
+        return self._match_web_batch([(image_url, image_hashes)], source, threshold)
+
+    def _match_web_batch(self, batch: List[tuple], source: str = "", threshold: int = 5) -> List[Dict]:
+        """
+        Compara un lote de imágenes web ya hasheadas [(image_url, image_hashes)]
+        y reporta las coincidencias
+        """
+        matches = []
+        batch_results = self._find_matches_batch([image_hashes for _, image_hashes in batch], threshold)
+        for (image_url, _), image_results in zip(batch, batch_results):
+            matches.extend(self._report_web_matches(image_url, image_results, source))
+        return matches
+
+    def _report_web_matches(self, image_url: str, image_results: List[tuple], source: str = "") -> List[Dict]:
+        """Registra e imprime las coincidencias de una imagen web"""
+        matches = []
+        for target_id, target_data, match_type in image_results:
+            match = {
+                "target_id": target_id,
+                "description": target_data["description"],
+                "tags": target_data["tags"],
+                "match_types": match_type,
+                "found_url": image_url,
+                "source": source,
+                "timestamp": datetime.now().isoformat()
+            }
+            matches.append(match)
+            self.match_log.append(match)
                 
-                print(f"\n{MENU_SEPARATOR_THIN}")
-                print_detection("COINCIDENCIA DETECTADA")
-                print(f"   {Colors.BOLD}Target:{Colors.ENDC} {target_id} - {target_data['description']}")
-                print(f"   {Colors.BOLD}Match:{Colors.ENDC}  {', '.join(match_type)}")
-                print(f"   {Colors.BOLD}URL:{Colors.ENDC}    {image_url}")
-                print(f"   {Colors.BOLD}Fuente:{Colors.ENDC} {source}")
-                print(MENU_SEPARATOR_THIN)
+            print(f"\n{MENU_SEPARATOR_THIN}")
+            print_detection("COINCIDENCIA DETECTADA")
+            print(f"   {Colors.BOLD}Target:{Colors.ENDC} {target_id} - {target_data['description']}")
+            print(f"   {Colors.BOLD}Match:{Colors.ENDC}  {', '.join(match_type)}")
+            print(f"   {Colors.BOLD}URL:{Colors.ENDC}    {image_url}")
+            print(f"   {Colors.BOLD}Fuente:{Colors.ENDC} {source}")
+            print(MENU_SEPARATOR_THIN)
         
         return matches
     
@@ -394,60 +2727,49 @@ class ImageHashDetector:
         """
         Verifica si una imagen (desde bytes) coincide con alguna en la base de datos
         """
-        matches = []
         image_hashes = self.compute_image_hashes_from_bytes(image_data)
         
         if not image_hashes:
-            return matches
+            return []
         
-        # Comparar con cada hash objetivo
-        for target_id, target_data in self.target_hashes.items():
-            target_hashes = target_data.get("hashes")
-            
-            if not target_hashes:
-                continue
-                
-            match_found = False
-            match_type = []
-            
-            # Verificar cada tipo de hash
-            for hash_type in ["md5", "phash", "ahash", "dhash", "whash"]:
-                if hash_type in target_hashes and hash_type in image_hashes:
-                    if hash_type == "md5":
-                        if target_hashes[hash_type] == image_hashes[hash_type]:
-                            match_found = True
-                            match_type.append(f"{hash_type} (exacto)")
-                    else:
-                        if self.compare_hashes(target_hashes[hash_type], 
-                                              image_hashes[hash_type], 
-                                              threshold):
-                            match_found = True
-                            h1 = imagehash.hex_to_hash(target_hashes[hash_type])
-                            h2 = imagehash.hex_to_hash(image_hashes[hash_type])
-                            distance = h1 - h2
-                            match_type.append(f"{hash_type} (distancia: {distance})")
+        return self._match_telegram_batch([(image_hashes, message_info)], source, threshold)
+
+    def _match_telegram_batch(self, batch: List[tuple], source: str = "", threshold: int = 5) -> List[Dict]:
+        """
+        Compara un lote de imágenes de Telegram ya hasheadas [(image_hashes, message_info)]
+        y reporta las coincidencias
+        """
+        matches = []
+        batch_results = self._find_matches_batch([image_hashes for image_hashes, _ in batch], threshold)
+        for (image_hashes, message_info), image_results in zip(batch, batch_results):
+            matches.extend(self._report_telegram_matches(image_hashes, message_info, image_results, source))
+        return matches
+
+    def _report_telegram_matches(self, image_hashes: Dict[str, str], message_info: str,
+                                 image_results: List[tuple], source: str = "") -> List[Dict]:
+        """Registra e imprime las coincidencias de una imagen de Telegram"""
+        matches = []
+        for target_id, target_data, match_type in image_results:
+            match = {
+                "target_id": target_id,
+                "description": target_data["description"],
+                "tags": target_data["tags"],
+                "match_types": match_type,
+                "found_in": message_info,
+                "source": f"Telegram - {source}",
+                "timestamp": datetime.now().isoformat(),
+                "image_hashes": image_hashes
+            }
+            matches.append(match)
+            self.match_log.append(match)
             
-            if match_found:
-                match = {
-                    "target_id": target_id,
-                    "description": target_data["description"],
-                    "tags": target_data["tags"],
-                    "match_types": match_type,
-                    "found_in": message_info,
-                    "source": f"Telegram - {source}",
-                    "timestamp": datetime.now().isoformat(),
-                    "image_hashes": image_hashes
-                }
-                matches.append(match)
-                self.detected_matches.append(match)
-                
-                print(f"\n{MENU_SEPARATOR_THIN}")
-                print_detection("COINCIDENCIA DETECTADA EN TELEGRAM")
-                print(f"   {Colors.BOLD}Target:{Colors.ENDC} {target_id} - {target_data['description']}")
-                print(f"   {Colors.BOLD}Match:{Colors.ENDC}  {', '.join(match_type)}")
-                print(f"   {Colors.BOLD}Fuente:{Colors.ENDC} {source}")
-                print(f"   {Colors.BOLD}Info:{Colors.ENDC}   {message_info}")
-                print(MENU_SEPARATOR_THIN)
+            print(f"\n{MENU_SEPARATOR_THIN}")
+            print_detection("COINCIDENCIA DETECTADA EN TELEGRAM")
+            print(f"   {Colors.BOLD}Target:{Colors.ENDC} {target_id} - {target_data['description']}")
+            print(f"   {Colors.BOLD}Match:{Colors.ENDC}  {', '.join(match_type)}")
+            print(f"   {Colors.BOLD}Fuente:{Colors.ENDC} {source}")
+            print(f"   {Colors.BOLD}Info:{Colors.ENDC}   {message_info}")
+            print(MENU_SEPARATOR_THIN)
         
         return matches
     
@@ -459,59 +2781,531 @@ class ImageHashDetector:
         all_matches = []
         
         try:
-            response = requests.get(url, timeout=15, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status() 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            page_key = f"page:{url}"
+            entry, conditional_headers = self._revalidation(page_key)
+            pending = []
+            page = {"ready": threading.Event(), "total": 0}
+            images = SimpleQueue()
+            reader = threading.Thread(target=self._read_page, daemon=True,
+                                      args=(url, conditional_headers, pending, page, images))
+            reader.start()
+            page["ready"].wait()
+            if page.get("status") == 304 and entry:
+                reader.join()
+                total, pending = self._reuse_page(page_key, entry)
+                all_matches.extend(self._fetch_and_match_images(pending, total, source=url,
+                                                                threshold=threshold))
+            else:
+                # Las imágenes se encolan para descarga mientras la página sigue llegando
+                all_matches.extend(self._fetch_and_match_images(iter(images.get, None), source=url,
+                                                                threshold=threshold))
+                reader.join()
+                if "error" in page:
+                    raise page["error"]
+                total = page["total"]
+                self._store_page(page_key, total, pending, page["headers"])
             
-            # Encontrar todas las imágenes
-            images = soup.find_all('img')
-            print_info(f"Encontradas {Colors.BOLD}{len(images)}{Colors.ENDC} imágenes")
             print()
+            print_info(f"Encontradas {Colors.BOLD}{total}{Colors.ENDC} imágenes ({len(pending)} verificadas)")
+            print_success(f"Escaneo de {url} completado.")
             
-            # Formatos a ignorar que saturan el output o son incompatibles
-            IGNORED_EXTENSIONS = ('.svg', '.gif', '.ico', '.pdf', '.js', '.css') 
+        except requests.exceptions.RequestException as e:
+            print_error(f"Error de red/HTTP al escanear {url}: {e}")
+        except Exception as e:
+            print_error(f"Error general al escanear {url}: {e}")
+        
+        return all_matches
+    
+    def _store_page(self, page_key: str, total: int, pending: List[tuple], headers):
+        """Guarda las URLs extraídas de una página para reutilizarlas si responde 304"""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if etag or last_modified:
+            self.result_cache.put(page_key, {"total": total, "pending": pending, "etag": etag,
+                                             "last_modified": last_modified, "stored": time.time()})
+    
+    def _reuse_page(self, page_key: str, entry: Dict) -> tuple:
+        """Página sin cambios (304): devuelve (total, pendientes) del análisis anterior"""
+        entry = self._not_modified(page_key, entry)
+        print_info(f"Página sin cambios (304): se reutilizan {Colors.BOLD}{len(entry['pending'])}{Colors.ENDC} "
+                   f"imágenes del escaneo anterior")
+        print()
+        return entry["total"], [tuple(item) for item in entry["pending"]]
+    
+    def _accept_page_images(self, images: List[tuple], pending: List[tuple], verbose: bool = True) -> List[tuple]:
+        """
+        Filtra las imágenes [(índice, URL)] recién extraídas de una página, omitiendo
+        formatos ignorados, y añade las aceptadas a pending
+        """
+        accepted = []
+        for idx, img_url in images:
+            # Saltar formatos no soportados/irrelevantes
+            if urlparse(img_url).path.lower().endswith(IGNORED_EXTENSIONS):
+                if verbose:
+                    print(f"   [{idx}] {Colors.YELLOW}⏭️  Saltando {img_url.split('/')[-1]} "
+                          f"(Formato ignorado){Colors.ENDC}")
+                continue
+            accepted.append((idx, img_url))
+        pending.extend(accepted)
+        return accepted
 
-            for idx, img in enumerate(images, 1):
-                img_url = img.get('src') or img.get('data-src')
-                if not img_url:
-                    continue
-                
-                # Convertir URL relativa a absoluta
-                if img_url.startswith('//'):
-                    img_url = 'https:' + img_url
-                elif img_url.startswith('/'):
-                    from urllib.parse import urljoin
-                    img_url = urljoin(url, img_url)
-                elif not img_url.startswith('http'):
-                    continue
-                
-                # Saltar formatos no soportados/irrelevantes
-                if img_url.lower().endswith(IGNORED_EXTENSIONS):
-                     print(f"   [{idx}/{len(images)}] {Colors.YELLOW}⏭️  Saltando {img_url.split('/')[-1]} (Formato ignorado){Colors.ENDC}")
-                     continue
-                
-                print(f"   [{idx}/{len(images)}] {Colors.BLUE}🔍 Verificando imagen...{Colors.ENDC}", end='\r')
-                matches = self.check_image(img_url, source=url, threshold=threshold)
-                all_matches.extend(matches)
+    def _read_page(self, url: str, request_headers: Dict, pending: List[tuple], page: Dict, images: SimpleQueue):
+        """
+        Hilo lector de scan_webpage: descarga la página con el slot del host tomado
+        hasta cerrar la respuesta y encola en images cada (índice, URL) aceptada a
+        medida que el extractor procesa los bloques (None al terminar). Nunca espera
+        al consumidor, así que las imágenes del mismo host, que piden su propio slot,
+        no pueden bloquear la lectura. Deja en page status, headers, total y error,
+        y activa page["ready"] en cuanto se conoce la respuesta.
+        """
+        try:
+            with self.rate_limiter.slot(url), \
+                    self.http_session.get(url, timeout=15, headers=request_headers, stream=True) as response:
+                page["status"], page["headers"] = response.status_code, response.headers
+                if response.status_code == 304 and request_headers:
+                    return
+                response.raise_for_status()
+                page["ready"].set()
+                extractor = ImageURLExtractor(url, content_type_charset(response.headers.get('Content-Type')))
+                for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                    for item in self._accept_page_images(extractor.feed(chunk), pending):
+                        images.put(item)
+                for item in self._accept_page_images(extractor.close(), pending):
+                    images.put(item)
+                page["total"] = extractor.count
+        except Exception as e:
+            page["error"] = e
+        finally:
+            page["ready"].set()
+            images.put(None)
+    
+    def _fetch_and_match_images(self, pending, total: int = None, source: str = "",
+                                threshold: int = 5) -> List[Dict]:
+        """
+        Descarga y hashea en paralelo las imágenes (índice, URL) de pending con
+        fetch_workers hilos. pending puede ser un generador que las produce mientras
+        llega la página; como mucho hay 4 * fetch_workers descargas en curso.
+        La comparación y el reporte se hacen en este hilo, por lotes, a medida que llegan.
+        """
+        matches = []
+        batch = []
+        done = 0
+        submitted = 0
+        in_flight = {}
+        
+        def collect(finished):
+            nonlocal batch, done
+            for future in finished:
+                idx, img_url = in_flight.pop(future)
+                done += 1
+                image_hashes = future.result()
+                if image_hashes:
+                    batch.append((img_url, image_hashes))
                 
-                if not matches:
-                    # Limpiar la línea de "Verificando" si no hubo coincidencia
-                    sys.stdout.write(f"   [{idx}/{len(images)}] {Colors.GREEN}✓{Colors.ENDC} Verificada{' ' * 50}\r")
-                    sys.stdout.flush()
+                position = f"{idx}/{total}" if total else idx
+                sys.stdout.write(f"   [{position}] {Colors.GREEN}✓{Colors.ENDC} Verificada "
+                                 f"({done}/{submitted}){' ' * 40}\r")
+                sys.stdout.flush()
                 
-                time.sleep(0.1) # Pausa mínima
+                if len(batch) >= self.MATCH_BATCH_SIZE:
+                    matches.extend(self._match_web_batch(batch, source=source, threshold=threshold))
+                    batch = []
+        
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            print(f"   {Colors.BLUE}🔍 Verificando imágenes...{Colors.ENDC}", end='\r')
+            for idx, img_url in pending:
+                in_flight[executor.submit(self.compute_image_hashes, img_url)] = (idx, img_url)
+                submitted += 1
+                if len(in_flight) >= 4 * self.fetch_workers:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            collect(as_completed(list(in_flight)))
+        
+        if batch:
+            matches.extend(self._match_web_batch(batch, source=source, threshold=threshold))
+        return matches
+    
+    # ============================================================================
+    # ESCÁNER WEB ASÍNCRONO
+    # ============================================================================
+    
+    # Tiempo máximo por petición HTTP del escáner asíncrono (segundos)
+    ASYNC_REQUEST_TIMEOUT = 15
+    # Tamaño de bloque al leer cuerpos HTTP en streaming
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    def _create_aiohttp_session(self, extra_connections: int = 0):
+        """Crea la sesión aiohttp con límites de conexiones globales y por host"""
+        connector = aiohttp.TCPConnector(limit=self.fetch_workers + extra_connections,
+                                         limit_per_host=self.rate_limiter.max_connections)
+        timeout = aiohttp.ClientTimeout(total=self.ASYNC_REQUEST_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={'User-Agent': DEFAULT_USER_AGENT})
+    
+    async def _fetch_image_async(self, session, url: str, request_headers: Dict = None) -> tuple:
+        """
+        Descarga una imagen leyendo el cuerpo en streaming y cortándolo en cuanto la
+        cabecera o el tamaño la descartan (ImageRejected). Devuelve (cuerpo, cabeceras);
+        el cuerpo es None si una petición condicional responde 304.
+        """
+        async with self.rate_limiter.async_slot(url):
+            async with session.get(url, headers=request_headers) as response:
+                if response.status == 304 and request_headers:
+                    return None, response.headers
+                response.raise_for_status()
+                body = self._image_body(response.headers)
+                async for chunk in response.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                    body.add(chunk)
+                return body.finish(), response.headers
+    
+    async def _compute_image_hashes_async(self, session, semaphore, image_url: str) -> tuple:
+        """
+        Descarga una imagen sin bloquear el loop y la hashea fuera de él.
+        El semáforo cubre descarga y hashing, así que como mucho hay semaphore
+        cuerpos de imagen en memoria. Devuelve (image_url, image_hashes).
+        """
+        cache_key = f"url:{image_url}"
+        cached = self._cached_hashes(cache_key, self.cache_ttl)
+        if cached:
+            return image_url, cached
+        entry, conditional_headers = self._revalidation(cache_key, self._usable_hashes)
+        async with semaphore:
+            try:
+                image_data, headers = await self._fetch_image_async(session, image_url, conditional_headers)
+            except ImageRejected as e:
+                self.image_rejections[e.kind] += 1
+                return image_url, {}
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return image_url, {}
+            if image_data is None:
+                entry = self._not_modified(cache_key, entry)
+                return image_url, {t: entry["hashes"][t] for t in self.active_hash_types()}
+            image_hashes = await self.compute_image_hashes_from_bytes_async(image_data)
+        self._store_hashes(cache_key, image_hashes, etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'))
+        return image_url, image_hashes
+    
+    async def scan_webpage_async(self, url: str, threshold: int = 5, session=None,
+                                 semaphore: asyncio.Semaphore = None) -> List[Dict]:
+        """
+        Versión asíncrona de scan_webpage: descarga las imágenes con concurrencia
+        acotada sobre el event loop de Telegram (semaphore se comparte entre páginas)
+        """
+        if session is None:
+            async with self._create_aiohttp_session() as own_session:
+                return await self.scan_webpage_async(url, threshold, own_session, semaphore)
+        
+        print_section_header(f"Escaneando: {url}")
+        all_matches = []
+        
+        try:
+            semaphore = semaphore or asyncio.Semaphore(self.fetch_workers)
+            all_matches, total, verified = await self._scan_page_async(session, url, threshold, semaphore)
             
             print()
+            print_info(f"Encontradas {Colors.BOLD}{total}{Colors.ENDC} imágenes ({verified} verificadas)")
             print_success(f"Escaneo de {url} completado.")
             
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print_error(f"Error de red/HTTP al escanear {url}: {e}")
         except Exception as e:
             print_error(f"Error general al escanear {url}: {e}")
         
         return all_matches
+
+    async def _scan_page_async(self, session, url: str, threshold: int, semaphore,
+                               links: List[str] = None, seen_images: "SeenSet" = None,
+                               verbose: bool = True) -> tuple:
+        """
+        Descarga una página en streaming, hashea sus imágenes a medida que aparecen
+        (como mucho semaphore descargas a la vez y 4 * fetch_workers tareas por página;
+        el resto de URLs espera en cola sin frenar la lectura, que tiene tomado el slot
+        del host) y devuelve (coincidencias, imágenes encontradas, imágenes verificadas).
+        Para el crawler: con links se añaden ahí los enlaces de la página (sin revalidar
+        con 304, porque la caché de páginas no guarda enlaces) y las respuestas que no
+        son HTML devuelven ([], None, 0); con seen_images se omiten las imágenes ya vistas.
+        """
+        page_key = f"page:{url}"
+        entry, conditional_headers = self._revalidation(page_key) if links is None else (None, None)
+        queued = deque()
+        active = set()
+        matches = []
+        batch = []
+        done = 0
+        submitted = 0
+        
+        def launch():
+            while queued and len(active) < 4 * self.fetch_workers:
+                active.add(asyncio.ensure_future(
+                    self._compute_image_hashes_async(session, semaphore, queued.popleft())))
+        
+        def start(images):
+            nonlocal submitted
+            for _, img_url in self._accept_page_images(images, pending, verbose):
+                if seen_images is None or seen_images.add(img_url):
+                    queued.append(img_url)
+                    submitted += 1
+            launch()
+        
+        def collect(finished):
+            nonlocal batch, done
+            for task in finished:
+                active.discard(task)
+                img_url, image_hashes = task.result()
+                done += 1
+                if image_hashes:
+                    batch.append((img_url, image_hashes))
+                
+                if verbose:
+                    sys.stdout.write(f"   [{done}/{submitted}] {Colors.GREEN}✓{Colors.ENDC} Verificada{' ' * 50}\r")
+                    sys.stdout.flush()
+                
+                if len(batch) >= self.MATCH_BATCH_SIZE:
+                    matches.extend(self._match_web_batch(batch, source=url, threshold=threshold))
+                    batch = []
+            launch()
+        
+        try:
+            async with self.rate_limiter.async_slot(url):
+                async with session.get(url, headers=conditional_headers) as response:
+                    if response.status == 304 and conditional_headers:
+                        total, pending = self._reuse_page(page_key, entry)
+                        queued.extend(img_url for _, img_url in pending)
+                        submitted = len(queued)
+                        launch()
+                    else:
+                        response.raise_for_status()
+                        content_type = response.headers.get('Content-Type', '')
+                        if links is not None and 'html' not in content_type.lower():
+                            return [], None, 0
+                        # Cada imagen empieza a descargarse en cuanto aparece en el HTML
+                        extractor = ImageURLExtractor(url, content_type_charset(content_type),
+                                                      collect_links=links is not None)
+                        pending = []
+                        async for chunk in response.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                            start(extractor.feed(chunk))
+                            collect([task for task in active if task.done()])
+                        start(extractor.close())
+                        total = extractor.count
+                        if links is not None:
+                            links.extend(extractor.take_links())
+                        self._store_page(page_key, total, pending, response.headers)
+            
+            while active:
+                finished, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                collect(finished)
+        finally:
+            for task in active:
+                task.cancel()
+        
+        if batch:
+            matches.extend(self._match_web_batch(batch, source=url, threshold=threshold))
+        return matches, total, submitted
+    
+    # Páginas que scan_webpages_async escanea a la vez
+    ASYNC_PAGE_WORKERS = 4
+
+    async def scan_webpages_async(self, urls: List[str], threshold: int = 5) -> List[Dict]:
+        """
+        Escanea varias páginas compartiendo una sesión HTTP: ASYNC_PAGE_WORKERS tareas
+        toman las URLs de la lista y todas comparten un semáforo de fetch_workers
+        descargas, de modo que páginas, tareas e imágenes en memoria quedan acotadas
+        aunque la lista sea larga
+        """
+        results = [[] for _ in urls]
+        remaining = iter(enumerate(urls))
+        semaphore = asyncio.Semaphore(self.fetch_workers)
+        
+        async def worker(session):
+            for position, url in remaining:
+                results[position] = await self.scan_webpage_async(url, threshold, session, semaphore)
+        
+        workers = min(self.ASYNC_PAGE_WORKERS, len(urls))
+        async with self._create_aiohttp_session(extra_connections=workers) as session:
+            await asyncio.gather(*(worker(session) for _ in range(workers)))
+        return [match for matches in results for match in matches]
+    
+    def scan_webpages(self, urls: List[str], threshold: int = 5) -> List[Dict]:
+        """
+        Escanea varias páginas con el escáner asíncrono sobre el event loop de
+        Telegram (o secuencialmente si aiohttp no está instalado)
+        """
+        if not AIOHTTP_AVAILABLE:
+            print_warning("aiohttp no disponible, se usa el escáner síncrono. Instala con: pip install aiohttp")
+            matches = []
+            for url in urls:
+                matches.extend(self.scan_webpage(url, threshold))
+                print()
+            return matches
+        return TelegramLoopManager.run_async(self.scan_webpages_async(urls, threshold))
+    
+    # ============================================================================
+    # CRAWLER WEB
+    # ============================================================================
+    
+    def crawl(self, start_urls: List[str], threshold: int = 5, max_depth: int = 2, max_pages: int = 1000,
+              max_pages_per_host: int = 200, workers: int = 16, any_host: bool = False,
+              respect_robots: bool = True, bloom_capacity: int = 10000000) -> Dict:
+        """
+        Rastrea sitios a partir de start_urls escaneando las imágenes de cada página
+        y siguiendo sus enlaces en anchura hasta max_depth, con límites de páginas
+        totales y por host. Por defecto solo sigue enlaces de los hosts iniciales y
+        respeta robots.txt (incluido Crawl-delay). Ctrl+C detiene el rastreo y
+        exporta lo encontrado. Devuelve las estadísticas del rastreo.
+        """
+        if not AIOHTTP_AVAILABLE:
+            print_error("El crawler necesita aiohttp. Instala con: pip install aiohttp")
+            return {}
+        
+        print_section_header("RASTREO WEB")
+        print_info(f"{len(start_urls)} URL(s) inicial(es) | profundidad {max_depth} | máx. {max_pages} páginas "
+                   f"({max_pages_per_host} por host) | {workers} páginas simultáneas")
+        stats = {"pages": 0, "scheduled": 0, "failed": 0, "skipped": 0, "robots_blocked": 0,
+                 "images": 0, "verified": 0, "matches": 0}
+        log_mark = self.match_log.mark()
+        start = time.monotonic()
+        try:
+            TelegramLoopManager.run_until_interrupted(self._crawl_async(
+                start_urls, threshold, max_depth, max_pages, max_pages_per_host, workers,
+                any_host, respect_robots, bloom_capacity, stats))
+        except KeyboardInterrupt:
+            print_warning("Rastreo interrumpido")
+        elapsed = time.monotonic() - start
+        
+        stats["seconds"] = round(elapsed, 2)
+        stats["pages_per_second"] = round(stats["pages"] / elapsed, 2) if elapsed else 0.0
+        print()
+        print_section_header("RESUMEN DEL RASTREO")
+        print_info(f"Páginas: {stats['pages']} escaneadas de {stats['scheduled']} encoladas | "
+                   f"errores: {stats['failed']} | no HTML: {stats['skipped']} | "
+                   f"bloqueadas por robots.txt: {stats['robots_blocked']}")
+        print_info(f"Imágenes: {stats['images']} encontradas, {stats['verified']} verificadas | "
+                   f"coincidencias: {stats['matches']}")
+        print_info(f"Duración: {stats['seconds']}s ({stats['pages_per_second']} páginas/s) | "
+                   f"URLs vistas: {stats.get('seen', 0)}")
+        
+        if stats["matches"]:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            print_section_header("EXPORTANDO RESULTADOS AUTOMÁTICAMENTE")
+            self.export_matches(f"reporte_crawl_{timestamp}.json", since=log_mark)
+        else:
+            print_warning("Rastreo completado. No se encontraron coincidencias para exportar.")
+        return stats
+
+    async def _crawl_async(self, start_urls: List[str], threshold: int, max_depth: int, max_pages: int,
+                           max_pages_per_host: int, workers: int, any_host: bool, respect_robots: bool,
+                           bloom_capacity: int, stats: Dict):
+        """
+        Frontera FIFO de (URL, profundidad) consumida por workers tareas. Las URLs
+        de páginas e imágenes ya vistas se descartan con SeenSet (exacto y luego
+        filtro de Bloom), y stats se actualiza en el sitio para conservarlo si el
+        rastreo se interrumpe. max_pages y max_pages_per_host cuentan solo páginas
+        descargadas y analizadas: las bloqueadas por robots.txt, las que no son
+        HTML y las que fallan no gastan el presupuesto.
+        """
+        frontier = asyncio.Queue()
+        seen_pages = SeenSet(bloom_capacity=bloom_capacity)
+        seen_images = SeenSet(bloom_capacity=bloom_capacity)
+        # Páginas escaneadas y en curso por host (None = todas)
+        host_pages = {}
+        in_progress = {}
+        budget = asyncio.Condition()
+        allowed_hosts = {urlparse(normalize_url(url)).netloc for url in start_urls}
+        robots = RobotsPolicy(DEFAULT_USER_AGENT, self.rate_limiter) if respect_robots else None
+        
+        def budget_spent(host: str, counting_in_progress: bool = False) -> bool:
+            pages, per_host = stats["pages"], host_pages.get(host, 0)
+            if counting_in_progress:
+                pages += in_progress.get(None, 0)
+                per_host += in_progress.get(host, 0)
+            return pages >= max_pages or per_host >= max_pages_per_host
+        
+        async def reserve(host: str) -> bool:
+            """
+            Aparta un lugar del presupuesto antes de descargar; si solo lo ocupan
+            páginas en curso espera a que terminen (pueden no contar). False si se agotó.
+            """
+            async with budget:
+                while budget_spent(host, counting_in_progress=True):
+                    if budget_spent(host):
+                        return False
+                    await budget.wait()
+                for key in (None, host):
+                    in_progress[key] = in_progress.get(key, 0) + 1
+                return True
+        
+        async def release(host: str, scanned: bool):
+            """Libera el lugar apartado; solo cuenta como página si se analizó"""
+            async with budget:
+                for key in (None, host):
+                    in_progress[key] -= 1
+                if scanned:
+                    stats["pages"] += 1
+                    host_pages[host] = host_pages.get(host, 0) + 1
+                budget.notify_all()
+        
+        def schedule(url: str, depth: int):
+            url = normalize_url(url)
+            parsed = urlparse(url)
+            host = parsed.netloc
+            if budget_spent(host):
+                return
+            if not any_host and host not in allowed_hosts:
+                return
+            if parsed.path.lower().endswith(CRAWL_SKIPPED_EXTENSIONS) or not seen_pages.add(url):
+                return
+            stats["scheduled"] += 1
+            frontier.put_nowait((url, depth))
+        
+        async def worker(session, semaphore):
+            while True:
+                url, depth = await frontier.get()
+                host = urlparse(url).netloc
+                try:
+                    if budget_spent(host):
+                        continue
+                    if robots and not await robots.allowed(session, url):
+                        stats["robots_blocked"] += 1
+                        continue
+                    if not await reserve(host):
+                        continue
+                    links = []
+                    found = None
+                    try:
+                        matches, found, verified = await self._scan_page_async(
+                            session, url, threshold, semaphore, links=links, seen_images=seen_images, verbose=False)
+                    finally:
+                        await release(host, found is not None)
+                    if found is None:
+                        stats["skipped"] += 1
+                        continue
+                    stats["images"] += found
+                    stats["verified"] += verified
+                    stats["matches"] += len(matches)
+                    print(f"   [{stats['pages']}/{stats['scheduled']}] {Colors.GRAY}p{depth}{Colors.ENDC} {url} "
+                          f"→ {found} imágenes, {len(matches)} coincidencias")
+                    if depth < max_depth:
+                        for link in links:
+                            schedule(link, depth + 1)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    stats["failed"] += 1
+                    print_error(f"Error de red/HTTP en {url}: {e}")
+                except Exception as e:
+                    stats["failed"] += 1
+                    print_error(f"Error general en {url}: {e}")
+                finally:
+                    stats["seen"] = len(seen_pages) + len(seen_images)
+                    frontier.task_done()
+        
+        for url in start_urls:
+            schedule(url, 0)
+        async with self._create_aiohttp_session(extra_connections=workers) as session:
+            semaphore = asyncio.Semaphore(self.fetch_workers)
+            tasks = [asyncio.ensure_future(worker(session, semaphore)) for _ in range(max(1, workers))]
+            try:
+                await frontier.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
     
     # ============================================================================
     # FUNCIONALIDADES DE TELEGRAM 
@@ -615,14 +3409,136 @@ class ImageHashDetector:
         except Exception as e:
             raise Exception(f"No se pudo encontrar el grupo: {group_identifier}. Error: {e}")
 
-    async def _scan_telegram_group_async(self, group_identifier: str, limit_messages: int = 100, threshold: int = 5):
+    async def _telegram_call(self, request_factory, max_retries: int = 5):
+        """
+        Ejecuta una llamada a Telegram respetando FloodWait: si el servidor pide
+        esperar, todas las tareas pausan ese tiempo y la llamada se reintenta.
+        """
+        for attempt in range(max_retries + 1):
+            await self._respect_flood_wait()
+            try:
+                return await request_factory()
+            except FloodWaitError as e:
+                if attempt == max_retries:
+                    raise
+                self._register_flood_wait(e)
+
+    async def _respect_flood_wait(self):
+        """Espera si alguna tarea recibió un FloodWait que aún no venció"""
+        wait = self._flood_wait_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _register_flood_wait(self, error):
+        """Registra la espera pedida por Telegram para todas las tareas"""
+        self._flood_wait_until = max(self._flood_wait_until, time.monotonic() + error.seconds + 1)
+        print_warning(f"Telegram pidió esperar {error.seconds}s (FloodWait). Reintentando...")
+
+    async def _message_info(self, message) -> str:
+        """Resuelve el remitente y arma la descripción del mensaje"""
+        sender = await self._telegram_call(message.get_sender)
+        sender_name = getattr(sender, 'username', getattr(sender, 'first_name', 'Unknown'))
+        return f"MsgID: {message.id} | From: {sender_name} | Date: {message.date}"
+
+    async def _download_media_bytes(self, message, thumb=None):
+        """Descarga el medio de un mensaje (o una de sus miniaturas) a memoria"""
+        image_data = await self._telegram_call(
+            lambda: self.telegram_client.download_media(message.media, file=BytesIO(), thumb=thumb))
+        
+        # Verificar si es realmente una imagen descargable
+        if image_data and hasattr(image_data, 'getvalue'):
+            image_data = image_data.getvalue()
+        return image_data or None
+
+    @staticmethod
+    def _telegram_media_key(media) -> str:
+        """Clave de caché estable de una foto o documento de Telegram (se mantiene al reenviarlo)"""
+        if isinstance(media, MessageMediaPhoto) and getattr(media, 'photo', None):
+            return f"tg:photo:{media.photo.id}:{media.photo.access_hash}"
+        if isinstance(media, MessageMediaDocument) and getattr(media, 'document', None):
+            return f"tg:document:{media.document.id}:{media.document.access_hash}"
+        return None
+
+    def _select_thumbnail(self, media):
+        """
+        Elige la miniatura más chica cuyo lado menor alcanza thumbnail_min_size.
+        Devuelve None si no hay ninguna útil o si la única es la imagen completa.
+        """
+        if isinstance(media, MessageMediaPhoto) and media.photo:
+            sizes = getattr(media.photo, 'sizes', None) or []
+        elif isinstance(media, MessageMediaDocument) and media.document:
+            sizes = getattr(media.document, 'thumbs', None) or []
+        else:
+            return None
+        
+        sized = [size for size in sizes if getattr(size, 'w', None) and getattr(size, 'h', None)]
+        candidates = [size for size in sized if min(size.w, size.h) >= self.thumbnail_min_size]
+        if not candidates:
+            return None
+        thumb = min(candidates, key=lambda size: size.w * size.h)
+        largest = max(sized, key=lambda size: size.w * size.h)
+        if isinstance(media, MessageMediaPhoto) and thumb is largest:
+            return None
+        return thumb
+
+    async def _hash_message_image(self, message, threshold: int = 5) -> Dict[str, str]:
+        """
+        Descarga y hashea la imagen de un mensaje. En modo thumbnail_first primero
+        hashea una miniatura y solo descarga el archivo completo si la miniatura cae
+        dentro de threshold + suspicious_band de algún objetivo (o si se pide MD5).
+        """
+        cache_key = self._telegram_media_key(message.media)
+        if cache_key:
+            cached = self._cached_hashes(cache_key)
+            if cached:
+                return cached
+        
+        perceptual_types = [t for t in self.active_hash_types() if t != "md5"]
+        needs_full = not perceptual_types or (self.verify_md5 and "md5" in self.active_hash_types())
+        
+        if self.thumbnail_first and not needs_full:
+            thumb = self._select_thumbnail(message.media)
+            if thumb is not None:
+                thumb_hashes = {}
+                thumb_bytes = await self._download_media_bytes(message, thumb=thumb)
+                if thumb_bytes:
+                    try:
+                        thumb_hashes = await self.hash_executor.hash_async(thumb_bytes, perceptual_types,
+                                                                           self.reduced_decode)
+                    except ImageRejected as e:
+                        self.image_rejections[e.kind] += 1
+                    except Exception:
+                        thumb_hashes = {}
+                if thumb_hashes and not self.hash_index.query(thumb_hashes, threshold + self.suspicious_band):
+                    self.thumbnail_stats["discarded"] += 1
+                    return {}
+                self.thumbnail_stats["full"] += 1
+        
+        image_bytes = await self._download_media_bytes(message)
+        if not image_bytes:
+            return {}
+        image_hashes = await self.compute_image_hashes_from_bytes_async(image_bytes)
+        if cache_key:
+            self._store_hashes(cache_key, image_hashes)
+        return image_hashes
+
+    async def _scan_telegram_group_async(self, group_identifier: str, limit_messages: int = 100, threshold: int = 5,
+                                         summary: Dict = None):
         """
-        Escanea un grupo/canal de Telegram en busca de imágenes que coincidan (versión asíncrona MEJORADA)
+        Escanea un grupo/canal de Telegram en busca de imágenes que coincidan (versión asíncrona MEJORADA).
+        Los mensajes se leen en streaming con iter_messages; un productor encola los que
+        tienen imagen en una cola acotada y telegram_downloads tareas los descargan,
+        hashean fuera del loop y comparan por lotes, con memoria constante.
+        Si el chat tiene checkpoint solo se leen los mensajes posteriores, del más
+        antiguo al más nuevo, de modo que un límite corto no deja huecos.
+        Si se pasa summary, se completa con los contadores del escaneo.
         """
         if not self.telegram_client or not self.telegram_connected:
             return []
         
         matches_found = []
+        stats = {"messages": 0, "processed": 0, "failed": 0, "highest_id": 0, "first_failed_id": 0}
+        group_name = group_identifier
         
         try:
             # Resolución robusta de entidades
@@ -631,52 +3547,184 @@ class ImageHashDetector:
             
             print_info(f"Escaneando grupo: {group_name}")
             
-            # Obtener mensajes
-            messages = await self.telegram_client.get_messages(entity, limit=limit_messages)
+            print_info(f"Analizando hasta {limit_messages} mensajes...")
+            
+            checkpoint = 0 if self.full_rescan else self.checkpoints.get(entity.id)
+            if checkpoint:
+                print_info(f"Reanudando desde el mensaje {checkpoint} (usa --full-rescan para escanear todo)")
             
-            print_info(f"Analizando {len(messages)} mensajes...")
+            # La cola acotada frena la lectura de mensajes si las descargas van atrasadas
+            queue = asyncio.Queue(maxsize=self.telegram_downloads * 2)
+            # Imágenes ya hasheadas pendientes de comparar en lote
+            batch = []
+            def iter_new_messages(remaining, last_id):
+                if checkpoint:
+                    # En orden ascendente min_id actúa como offset para reanudar
+                    return self.telegram_client.iter_messages(entity, limit=remaining, reverse=True,
+                                                              min_id=max(checkpoint, last_id))
+                return self.telegram_client.iter_messages(entity, limit=remaining, offset_id=last_id)
             
-            for i, message in enumerate(messages, 1):
-                if message.media:
-                    # Verificar si es una imagen
-                    if isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument)):
+            async def producer():
+                last_id = 0
+                try:
+                    while True:
+                        remaining = limit_messages - stats["messages"] if limit_messages else None
+                        if remaining is not None and remaining <= 0:
+                            break
                         try:
-                            print(f"   [{i}/{len(messages)}] Procesando imagen...", end='\r')
-                            
-                            # Descargar la imagen
-                            image_data = await self.telegram_client.download_media(message.media, file=BytesIO())
-                            
-                            if image_data:
-                                # Verificar si es realmente una imagen descargable
-                                if hasattr(image_data, 'getvalue'):
-                                    image_bytes = image_data.getvalue()
-                                else:
-                                    image_bytes = image_data
-                                
-                                # Crear información del mensaje
-                                sender = await message.get_sender()
-                                sender_name = getattr(sender, 'username', getattr(sender, 'first_name', 'Unknown'))
-                                message_info = f"MsgID: {message.id} | From: {sender_name} | Date: {message.date}"
-                                
-                                # Verificar la imagen
-                                matches = self.check_image_from_bytes(
-                                    image_bytes, 
-                                    source=group_name,
-                                    message_info=message_info,
-                                    threshold=threshold
-                                )
-                                matches_found.extend(matches)
-                                
-                        except Exception as e:
-                            continue  # Saltar si no se puede procesar la imagen
+                            async for message in iter_new_messages(remaining, last_id):
+                                stats["messages"] += 1
+                                last_id = message.id
+                                stats["highest_id"] = max(stats["highest_id"], message.id)
+                                # Verificar si es una imagen
+                                if message.media and isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument)):
+                                    await queue.put(message)
+                            break
+                        except FloodWaitError as e:
+                            # Reanudar la lectura desde el último mensaje recibido
+                            self._register_flood_wait(e)
+                            await self._respect_flood_wait()
+                finally:
+                    for _ in range(self.telegram_downloads):
+                        await queue.put(None)
+            
+            async def worker():
+                nonlocal batch
+                while True:
+                    message = await queue.get()
+                    if message is None:
+                        return
+                    try:
+                        # Remitente y descarga + hashing en paralelo
+                        message_info, image_hashes = await asyncio.gather(
+                            self._message_info(message), self._hash_message_image(message, threshold))
+                        if image_hashes:
+                            batch.append((image_hashes, message_info))
+                    except Exception as e:
+                        stats["failed"] += 1
+                        if not stats["first_failed_id"] or message.id < stats["first_failed_id"]:
+                            stats["first_failed_id"] = message.id
+                        print_warning(f"No se pudo procesar el mensaje {message.id}: {e}")
+                    stats["processed"] += 1
+                    print(f"   [{stats['messages']} mensajes | {stats['processed']} imágenes | "
+                          f"{len(matches_found)} coincidencias] Procesando...", end='\r')
+                    
+                    if len(batch) >= self.MATCH_BATCH_SIZE:
+                        pending, batch = batch, []
+                        matches_found.extend(self._match_telegram_batch(pending, group_name, threshold))
+            
+            await asyncio.gather(producer(), *(worker() for _ in range(self.telegram_downloads)))
+            
+            if batch:
+                matches_found.extend(self._match_telegram_batch(batch, group_name, threshold))
             
+            # Avanzar el checkpoint del chat solo hasta justo antes del primer mensaje
+            # que falló (min_id es exclusivo), para que el siguiente escaneo lo reintente
+            last_done_id = stats["highest_id"]
+            if stats["first_failed_id"]:
+                last_done_id = min(last_done_id, stats["first_failed_id"] - 1)
+                print_warning(f"El checkpoint se mantiene antes del mensaje {stats['first_failed_id']} "
+                              f"para reintentar los fallidos en el próximo escaneo")
+            self.checkpoints.update(entity.id, last_done_id, group_name)
+            
+            print()
+            print_info(f"Analizados {stats['messages']} mensajes, {stats['processed']} imágenes")
+            if self.thumbnail_first:
+                print_info(f"Miniaturas descartadas sin descarga completa: {self.thumbnail_stats['discarded']} | "
+                           f"Descargas completas: {self.thumbnail_stats['full']}")
+            if stats["failed"]:
+                print_warning(f"{stats['failed']} de {stats['processed']} imágenes no se pudieron procesar")
             print_success(f"Escaneo de {group_name} completado. Encontradas: {len(matches_found)} coincidencias")
             
         except Exception as e:
             print_error(f"Error al escanear grupo {group_identifier}: {e}")
+            if summary is not None:
+                summary["error"] = str(e)
         
+        if summary is not None:
+            summary.update(group=group_identifier, name=group_name, messages=stats["messages"],
+                           images=stats["processed"], failed=stats["failed"], matches=len(matches_found))
         return matches_found
 
+    async def _scan_telegram_groups_async(self, groups: List[str], limit_messages: int = 100, threshold: int = 5,
+                                          concurrency: int = 4):
+        """
+        Escanea varios grupos a la vez sobre el mismo cliente. Un semáforo global
+        limita cuántos grupos se escanean en paralelo; cada grupo usa sus propias
+        descargas concurrentes. Devuelve (coincidencias, resumen por grupo).
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def scan_one(group):
+            summary = {}
+            async with semaphore:
+                start = time.monotonic()
+                matches = await self._scan_telegram_group_async(group, limit_messages, threshold, summary)
+                elapsed = time.monotonic() - start
+            summary["seconds"] = round(elapsed, 2)
+            summary["messages_per_second"] = round(summary.get("messages", 0) / elapsed, 2) if elapsed else 0.0
+            summary["images_per_second"] = round(summary.get("images", 0) / elapsed, 2) if elapsed else 0.0
+            return matches, summary
+        
+        results = await asyncio.gather(*(scan_one(group) for group in groups))
+        matches = [match for group_matches, _ in results for match in group_matches]
+        return matches, [summary for _, summary in results]
+
+    def scan_telegram_groups(self, groups: List[str], limit_messages: int = 100, threshold: int = 5,
+                             concurrency: int = 4) -> List[Dict]:
+        """
+        Escanea varios grupos/canales de forma concurrente y exporta un único
+        reporte consolidado con tiempos y rendimiento de cada grupo
+        """
+        groups = [group for group in groups if group]
+        print_telegram(f"Iniciando escaneo de {len(groups)} grupos ({max(1, concurrency)} en paralelo)")
+        start = time.monotonic()
+        matches, summaries = TelegramLoopManager.run_async(
+            self._scan_telegram_groups_async(groups, limit_messages, threshold, concurrency))
+        elapsed = time.monotonic() - start
+        
+        print_section_header("RESUMEN POR GRUPO")
+        for summary in summaries:
+            line = (f"  • {summary.get('name', summary.get('group'))}: {summary.get('messages', 0)} mensajes, "
+                    f"{summary.get('images', 0)} imágenes, {summary.get('matches', 0)} coincidencias "
+                    f"en {summary['seconds']}s ({summary['images_per_second']} img/s)")
+            if summary.get("error"):
+                print_error(f"{line} - error: {summary['error']}")
+            else:
+                print(line)
+        
+        totals = {
+            "groups": len(summaries),
+            "messages": sum(summary.get("messages", 0) for summary in summaries),
+            "images": sum(summary.get("images", 0) for summary in summaries),
+            "matches": len(matches),
+            "seconds": round(elapsed, 2),
+        }
+        totals["images_per_second"] = round(totals["images"] / elapsed, 2) if elapsed else 0.0
+        print_info(f"Total: {totals['messages']} mensajes, {totals['images']} imágenes, "
+                   f"{totals['matches']} coincidencias en {totals['seconds']}s ({totals['images_per_second']} img/s)")
+        
+        # Reporte consolidado: resumen por grupo + coincidencias de todos los grupos
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"reporte_telegram_lote_{timestamp}.json"
+        report = {
+            "generated": datetime.now().isoformat(),
+            "limit_messages": limit_messages,
+            "threshold": threshold,
+            "totals": totals,
+            "groups": summaries,
+            "matches": matches,
+        }
+        print_section_header("EXPORTANDO RESULTADOS")
+        try:
+            with open(filename, 'w') as f:
+                json.dump(report, f, indent=2)
+            print_success(f"Reporte consolidado exportado: {Colors.BOLD}{filename}{Colors.ENDC}")
+        except Exception as e:
+            print_error(f"Error al exportar el reporte a {filename}: {e}")
+        
+        return matches
+
     def scan_telegram_group(self, group_identifier: str, limit_messages: int = 100, threshold: int = 5):
         """
         Escanea un grupo/canal de Telegram en busca de imágenes que coincidan
@@ -695,90 +3743,133 @@ class ImageHashDetector:
         
         return matches
     
-    async def _monitor_telegram_group_async(self, group_identifier: str, threshold: int = 5):
+    async def _monitor_telegram_groups_async(self, group_identifiers: List[str], threshold: int = 5):
         """
-        Monitorea en tiempo real un grupo/canal de Telegram
+        Monitorea en tiempo real varios grupos/canales de Telegram con un único handler.
+        El handler solo encola los mensajes con imagen en una cola acotada (si está llena
+        el evento se descarta y se cuenta); telegram_downloads tareas los descargan,
+        hashean fuera del loop y comparan, sin frenar la recepción de eventos.
         """
         if not self.telegram_client or not self.telegram_connected:
             return
         
-        # MEJORA: Resolver la entidad de manera robusta
-        entity = await self._resolve_group_entity(group_identifier)
-        group_name = getattr(entity, 'title', getattr(entity, 'name', group_identifier))
+        # MEJORA: Resolver las entidades de manera robusta. Los nombres se indexan por el
+        # peer id marcado (-100… en canales y supergrupos), que es lo que trae event.chat_id
+        chat_names = {}
+        entities = []
+        for group_identifier in group_identifiers:
+            entity = await self._resolve_group_entity(group_identifier)
+            entities.append(entity)
+            chat_names[utils.get_peer_id(entity)] = getattr(entity, 'title',
+                                                            getattr(entity, 'name', group_identifier))
         
-        print_telegram(f"Iniciando monitorización en tiempo real de: {group_name}")
+        print_telegram(f"Iniciando monitorización en tiempo real de: {', '.join(chat_names.values())}")
         
-        # Contador para exportación automática
-        detection_count = 0
         start_time = datetime.now()
-        session_matches = []
+        # Las detecciones ya quedan en el registro; al detener se exporta desde esta marca
+        log_mark = self.match_log.mark()
+        session_matches = 0
+        queue = asyncio.Queue(maxsize=self.monitor_queue_size)
+        metrics = {"received": 0, "processed": 0, "dropped": 0, "failed": 0,
+                   "max_depth": 0, "lag_total": 0.0, "lag_max": 0.0}
         
-        @self.telegram_client.on(events.NewMessage(chats=entity))
         async def handler(event):
-            nonlocal detection_count, session_matches
-            if event.message.media:
-                if isinstance(event.message.media, (MessageMediaPhoto, MessageMediaDocument)):
-                    try:
-                        # Descargar la imagen
-                        image_data = await self.telegram_client.download_media(event.message.media, file=BytesIO())
-                        
-                        if image_data and hasattr(image_data, 'getvalue'):
-                            image_bytes = image_data.getvalue()
-                            
-                            # Crear información del mensaje
-                            sender = await event.message.get_sender()
-                            sender_name = getattr(sender, 'username', getattr(sender, 'first_name', 'Unknown'))
-                            message_info = f"MsgID: {event.message.id} | From: {sender_name} | Real-time"
-                            
-                            # Verificar la imagen
-                            matches = self.check_image_from_bytes(
-                                image_bytes,
-                                source=group_name,
-                                message_info=message_info,
-                                threshold=threshold
-                            )
-                            
-                            if matches:
-                                detection_count += len(matches)
-                                session_matches.extend(matches)
-                            
-                    except Exception as e:
-                        pass  # Saltar errores en tiempo real
-    
-        print_success(f"Monitorizando {group_name}. Presiona Ctrl+C para detener y exportar.")
+            if not isinstance(event.message.media, (MessageMediaPhoto, MessageMediaDocument)):
+                return
+            metrics["received"] += 1
+            try:
+                queue.put_nowait((event.message, chat_names.get(event.chat_id, str(event.chat_id))))
+            except asyncio.QueueFull:
+                # Contrapresión: descartar antes que bloquear la entrega de eventos
+                metrics["dropped"] += 1
+            metrics["max_depth"] = max(metrics["max_depth"], queue.qsize())
+        
+        async def worker():
+            nonlocal session_matches
+            while True:
+                message, group_name = await queue.get()
+                try:
+                    message_info, image_hashes = await asyncio.gather(
+                        self._message_info(message), self._hash_message_image(message, threshold))
+                    if image_hashes:
+                        session_matches += len(self._match_telegram_batch(
+                            [(image_hashes, f"{message_info} | Real-time")], group_name, threshold))
+                    # Demora entre la publicación del mensaje y su análisis
+                    if message.date:
+                        lag = max(0.0, (datetime.now(timezone.utc) - message.date).total_seconds())
+                        metrics["lag_total"] += lag
+                        metrics["lag_max"] = max(metrics["lag_max"], lag)
+                except Exception:
+                    metrics["failed"] += 1  # Saltar errores en tiempo real
+                finally:
+                    metrics["processed"] += 1
+                    queue.task_done()
+        
+        def print_metrics():
+            lag_avg = metrics["lag_total"] / metrics["processed"] if metrics["processed"] else 0.0
+            print_info(f"Cola: {queue.qsize()}/{self.monitor_queue_size} (máx. {metrics['max_depth']}) | "
+                       f"Recibidas: {metrics['received']} | Procesadas: {metrics['processed']} | "
+                       f"Descartadas: {metrics['dropped']} | Errores: {metrics['failed']} | "
+                       f"Demora media: {lag_avg:.1f}s (máx. {metrics['lag_max']:.1f}s) | "
+                       f"Detecciones: {session_matches}")
+        
+        async def report_metrics():
+            while True:
+                await asyncio.sleep(self.monitor_stats_interval)
+                print_metrics()
+                self.match_log.sync()
+        
+        self.telegram_client.add_event_handler(handler, events.NewMessage(chats=entities))
+        tasks = [asyncio.ensure_future(worker()) for _ in range(self.telegram_downloads)]
+        if self.monitor_stats_interval > 0:
+            tasks.append(asyncio.ensure_future(report_metrics()))
+        
+        print_success(f"Monitorizando {len(entities)} chat(s). Presiona Ctrl+C para detener y exportar.")
         
         try:
             await self.telegram_client.run_until_disconnected()
-        except KeyboardInterrupt:
-            print_info("Monitorización detenida por el usuario")
+        finally:
+            self.telegram_client.remove_event_handler(handler)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+            print_info("Monitorización detenida")
+            print_metrics()
             
             # Exportación automática al finalizar monitoreo
-            if detection_count > 0:
+            if session_matches:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"reporte_monitoreo_{group_name}_{timestamp}.json"
+                report_name = next(iter(chat_names.values())) if len(chat_names) == 1 else "multi"
+                filename = f"reporte_monitoreo_{report_name}_{timestamp}.json"
                 print_section_header("EXPORTANDO RESULTADOS DEL MONITOREO")
                 try:
                     # Exportar solo las detecciones de esta sesión de monitoreo
-                    with open(filename, 'w') as f:
-                        json.dump(session_matches, f, indent=2)
+                    exported = self.match_log.export(filename, log_mark)
                     print_success(f"Reporte de monitoreo exportado: {Colors.BOLD}{filename}{Colors.ENDC}")
-                    print_info(f"Total de detecciones en esta sesión: {detection_count}")
+                    print_info(f"Total de detecciones en esta sesión: {exported}")
                     print_info(f"Duración del monitoreo: {(datetime.now() - start_time).total_seconds():.0f} segundos")
                 except Exception as e:
                     print_error(f"Error al exportar el reporte: {e}")
             else:
                 print_warning("No se encontraron coincidencias durante el monitoreo")
 
-    def monitor_telegram_group(self, group_identifier: str, threshold: int = 5):
+    def monitor_telegram_groups(self, group_identifiers: List[str], threshold: int = 5):
         """
-        Monitorea en tiempo real un grupo/canal de Telegram
+        Monitorea en tiempo real uno o varios grupos/canales de Telegram
         """
         try:
-            TelegramLoopManager.run_async(self._monitor_telegram_group_async(group_identifier, threshold))
+            TelegramLoopManager.run_until_interrupted(self._monitor_telegram_groups_async(group_identifiers, threshold))
         except KeyboardInterrupt:
-            print_info("Monitorización detenida por el usuario")
+            pass
         except Exception as e:
             print_error(f"Error en monitorización: {e}")
+
+    def monitor_telegram_group(self, group_identifier: str, threshold: int = 5):
+        """
+        Monitorea en tiempo real un grupo/canal de Telegram
+        """
+        self.monitor_telegram_groups([group_identifier], threshold)
     
     async def _get_user_groups_async(self):
         """Obtiene la lista de grupos/chats del usuario (versión asíncrona)"""
@@ -800,18 +3891,22 @@ class ImageHashDetector:
         """Obtiene la lista de grupos/chats del usuario (versión síncrona)"""
         return TelegramLoopManager.run_async(self._get_user_groups_async())
     
-    def export_matches(self, filename: str = "matches_report.json"):
-        """Exporta las coincidencias detectadas a un archivo JSON"""
-        if not self.detected_matches:
+    def export_matches(self, filename: str = "matches_report.json", since: tuple = (0, 0)) -> int:
+        """
+        Exporta a un archivo JSON las coincidencias de esta sesión (desde la marca
+        since del registro), leyéndolas del registro JSONL en disco
+        """
+        if not self.match_log.total:
              print_warning("No hay coincidencias detectadas para exportar.")
-             return
+             return 0
              
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.detected_matches, f, indent=2)
+            count = self.match_log.export(filename, since)
             print_success(f"Reporte exportado: {Colors.BOLD}{filename}{Colors.ENDC}")
+            return count
         except Exception as e:
             print_error(f"Error al exportar el reporte a {filename}: {e}")
+            return 0
 
     
     def list_targets(self):
@@ -842,7 +3937,47 @@ class ImageHashDetector:
         
         print(f"{Colors.BOLD}📊 Base de Datos:{Colors.ENDC}")
         print(f"   • Imágenes objetivo: {Colors.GREEN}{len(self.target_hashes)}{Colors.ENDC}")
-        print(f"   • Detecciones totales: {Colors.GREEN}{len(self.detected_matches)}{Colors.ENDC}")
+        print(f"   • Detecciones totales: {Colors.GREEN}{self.match_log.total}{Colors.ENDC}")
+        active_types = self.active_hash_types()
+        print(f"   • Hashes calculados: {Colors.GREEN}{', '.join(active_types) if active_types else 'ninguno'}{Colors.ENDC}")
+        if self.exact_only:
+            print(f"   • Coincidencias exactas sin decodificar: {Colors.GREEN}{self.exact_shortcuts}{Colors.ENDC}")
+        
+        cache = self.result_cache
+        print(f"\n{Colors.BOLD}🗃️  Caché de hashes:{Colors.ENDC}")
+        if cache.max_entries:
+            lookups = cache.hits + cache.misses
+            hit_rate = 100 * cache.hits / lookups if lookups else 0
+            print(f"   • Entradas: {Colors.GREEN}{len(cache)}/{cache.max_entries}{Colors.ENDC} ({cache.cache_file})")
+            print(f"   • Aciertos: {Colors.GREEN}{cache.hits}{Colors.ENDC} | Fallos: {cache.misses} "
+                  f"({hit_rate:.0f}% de aciertos)")
+            print(f"   • Revalidaciones HTTP sin cambios (304): {Colors.GREEN}{self.http_not_modified}{Colors.ENDC}")
+        else:
+            print(f"   • {Colors.YELLOW}Desactivada{Colors.ENDC}")
+        
+        rejections = self.image_rejections
+        limits = self.hash_executor.limits
+        print(f"\n{Colors.BOLD}🛡️  Imágenes descartadas sin decodificar:{Colors.ENDC} "
+              f"{Colors.GREEN}{sum(rejections.values())}{Colors.ENDC}")
+        print(f"   • No son imágenes: {rejections['not_image']}")
+        print(f"   • Más de {self.max_image_bytes / (1024 * 1024):g} MB: {rejections['too_large']}"
+              if self.max_image_bytes else f"   • Por tamaño: {rejections['too_large']} (sin límite)")
+        print(f"   • Más de {self.max_image_pixels} píxeles: {rejections['too_many_pixels']}"
+              if self.max_image_pixels else f"   • Por píxeles: {rejections['too_many_pixels']} (sin límite)")
+        print(f"   • Más de {limits['max_frames']} fotogramas: {rejections['too_many_frames']}"
+              if limits['max_frames'] else f"   • Por fotogramas: {rejections['too_many_frames']} (sin límite)")
+        print(f"   • Más de {limits['max_decoded_bytes'] / (1024 * 1024):g} MB decodificados: "
+              f"{rejections['too_large_decoded']}" if limits['max_decoded_bytes']
+              else f"   • Por memoria decodificada: {rejections['too_large_decoded']} (sin límite)")
+        executor = self.hash_executor
+        if executor.memory_limit or executor.timeout:
+            print(f"   • Sandbox: {executor.workers} proceso(s)"
+                  f"{f', +{executor.memory_limit / (1024 * 1024):g} MB' if executor.memory_limit else ''}"
+                  f"{f', {executor.timeout:g}s' if executor.timeout else ''} | tiempo agotado: "
+                  f"{rejections['timeout']} | sin memoria: {rejections['memory']} | "
+                  f"proceso caído: {rejections['crashed']}")
+        else:
+            print(f"   • Sin memoria: {rejections['memory']} (sandbox de procesos desactivado)")
         
         # Mostrar estado de Telegram
         tg_status = self.get_telegram_status()
@@ -855,20 +3990,15 @@ class ImageHashDetector:
         else:
             print(f"\n{Colors.BOLD}📱 Estado Telegram:{Colors.ENDC} {Colors.RED}❌ No conectado{Colors.ENDC}")
         
-        # Estadísticas por fuente
-        sources = {}
-        for match in self.detected_matches:
-            source = match.get('source', 'Desconocido')
-            sources[source] = sources.get(source, 0) + 1
-        
-        if sources:
+        # Estadísticas por fuente (contadores del registro de coincidencias)
+        if self.match_log.by_source:
             print(f"\n{Colors.BOLD}🌐 Detecciones por fuente:{Colors.ENDC}")
-            for source, count in sources.items():
+            for source, count in self.match_log.by_source.items():
                 print(f"   • {source}: {count}")
         
-        if self.detected_matches:
+        if self.match_log.last:
             print(f"\n{Colors.BOLD}🎯 Última Detección:{Colors.ENDC}")
-            last = self.detected_matches[-1]
+            last = self.match_log.last
             print(f"   • Target: {last['target_id']}")
             print(f"   • Descripción: {last['description']}")
             print(f"   • Fuente: {last.get('source', 'N/A')}")
@@ -876,8 +4006,95 @@ class ImageHashDetector:
         
         print(f"\n{Colors.BOLD}📁 Archivos:{Colors.ENDC}")
         print(f"   • Base de datos: {self.hash_database_file}")
+        print(f"   • Registro de coincidencias: {self.match_log.log_file}")
+        if self.snapshot_file:
+            print(f"   • Snapshot binario: {self.snapshot_file} ({self.snapshot_status})")
         print(f"   • Estado: {Colors.GREEN}✓ Activa{Colors.ENDC}" if self.target_hashes else f"{Colors.YELLOW}⚠ Vacía{Colors.ENDC}")
 
+# ============================================================================
+# BENCHMARK DE MATCHERS
+# ============================================================================
+def _random_target_hashes(count: int, rng) -> Dict[str, Dict]:
+    """Genera una base de datos sintética de objetivos con hashes aleatorios"""
+    targets = {}
+    for i in range(count):
+        targets[f"target_{i + 1}"] = {
+            "description": "",
+            "tags": [],
+            "hashes": {hash_type: f"{rng.getrandbits(64):016x}" for hash_type in PERCEPTUAL_HASH_TYPES}
+        }
+    return targets
+
+def _original_compare_hashes(hash1: str, hash2: str, threshold: int = 5) -> bool:
+    """Comparación por objetivo original (con imagehash.hex_to_hash), referencia del benchmark"""
+    try:
+        return (imagehash.hex_to_hash(hash1) - imagehash.hex_to_hash(hash2)) <= threshold
+    except Exception:
+        return hash1 == hash2
+
+def benchmark_matchers(sizes: List[int] = (1000, 10000, 100000), queries: int = 64, threshold: int = 5) -> bool:
+    """
+    Compara el bucle por objetivo original contra el BK-tree y el matcher
+    vectorizado, midiendo el tiempo medio por imagen consultada. Devuelve False
+    si algún matcher no encuentra exactamente lo mismo que el bucle original.
+    """
+    import random
+    rng = random.Random(0)
+    print_section_header("BENCHMARK DE MATCHERS")
+    print(f"   {'Objetivos':>10} | {'Bucle (ms)':>11} | {'BK-tree (ms)':>12} | {'Vector (ms)':>11} | {'Lote (ms)':>10}")
+    print(MENU_SEPARATOR_THIN)
+
+    mismatches = []
+    for size in sizes:
+        targets = _random_target_hashes(size, rng)
+        target_list = list(targets.values())
+        # La mitad de las consultas son variaciones cercanas de un objetivo
+        batch = []
+        for i in range(queries):
+            if i % 2 == 0:
+                base = rng.choice(target_list)["hashes"]
+                batch.append({t: f"{int(v, 16) ^ (1 << rng.randrange(64)):016x}" for t, v in base.items()})
+            else:
+                batch.append({t: f"{rng.getrandbits(64):016x}" for t in PERCEPTUAL_HASH_TYPES})
+
+        # Bucle original por objetivo (muestra reducida, es el más lento)
+        loop_queries = batch[:max(1, min(queries, 20000 // size))]
+        start = time.perf_counter()
+        expected = []
+        for image_hashes in loop_queries:
+            found = []
+            for target_id, target_data in targets.items():
+                for hash_type in HASH_TYPES:
+                    if hash_type in target_data["hashes"] and hash_type in image_hashes:
+                        if _original_compare_hashes(target_data["hashes"][hash_type], image_hashes[hash_type],
+                                                    threshold):
+                            found.append(target_id)
+                            break
+            expected.append(found)
+        loop_ms = (time.perf_counter() - start) * 1000 / len(loop_queries)
+
+        timings = []
+        for matcher in ("bktree", "vector"):
+            index = MATCHERS[matcher](targets)
+            start = time.perf_counter()
+            results = [index.query(image_hashes, threshold) for image_hashes in batch]
+            timings.append((time.perf_counter() - start) * 1000 / len(batch))
+            if [[t for t, _ in r] for r in results[:len(loop_queries)]] != expected:
+                mismatches.append(f"{matcher} con {size} objetivos")
+        start = time.perf_counter()
+        results = index.query_batch(batch, threshold)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(batch)
+        if [[t for t, _ in r] for r in results[:len(loop_queries)]] != expected:
+            mismatches.append(f"lote con {size} objetivos")
+
+        print(f"   {size:>10} | {loop_ms:>11.2f} | {timings[0]:>12.2f} | {timings[1]:>11.2f} | {batch_ms:>10.3f}")
+
+    print(MENU_SEPARATOR_THIN)
+    print_info(f"Tiempo medio por imagen, {queries} consultas, umbral {threshold}")
+    if mismatches:
+        print_error(f"Resultados distintos del bucle original: {', '.join(mismatches)}")
+    return not mismatches
+
 # ============================================================================
 # MENÚ INTERACTIVO 
 # ============================================================================
@@ -1015,6 +4232,7 @@ def interactive_menu():
                 if detector.telegram_connected:
                     print_info("Desconectando Telegram...")
                     detector.disconnect_telegram()
+                detector.close()
                 print_section_header("SALIENDO DEL SISTEMA")
                 print_info("¡Hasta pronto!")
                 sys.exit(0)
@@ -1047,7 +4265,7 @@ def telegram_menu(detector):
                 f"{Colors.GREEN}[2]{Colors.ENDC} 📋 Listar grupos/chats disponibles", 
                 f"{Colors.GREEN}[3]{Colors.ENDC} 🔍 Escanear grupo específico",
                 f"{Colors.GREEN}[4]{Colors.ENDC} 📋 Escanear múltiples grupos",
-                f"{Colors.GREEN}[5]{Colors.ENDC} 👁️  Monitorear grupo en tiempo real",
+                f"{Colors.GREEN}[5]{Colors.ENDC} 👁️  Monitorear grupos en tiempo real",
                 f"{Colors.GREEN}[6]{Colors.ENDC} 📊 Ver detecciones de Telegram",
                 f"{Colors.YELLOW}[7]{Colors.ENDC} 🚪 Desconectar Telegram",
                 f"{Colors.YELLOW}[0]{Colors.ENDC} ↩️  Volver al menú principal"
@@ -1113,35 +4331,27 @@ def telegram_menu(detector):
                 
                 elif choice == '4':
                     print_section_header("ESCANEAR MÚLTIPLES GRUPOS")
-                    groups_input = input("IDs o nombres de grupos (separados por comas): ").strip()
-                    groups = [g.strip() for g in groups_input.split(',')]
+                    groups_input = input("IDs o nombres de grupos (separados por comas) o archivo: ").strip()
+                    groups = parse_group_list(groups_input)
                     limit = input("Límite de mensajes por grupo [100]: ").strip()
                     limit = int(limit) if limit.isdigit() else 100
                     threshold = input("Umbral de similitud (0-64) [5]: ").strip()
                     threshold = int(threshold) if threshold else 5
+                    concurrency = input("Grupos en paralelo [4]: ").strip()
+                    concurrency = int(concurrency) if concurrency.isdigit() else 4
                     
-                    total_matches = []
-                    for group in groups:
-                        try:
-                            matches = detector.scan_telegram_group(group, limit, threshold)
-                            total_matches.extend(matches)
-                            print()
-                        except Exception as e:
-                            print_error(f"Error al escanear grupo {group}: {e}")
-                    
-                    if total_matches:
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"reporte_telegram_lote_{timestamp}.json"
-                        print_section_header("EXPORTANDO RESULTADOS")
-                        detector.export_matches(filename)
-                    else:
-                        print_warning("No se encontraron coincidencias en los grupos")
+                    try:
+                        total_matches = detector.scan_telegram_groups(groups, limit, threshold, concurrency)
+                        if not total_matches:
+                            print_warning("No se encontraron coincidencias en los grupos")
+                    except Exception as e:
+                        print_error(f"Error al escanear grupos: {e}")
                     
                     input(f"\n{Colors.CYAN}Presiona ENTER para continuar...{Colors.ENDC}")
                 
                 elif choice == '5':
-                    print_section_header("MONITOREAR GRUPO EN TIEMPO REAL")
-                    group_id = input("ID o nombre del grupo: ").strip()
+                    print_section_header("MONITOREAR GRUPOS EN TIEMPO REAL")
+                    group_id = input("IDs o nombres de grupos (separados por comas) o archivo: ").strip()
                     threshold = input("Umbral de similitud (0-64) [5]: ").strip()
                     threshold = int(threshold) if threshold else 5
                     
@@ -1151,7 +4361,7 @@ def telegram_menu(detector):
                     
                     if confirm == 's':
                         try:
-                            detector.monitor_telegram_group(group_id, threshold)
+                            detector.monitor_telegram_groups(parse_group_list(group_id), threshold)
                         except KeyboardInterrupt:
                             print_info("Monitorización detenida por el usuario")
                         except Exception as e:
@@ -1167,6 +4377,9 @@ def telegram_menu(detector):
                     
                     if telegram_matches:
                         print_info(f"Se encontraron {len(telegram_matches)} detecciones en Telegram:")
+                        if detector.match_log.total > len(detector.detected_matches):
+                            print_info(f"Solo se muestran las más recientes; el historial completo está en "
+                                       f"{detector.match_log.log_file}")
                         for match in telegram_matches:
                             print(f"\n  {Colors.BOLD}Target:{Colors.ENDC} {match['target_id']}")
                             print(f"  {Colors.BOLD}Descripción:{Colors.ENDC} {match['description']}")
@@ -1231,6 +4444,27 @@ def telegram_menu(detector):
 # ============================================================================
 # FUNCIÓN PRINCIPAL (CLI)
 # ============================================================================
+def parse_hash_types_arg(value: str) -> List[str]:
+    """Valida la lista de tipos de hash de --hash-types"""
+    hash_types = [t.strip().lower() for t in value.split(',') if t.strip()]
+    invalid = [t for t in hash_types if t not in HASH_TYPES]
+    if invalid or not hash_types:
+        raise argparse.ArgumentTypeError(
+            f"tipos de hash no válidos: {', '.join(invalid) if invalid else repr(value)} "
+            f"(válidos: {', '.join(HASH_TYPES)})")
+    return hash_types
+
+def parse_group_list(value: str) -> List[str]:
+    """
+    Interpreta una lista de grupos o URLs: ruta a un archivo (uno por línea, # para
+    comentarios) o identificadores separados por comas
+    """
+    if os.path.isfile(value):
+        with open(value, 'r') as f:
+            lines = [line.strip() for line in f]
+        return [line for line in lines if line and not line.startswith('#')]
+    return [group.strip() for group in value.split(',') if group.strip()]
+
 def main():
     parser = argparse.ArgumentParser(
         description="Sistema de Detección de Imágenes por Hash Perceptual con Telegram",
@@ -1241,6 +4475,10 @@ def main():
                        help='Iniciar en modo interactivo (menú visual)')
     parser.add_argument('--add-image', help='Agregar imagen objetivo (ruta o URL)')
     parser.add_argument('--add-hash', help='Agregar hash manualmente')
+    parser.add_argument('--import-targets',
+                       help='Importar objetivos en bloque: directorio, zip/tar de imágenes o CSV/JSONL de hashes')
+    parser.add_argument('--dedupe-distance', type=int, default=2,
+                       help='Distancia pHash máxima para descartar duplicados al importar (-1 = solo MD5)')
     parser.add_argument('--hash-type', default='phash', 
                        choices=['md5', 'phash', 'ahash', 'dhash', 'whash'],
                        help='Tipo de hash (para --add-hash)')
@@ -1253,6 +4491,12 @@ def main():
     parser.add_argument('--list', action='store_true', help='Listar hashes objetivo')
     parser.add_argument('--stats', action='store_true', help='Mostrar estadísticas')
     parser.add_argument('--reset-db', action='store_true', help='Borrar TODA la base de datos de hashes')
+    parser.add_argument('--database', default='target_hashes.json',
+                       help='Base de datos de objetivos (.json, o .db/.sqlite para SQLite)')
+    parser.add_argument('--no-snapshot', action='store_true',
+                       help='No usar ni generar el snapshot binario (<base>.snap) para el arranque rápido')
+    parser.add_argument('--migrate-json',
+                       help='Importar una base de objetivos JSON a la base SQLite indicada con --database')
     
     # Opciones de Telegram
     parser.add_argument('--setup-telegram', action='store_true', help='Configurar cliente de Telegram')
@@ -1260,12 +4504,102 @@ def main():
     parser.add_argument('--api-hash', help='API Hash de Telegram')
     parser.add_argument('--phone', help='Número de teléfono para Telegram')
     parser.add_argument('--telegram-scan', help='Escanear grupo/canal de Telegram')
-    parser.add_argument('--telegram-monitor', help='Monitorear grupo/canal de Telegram en tiempo real')
+    parser.add_argument('--telegram-scan-groups',
+                       help='Escanear varios grupos en paralelo (separados por comas o archivo con uno por línea)')
+    parser.add_argument('--group-concurrency', type=int, default=4,
+                       help='Grupos escaneados a la vez con --telegram-scan-groups')
+    parser.add_argument('--telegram-monitor',
+                       help='Monitorear en tiempo real uno o varios grupos (separados por comas o archivo)')
+    parser.add_argument('--monitor-queue-size', type=int, default=100,
+                       help='Imágenes pendientes máximas del monitor; si se llena, los eventos nuevos se descartan')
+    parser.add_argument('--monitor-stats-interval', type=float, default=60.0,
+                       help='Segundos entre informes de métricas del monitor (0 = solo al detener)')
     parser.add_argument('--limit-messages', type=int, default=100, help='Límite de mensajes a escanear en Telegram')
+    parser.add_argument('--telegram-downloads', type=int, default=4,
+                       help='Descargas simultáneas de medios de Telegram')
+    parser.add_argument('--thumbnail-first', action='store_true',
+                       help='Hashear primero una miniatura y bajar la imagen completa solo si es sospechosa')
+    parser.add_argument('--thumbnail-min-size', type=int, default=128,
+                       help='Lado menor mínimo (px) de la miniatura usada para hashear')
+    parser.add_argument('--suspicious-band', type=int, default=6,
+                       help='Margen sobre --threshold en el que una miniatura obliga a la descarga completa')
+    parser.add_argument('--verify-md5', action='store_true',
+                       help='Con --thumbnail-first, descargar siempre el archivo completo para verificar MD5')
+    parser.add_argument('--full-rescan', action='store_true',
+                       help='Ignorar los checkpoints y volver a escanear los mensajes ya procesados')
+    parser.add_argument('--checkpoint-file', default='telegram_checkpoints.json',
+                       help='Archivo donde se guarda el último mensaje escaneado de cada chat')
     parser.add_argument('--list-groups', action='store_true', help='Listar grupos disponibles en Telegram')
     parser.add_argument('--telegram-status', action='store_true', help='Ver estado de conexión de Telegram')
     parser.add_argument('--disconnect-telegram', action='store_true', help='Desconectar Telegram')
     
+    parser.add_argument('--matcher', default='vector', choices=sorted(MATCHERS),
+                       help='Estructura de búsqueda de objetivos (vector = lotes vectorizados con NumPy)')
+    parser.add_argument('--hash-types', type=parse_hash_types_arg,
+                       help='Tipos de hash a calcular al escanear, separados por comas '
+                            '(por defecto los presentes en la base de datos)')
+    parser.add_argument('--exact-only', action='store_true',
+                       help='Si el MD5 coincide con un objetivo, omitir decodificación y hashes perceptuales')
+    parser.add_argument('--fetch-workers', type=int, default=8,
+                       help='Descargas de imágenes web simultáneas')
+    parser.add_argument('--per-host-connections', type=int, default=4,
+                       help='Conexiones simultáneas máximas por host')
+    parser.add_argument('--per-host-rate', type=float, default=10.0,
+                       help='Peticiones por segundo máximas por host (0 = sin límite)')
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1,
+                       help='Procesos para el hashing perceptual (0 = en el mismo proceso)')
+    parser.add_argument('--async-web', action='store_true',
+                       help='Escanear las URLs de --scan en paralelo con el escáner asíncrono (aiohttp)')
+    parser.add_argument('--max-image-mb', type=float, default=20.0,
+                       help='Cortar la descarga de imágenes web de más de estos MB (0 = sin límite)')
+    parser.add_argument('--max-image-pixels', type=int, default=40000000,
+                       help='Descartar imágenes web cuya cabecera declara más píxeles (0 = sin límite)')
+    parser.add_argument('--max-image-frames', type=int, default=500,
+                       help='Descartar imágenes con más fotogramas (GIF/TIFF/WebP animados; 0 = sin límite)')
+    parser.add_argument('--max-decoded-mb', type=float, default=256.0,
+                       help='Descartar imágenes que ocuparían más MB decodificadas (0 = sin límite)')
+    parser.add_argument('--decode-memory-mb', type=float, default=0.0,
+                       help='Sandbox: memoria extra máxima de cada proceso de hashing en MB (0 = sin tope)')
+    parser.add_argument('--decode-timeout', type=float, default=0.0,
+                       help='Sandbox: segundos máximos por decodificación; si se superan se reinicia el proceso')
+    parser.add_argument('--crawl',
+                       help='Rastrear sitios desde estas URLs siguiendo enlaces (separadas por comas o archivo)')
+    parser.add_argument('--crawl-depth', type=int, default=2,
+                       help='Profundidad máxima de enlaces a seguir desde las URLs iniciales')
+    parser.add_argument('--crawl-max-pages', type=int, default=1000,
+                       help='Páginas máximas a escanear en el rastreo (solo cuentan las descargadas y analizadas)')
+    parser.add_argument('--crawl-max-pages-per-host', type=int, default=200,
+                       help='Páginas máximas a escanear de un mismo host')
+    parser.add_argument('--crawl-workers', type=int, default=16,
+                       help='Páginas descargadas a la vez por el crawler')
+    parser.add_argument('--crawl-any-host', action='store_true',
+                       help='Seguir también enlaces a hosts distintos de los iniciales')
+    parser.add_argument('--ignore-robots', action='store_true',
+                       help='No consultar robots.txt durante el rastreo')
+    parser.add_argument('--crawl-bloom-capacity', type=int, default=10000000,
+                       help='URLs previstas en el filtro de Bloom de URLs vistas (se usa al pasar de 100k)')
+    parser.add_argument('--fast-hashing', action='store_true',
+                       help='Hashear imágenes escaneadas a 256 px (mucho más rápido; los hashes pueden diferir '
+                            'varios bits de los exactos, subir --threshold)')
+    parser.add_argument('--cache-file', default='hash_cache.json',
+                       help='Archivo de la caché persistente de hashes ya calculados')
+    parser.add_argument('--cache-size', type=int, default=50000,
+                       help='Entradas máximas de la caché de hashes (LRU; 0 = desactivada)')
+    parser.add_argument('--cache-ttl', type=float, default=86400.0,
+                       help='Segundos durante los que se reutiliza el hash de una URL sin volver a descargarla')
+    parser.add_argument('--match-log', default='matches_log.jsonl',
+                       help='Registro JSONL al que se anexa cada coincidencia en cuanto se detecta')
+    parser.add_argument('--match-log-max-mb', type=float, default=50.0,
+                       help='Rotar el registro de coincidencias al superar este tamaño en MB (0 = sin límite)')
+    parser.add_argument('--match-log-rotate-hours', type=float, default=0.0,
+                       help='Rotar el registro de coincidencias cada tantas horas (0 = solo por tamaño)')
+    parser.add_argument('--match-log-backups', type=int, default=10,
+                       help='Registros de coincidencias rotados que se conservan; se borran los más antiguos '
+                            '(0 = conservar todos)')
+    parser.add_argument('--recent-matches', type=int, default=1000,
+                       help='Coincidencias recientes que se mantienen en memoria (el resto solo en el registro)')
+    parser.add_argument('--benchmark-matcher', action='store_true',
+                       help='Comparar el rendimiento de los matchers con 1k, 10k y 100k objetivos')
     parser.add_argument('--no-banner', action='store_true', help='No mostrar banner ASCII')
     
     args = parser.parse_args()
@@ -1286,8 +4620,59 @@ def main():
     if not args.no_banner:
         print_banner()
     
-    detector = ImageHashDetector()
+    if args.benchmark_matcher:
+        if not benchmark_matchers(threshold=args.threshold):
+            sys.exit(1)
+        return
+    
+    if args.migrate_json:
+        if not args.database.lower().endswith(SQLITE_EXTENSIONS):
+            print_error(f"--migrate-json necesita una base SQLite en --database ({', '.join(SQLITE_EXTENSIONS)})")
+            return
+        try:
+            migrated = migrate_json_to_sqlite(args.migrate_json, args.database)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print_error(f"Error al migrar {args.migrate_json}: {e}")
+            return
+        print_success(f"Migrados {Colors.BOLD}{migrated}{Colors.ENDC} objetivos de {args.migrate_json} a {args.database}")
+    
+    detector = ImageHashDetector(hash_database_file=args.database, matcher=args.matcher, reduced_decode=args.fast_hashing,
+                                 hash_types=args.hash_types, exact_only=args.exact_only,
+                                 fetch_workers=args.fetch_workers,
+                                 per_host_connections=args.per_host_connections,
+                                 per_host_rate=args.per_host_rate,
+                                 hash_workers=args.hash_workers,
+                                 telegram_downloads=args.telegram_downloads,
+                                 thumbnail_first=args.thumbnail_first,
+                                 thumbnail_min_size=args.thumbnail_min_size,
+                                 suspicious_band=args.suspicious_band,
+                                 verify_md5=args.verify_md5,
+                                 checkpoint_file=args.checkpoint_file,
+                                 full_rescan=args.full_rescan,
+                                 monitor_queue_size=args.monitor_queue_size,
+                                 monitor_stats_interval=args.monitor_stats_interval,
+                                 cache_file=args.cache_file,
+                                 cache_size=args.cache_size,
+                                 cache_ttl=args.cache_ttl,
+                                 use_snapshot=not args.no_snapshot,
+                                 match_log_file=args.match_log,
+                                 max_recent_matches=args.recent_matches,
+                                 match_log_max_bytes=int(args.match_log_max_mb * 1024 * 1024),
+                                 match_log_rotate_interval=args.match_log_rotate_hours * 3600,
+                                 match_log_backups=args.match_log_backups,
+                                 max_image_bytes=int(args.max_image_mb * 1024 * 1024),
+                                 max_image_pixels=args.max_image_pixels,
+                                 max_image_frames=args.max_image_frames,
+                                 max_decoded_bytes=int(args.max_decoded_mb * 1024 * 1024),
+                                 decode_memory_limit=int(args.decode_memory_mb * 1024 * 1024),
+                                 decode_timeout=args.decode_timeout)
+    try:
+        run_cli_commands(detector, args)
+    finally:
+        detector.close()
 
+def run_cli_commands(detector: ImageHashDetector, args):
+    """Ejecuta las acciones pedidas por línea de comandos"""
     if args.reset_db:
         detector.reset_database()
         return
@@ -1303,6 +4688,10 @@ def main():
         tags = args.tags.split(',') if args.tags else []
         detector.add_target_hash(args.add_image, args.description, tags)
     
+    if args.import_targets:
+        tags = args.tags.split(',') if args.tags else []
+        detector.import_targets(args.import_targets, args.description, tags, args.dedupe_distance)
+    
     if args.add_hash:
         print_section_header("AGREGANDO HASH MANUAL")
         tags = args.tags.split(',') if args.tags else []
@@ -1326,9 +4715,13 @@ def main():
         except FileNotFoundError:
             urls_to_scan.append(scan_target)
 
-        for url in urls_to_scan:
-            detector.scan_webpage(url, threshold=args.threshold)
+        if args.async_web:
+            detector.scan_webpages(urls_to_scan, threshold=args.threshold)
             print()
+        else:
+            for url in urls_to_scan:
+                detector.scan_webpage(url, threshold=args.threshold)
+                print()
             
         if detector.detected_matches:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1339,6 +4732,12 @@ def main():
         else:
             print_warning("Escaneo completado. No se encontraron coincidencias para exportar.")
 
+    if args.crawl:
+        detector.crawl(parse_group_list(args.crawl), threshold=args.threshold, max_depth=args.crawl_depth,
+                       max_pages=args.crawl_max_pages, max_pages_per_host=args.crawl_max_pages_per_host,
+                       workers=args.crawl_workers, any_host=args.crawl_any_host,
+                       respect_robots=not args.ignore_robots, bloom_capacity=args.crawl_bloom_capacity)
+
     # Funcionalidades de Telegram
     if args.setup_telegram:
         if not TELETHON_AVAILABLE:
@@ -1386,6 +4785,14 @@ def main():
         else:
             detector.scan_telegram_group(args.telegram_scan, args.limit_messages, args.threshold)
     
+    if args.telegram_scan_groups:
+        status = detector.get_telegram_status()
+        if not status['connected']:
+            print_error("Telegram no está configurado")
+        else:
+            detector.scan_telegram_groups(parse_group_list(args.telegram_scan_groups), args.limit_messages,
+                                          args.threshold, args.group_concurrency)
+    
     if args.telegram_monitor:
         status = detector.get_telegram_status()
         if not status['connected']:
@@ -1393,7 +4800,7 @@ def main():
         else:
             print_warning("Iniciando monitorización en tiempo real. Presiona Ctrl+C para detener.")
             try:
-                detector.monitor_telegram_group(args.telegram_monitor, args.threshold)
+                detector.monitor_telegram_groups(parse_group_list(args.telegram_monitor), args.threshold)
             except KeyboardInterrupt:
                 print_info("Monitorización detenida")
 
@@ -0,0 +1,28 @@
+"""
+Carga image_hash_detector-TG.py como módulo para las pruebas. El nombre del
+script tiene un guion, así que se importa desde su ruta con importlib.
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "image_hash_detector-TG.py")
+MODULE_NAME = "image_hash_detector"
+
+
+@pytest.fixture(scope="session")
+def ihd():
+    """Módulo del detector; las pruebas se omiten si faltan sus dependencias"""
+    for dependency in ("numpy", "PIL", "imagehash", "requests"):
+        pytest.importorskip(dependency)
+    module = sys.modules.get(MODULE_NAME)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(MODULE_NAME, SCRIPT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        # Registrado antes de ejecutarlo para que las funciones se puedan enviar a procesos
+        sys.modules[MODULE_NAME] = module
+        spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,70 @@
+"""
+Caché persistente de hashes y checkpoints de Telegram: LRU acotado, guardado
+atómico y archivos que se leen recién en el primer uso, no al arrancar.
+"""
+import json
+
+
+def test_lru_eviction_and_round_trip(ihd, tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ihd.PersistentLRUCache(path, max_entries=3)
+    for n in range(3):
+        cache.put(f"k{n}", {"n": n})
+    assert cache.get("k0") == {"n": 0}
+    cache.put("k3", {"n": 3})
+    assert cache.get("k1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save()
+
+    reloaded = ihd.PersistentLRUCache(path, max_entries=2)
+    assert len(reloaded) == 2
+    # Se conservan los usados más recientemente
+    assert reloaded.peek("k2") is None and reloaded.peek("k0") == {"n": 0}
+
+
+def test_cache_file_is_read_on_first_use(ihd, tmp_path):
+    path = tmp_path / "cache.json"
+    cache = ihd.PersistentLRUCache(str(path), max_entries=10)
+    # Escrito después de crear la caché: solo se ve si la lectura es perezosa
+    path.write_text(json.dumps({"k": {"n": 1}}))
+    assert cache.get("k") == {"n": 1}
+    cache.save()
+    assert json.loads(path.read_text()) == {"k": {"n": 1}}
+
+
+def test_disabled_cache_never_reads(ihd, tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps({"k": {"n": 1}}))
+    cache = ihd.PersistentLRUCache(str(path), max_entries=0)
+    cache.put("otra", {"n": 2})
+    assert cache.get("k") is None and len(cache) == 0
+
+
+def test_checkpoints_are_read_on_first_use(ihd, tmp_path):
+    path = tmp_path / "checkpoints.json"
+    store = ihd.TelegramCheckpointStore(str(path))
+    path.write_text(json.dumps({"-100123": {"last_message_id": 40, "name": "Canal"}}))
+    assert store.get(-100123) == 40
+    store.update(-100123, 30)
+    assert store.get(-100123) == 40
+    store.update(-100123, 55, "Canal")
+    assert json.loads(path.read_text())["-100123"]["last_message_id"] == 55
+
+
+def test_detector_startup_reads_neither(ihd, tmp_path, capsys):
+    cache_file = tmp_path / "cache.json"
+    checkpoint_file = tmp_path / "checkpoints.json"
+    cache_file.write_text("{roto")
+    checkpoint_file.write_text("{roto")
+    detector = ihd.ImageHashDetector(str(tmp_path / "db.json"), cache_file=str(cache_file),
+                                     checkpoint_file=str(checkpoint_file),
+                                     match_log_file=str(tmp_path / "matches.jsonl"))
+    try:
+        output = capsys.readouterr().out
+        assert "cache.json" not in output and "checkpoints.json" not in output
+        # El primer uso sí los lee (y avisa que están dañados)
+        assert detector.checkpoints.get(1) == 0
+        assert "checkpoints.json" in capsys.readouterr().out
+    finally:
+        detector.close()
+    assert cache_file.read_text() == "{roto"
@@ -0,0 +1,133 @@
+"""
+Piezas del crawler: normalización de URLs, filtro de Bloom, SeenSet y la caché
+de robots.txt (con una sesión HTTP simulada).
+"""
+import asyncio
+import contextlib
+import random
+
+import pytest
+
+
+def test_normalize_url(ihd):
+    assert ihd.normalize_url("HTTP://Ejemplo.COM:80/a?b=1#frag") == "http://ejemplo.com/a?b=1"
+    assert ihd.normalize_url("https://ejemplo.com:443") == "https://ejemplo.com/"
+    assert ihd.normalize_url("https://ejemplo.com:8443/x") == "https://ejemplo.com:8443/x"
+
+
+def test_bloom_filter_has_no_false_negatives(ihd):
+    bloom = ihd.BloomFilter(20000, error_rate=0.01)
+    items = [f"https://ejemplo.com/{i}" for i in range(20000)]
+    assert all(bloom.add(item) for item in items[:100])
+    for item in items[100:]:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert not bloom.add(items[0])
+
+    # Tasa de falsos positivos cercana a la configurada dentro de la capacidad
+    rng = random.Random(0)
+    probes = [f"https://otro.org/{rng.getrandbits(64)}" for _ in range(20000)]
+    false_positives = sum(probe in bloom for probe in probes)
+    assert false_positives / len(probes) < 0.02
+
+
+def test_seen_set_switches_to_bloom(ihd):
+    seen = ihd.SeenSet(exact_limit=50, bloom_capacity=1000)
+    urls = [f"https://ejemplo.com/{i}" for i in range(200)]
+    assert all(seen.add(url) for url in urls[:50])
+    assert not seen.probabilistic
+    assert not seen.add(urls[0])
+    for url in urls[50:]:
+        seen.add(url)
+    assert seen.probabilistic
+    # Lo visto antes del cambio sigue contando como visto
+    assert not any(seen.add(url) for url in urls)
+    assert len(seen) >= 190
+
+
+class FakeResponse:
+    def __init__(self, status, text):
+        self.status = status
+        self._text = text
+
+    async def text(self, errors=None):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Sesión aiohttp mínima que sirve robots.txt desde un diccionario"""
+    def __init__(self, robots):
+        self.robots = robots
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        text = self.robots.get(url)
+        return FakeResponse(404, "") if text is None else FakeResponse(200, text)
+
+
+def test_robots_policy(ihd):
+    session = FakeSession({"https://ejemplo.com/robots.txt":
+                           "User-agent: *\nDisallow: /privado/\nCrawl-delay: 2\n"})
+    limiter = ihd.HostRateLimiter(4, 0)
+    robots = ihd.RobotsPolicy(ihd.DEFAULT_USER_AGENT, limiter)
+
+    async def check(urls):
+        return await asyncio.gather(*(robots.allowed(session, url) for url in urls))
+
+    results = asyncio.run(check(["https://ejemplo.com/", "https://ejemplo.com/privado/a.html",
+                                 "https://EJEMPLO.com/publico", "https://sin-robots.org/privado/"]))
+    assert results == [True, False, True, True]
+    # Un único robots.txt por origen aunque se consulte a la vez, y el Crawl-delay se aplica al host
+    assert sorted(session.requests) == ["https://ejemplo.com/robots.txt", "https://sin-robots.org/robots.txt"]
+    assert limiter._host_intervals == {"ejemplo.com": 2.0}
+
+
+class FakeRobots:
+    """robots.txt simulado: bloquea todo lo que cuelga de /privado/"""
+    def __init__(self, user_agent, rate_limiter):
+        pass
+
+    async def allowed(self, session, url):
+        return "/privado/" not in url
+
+
+def test_crawl_budget_counts_only_scanned_pages(ihd, tmp_path, monkeypatch):
+    pytest.importorskip("aiohttp")
+    site = "https://ejemplo.com"
+    # Muchos enlaces que no deben gastar el presupuesto antes de las páginas reales
+    home = ([f"{site}/privado/{i}" for i in range(30)] + [f"{site}/binario/{i}" for i in range(30)] +
+            [f"{site}/roto/{i}" for i in range(10)] + [f"{site}/pagina/{i}" for i in range(10)])
+    fetched = []
+
+    async def fake_scan(session, url, threshold, semaphore, links=None, seen_images=None, verbose=True):
+        fetched.append(url)
+        await asyncio.sleep(0.001)
+        if "/roto/" in url:
+            raise ihd.aiohttp.ClientError("conexión rechazada")
+        if "/binario/" in url:
+            return [], None, 0
+        if url == f"{site}/":
+            links.extend(home)
+        return [], 2, 2
+
+    detector = ihd.ImageHashDetector(str(tmp_path / "db.json"), cache_file=str(tmp_path / "cache.json"),
+                                     checkpoint_file=str(tmp_path / "checkpoints.json"),
+                                     match_log_file=str(tmp_path / "matches.jsonl"))
+    monkeypatch.setattr(ihd, "RobotsPolicy", FakeRobots)
+    monkeypatch.setattr(detector, "_scan_page_async", fake_scan)
+    monkeypatch.setattr(detector, "_create_aiohttp_session", lambda extra_connections=0: contextlib.nullcontext())
+    try:
+        stats = detector.crawl([f"{site}/"], max_depth=1, max_pages=6, max_pages_per_host=6, workers=8)
+    finally:
+        detector.close()
+    assert stats["pages"] == 6
+    # Los 70 enlaces bloqueados, no HTML o rotos no consumieron el presupuesto
+    assert stats["robots_blocked"] + stats["skipped"] + stats["failed"] > 0
+    assert len([url for url in fetched if "/pagina/" in url]) == 5
@@ -0,0 +1,94 @@
+"""
+Límites de decodificación: se rechaza por la cabecera, antes de decodificar,
+por píxeles, fotogramas o memoria decodificada (con la reducción de los JPEG).
+"""
+import io
+import pickle
+
+import pytest
+
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pil():
+    return pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def animated_gif(pil):
+    # Fotogramas distintos: Pillow fusiona los idénticos al guardar
+    frames = [pil.new("L", (16, 16), i * 8) for i in range(30)]
+    return encode(frames[0], "GIF", save_all=True, append_images=frames[1:])
+
+
+def rejection(ihd, image_data, reduced=True, **limits):
+    """Tipo de rechazo de check_decode_limits, o None si la imagen pasa"""
+    with ihd.Image.open(io.BytesIO(image_data)) as img:
+        try:
+            ihd.check_decode_limits(img, reduced, **limits)
+        except ihd.ImageRejected as e:
+            return e.kind
+    return None
+
+
+def test_too_many_pixels(ihd, pil):
+    image_data = encode(pil.new("RGB", (2000, 1000)), "PNG")
+    assert rejection(ihd, image_data, max_pixels=1_999_999) == "too_many_pixels"
+    assert rejection(ihd, image_data, max_pixels=2_000_000) is None
+
+
+def test_too_many_frames(ihd, animated_gif):
+    assert rejection(ihd, animated_gif, max_frames=29) == "too_many_frames"
+    assert rejection(ihd, animated_gif, max_frames=30) is None
+
+
+def test_too_large_decoded(ihd, pil):
+    # 1200 x 1200 en escala de grises: 1 byte por píxel; en RGB se cuentan 4
+    gray = encode(pil.new("L", (1200, 1200)), "PNG")
+    color = encode(pil.new("RGB", (1200, 1200)), "PNG")
+    assert rejection(ihd, gray, max_decoded_bytes=1_440_000) is None
+    assert rejection(ihd, gray, max_decoded_bytes=1_439_999) == "too_large_decoded"
+    assert rejection(ihd, color, max_decoded_bytes=1_440_000) == "too_large_decoded"
+
+
+def test_jpeg_reduction_is_accounted(ihd, pil):
+    # Con reduced, draft() decodifica el JPEG a 1/8 en escala de grises
+    image_data = encode(pil.new("RGB", (4000, 3000)), "JPEG")
+    assert rejection(ihd, image_data, reduced=True, max_decoded_bytes=1024 * 1024) is None
+    assert rejection(ihd, image_data, reduced=False, max_decoded_bytes=1024 * 1024) == "too_large_decoded"
+
+
+def test_zero_means_no_limit(ihd, animated_gif):
+    assert rejection(ihd, animated_gif, max_pixels=0, max_frames=0, max_decoded_bytes=0) is None
+
+
+def test_hash_image_bytes_applies_limits(ihd, pil, animated_gif):
+    image_data = encode(pil.new("RGB", (64, 64), (200, 10, 10)), "PNG")
+    assert set(ihd.hash_image_bytes(image_data, ["phash", "dhash"], limits={"max_pixels": 64 * 64})) == \
+        {"phash", "dhash"}
+    with pytest.raises(ihd.ImageRejected) as rejected:
+        ihd.hash_image_bytes(animated_gif, ["phash"], limits={"max_frames": 10})
+    assert rejected.value.kind == "too_many_frames"
+    with pytest.raises(ihd.ImageRejected) as rejected:
+        ihd.hash_target_bytes(image_data, {"max_pixels": 100})
+    assert rejected.value.kind == "too_many_pixels"
+
+
+def test_decompression_bomb_is_rejected(ihd, pil, monkeypatch):
+    monkeypatch.setattr(pil, "MAX_IMAGE_PIXELS", 1000)
+    image_data = encode(pil.new("L", (100, 100)), "PNG")
+    with pytest.raises(ihd.ImageRejected) as rejected:
+        ihd.open_image_limited(image_data)
+    assert rejected.value.kind == "too_many_pixels"
+
+
+def test_image_rejected_survives_pickling(ihd):
+    # Viaja desde los procesos de HashingExecutor conservando kind
+    error = pickle.loads(pickle.dumps(ihd.ImageRejected("timeout", "la decodificación superó 5s")))
+    assert isinstance(error, ValueError)
+    assert (error.kind, str(error)) == ("timeout", "la decodificación superó 5s")
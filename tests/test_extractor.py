@@ -0,0 +1,88 @@
+"""
+ImageURLExtractor con lxml y con html.parser: mismas imágenes y enlaces sea cual
+sea el tamaño de los bloques, y las imágenes se entregan antes de cerrar.
+"""
+import pytest
+
+PAGE = """<!DOCTYPE html>
+<html><head>
+<meta charset="utf-8">
+<base href="https://cdn.ejemplo.com/assets/">
+<style>.hero { background-image: url("hero.jpg"); } .x { color: red; }</style>
+</head><body>
+<p>Año 2024 — niño, pingüino ☃</p>
+<img src="a.jpg">
+<img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" data-src="lazy.jpg">
+<img srcset="small.jpg 480w, large.jpg 1080w">
+<picture><source srcset="p1.webp 1x, p2.webp 2x"><img src="pfallback.jpg"></picture>
+<source srcset="fuera.webp">
+<div style="background: url(bg.png) no-repeat"></div>
+<img src="a.jpg">
+<img src="javascript:alert(1)">
+<a href="/pagina2#arriba">siguiente</a>
+<a href="otra.html" rel="nofollow">no seguir</a>
+<a href="mailto:alguien@ejemplo.com">correo</a>
+<img src="//otro.ejemplo.org/ultima.png">
+</body></html>
+""".encode("utf-8")
+
+EXPECTED_IMAGES = [
+    (1, "https://cdn.ejemplo.com/assets/hero.jpg"),
+    (2, "https://cdn.ejemplo.com/assets/a.jpg"),
+    (3, "https://cdn.ejemplo.com/assets/lazy.jpg"),
+    (4, "https://cdn.ejemplo.com/assets/large.jpg"),
+    (5, "https://cdn.ejemplo.com/assets/p2.webp"),
+    (6, "https://cdn.ejemplo.com/assets/pfallback.jpg"),
+    (7, "https://cdn.ejemplo.com/assets/bg.png"),
+    (8, "https://otro.ejemplo.org/ultima.png"),
+]
+
+EXPECTED_LINKS = ["https://cdn.ejemplo.com/pagina2"]
+
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def backend(request, ihd, monkeypatch):
+    """Fuerza el parser del extractor (lxml solo si está instalado)"""
+    if request.param == "lxml" and not ihd.LXML_AVAILABLE:
+        pytest.skip("lxml no instalado")
+    monkeypatch.setattr(ihd, "LXML_AVAILABLE", request.param == "lxml")
+    return request.param
+
+
+def extract(ihd, data, chunk_size, encoding="utf-8"):
+    extractor = ihd.ImageURLExtractor("https://www.ejemplo.com/galeria/index.html", encoding, collect_links=True)
+    images = []
+    for start in range(0, len(data), chunk_size):
+        images.extend(extractor.feed(data[start:start + chunk_size]))
+    images.extend(extractor.close())
+    return images, extractor.take_links(), extractor.count
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_extracts_images_and_links(ihd, backend, chunk_size):
+    # Bloques de 1 y 7 bytes cortan caracteres UTF-8 de varios bytes y etiquetas a la mitad
+    images, links, count = extract(ihd, PAGE, chunk_size)
+    assert images == EXPECTED_IMAGES
+    assert links == EXPECTED_LINKS
+    assert count == len(EXPECTED_IMAGES)
+
+
+def test_images_are_returned_while_streaming(ihd, backend):
+    extractor = ihd.ImageURLExtractor("https://www.ejemplo.com/", "utf-8")
+    first = extractor.feed(b'<html><body><img src="/uno.jpg"><p>texto</p>' + b" " * 100)
+    second = extractor.feed(b'<img src="/dos.jpg"><div>' + b" " * 100)
+    rest = extractor.close()
+    assert first == [(1, "https://www.ejemplo.com/uno.jpg")]
+    assert second + rest == [(2, "https://www.ejemplo.com/dos.jpg")]
+
+
+def test_declared_encoding(ihd, backend):
+    page = '<html><body><img src="/imágenes/señal.jpg"></body></html>'.encode("latin-1")
+    images, _, _ = extract(ihd, page, 5, encoding="iso-8859-1")
+    assert images == [(1, "https://www.ejemplo.com/imágenes/señal.jpg")]
+
+
+def test_empty_and_truncated_documents(ihd, backend):
+    assert extract(ihd, b"", 16)[0] == []
+    images, _, _ = extract(ihd, b'<html><body><img src="a.jpg"><img src="b.j', 4)
+    assert images[0] == (1, "https://www.ejemplo.com/galeria/a.jpg")
@@ -0,0 +1,49 @@
+"""
+Hashes perceptuales desde un único buffer en grises: por defecto idénticos bit a
+bit a imagehash sobre la imagen original; el modo reducido solo bajo pedido.
+"""
+import inspect
+import io
+import random
+
+import pytest
+
+
+@pytest.fixture
+def textured_jpeg():
+    """JPEG grande con textura fina y poco contraste"""
+    pil = pytest.importorskip("PIL.Image")
+    rng = random.Random(0)
+    small = pil.frombytes("L", (100, 75), bytes(rng.randrange(110, 146) for _ in range(100 * 75)))
+    noise = pil.frombytes("L", (1600, 1200), bytes(rng.randrange(256) for _ in range(1600 * 1200)))
+    img = pil.blend(small.resize((1600, 1200), pil.BICUBIC), noise, 0.2).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def imagehash_reference(ihd, image_data):
+    with ihd.Image.open(io.BytesIO(image_data)) as img:
+        return {hash_type: str(function(img)) for hash_type, function in ihd.HASH_FUNCTIONS.items()}
+
+
+def test_default_is_bit_identical_to_imagehash(ihd, textured_jpeg):
+    expected = imagehash_reference(ihd, textured_jpeg)
+    with ihd.Image.open(io.BytesIO(textured_jpeg)) as img:
+        assert ihd.compute_perceptual_hashes(img) == expected
+    assert ihd.hash_image_bytes(textured_jpeg) == expected
+    assert ihd.hash_image_bytes(textured_jpeg, ["phash", "dhash"]) == {t: expected[t] for t in ("phash", "dhash")}
+
+
+def test_scans_hash_exactly_unless_asked(ihd):
+    for function in (ihd.compute_perceptual_hashes, ihd.hash_image_bytes, ihd.check_decode_limits,
+                     ihd.open_image_limited, ihd.HashingExecutor.hash, ihd.HashingExecutor.hash_async):
+        assert inspect.signature(function).parameters["reduced"].default is False
+    assert inspect.signature(ihd.ImageHashDetector).parameters["reduced_decode"].default is False
+
+
+def test_reduced_mode_only_touches_large_images(ihd):
+    pil = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    pil.new("RGB", (ihd.HASH_WORK_SIZE, 200), (30, 90, 160)).save(buffer, "PNG")
+    assert ihd.hash_image_bytes(buffer.getvalue(), reduced=True) == ihd.hash_image_bytes(buffer.getvalue())
@@ -0,0 +1,96 @@
+"""
+HashingExecutor: el timeout cuenta desde que un proceso empieza el trabajo y solo
+se reemplaza el proceso que lo supera o que muere; el resto sigue su curso.
+"""
+import asyncio
+import io
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture
+def executor(ihd):
+    executors = []
+
+    def make(**options):
+        executors.append(ihd.HashingExecutor(**options))
+        return executors[-1]
+
+    yield make
+    for created in executors:
+        created.shutdown()
+
+
+def outcome(ihd, job):
+    try:
+        return job.result()
+    except ihd.ImageRejected as e:
+        return e.kind
+
+
+def test_queued_jobs_do_not_time_out(ihd, executor):
+    # Seis trabajos de 0.4s en un solo proceso: el último espera 2s en la cola
+    hashing = executor(workers=1, timeout=1.0)
+    jobs = [hashing.submit(time.sleep, 0.4) for _ in range(6)]
+    assert [outcome(ihd, job) for job in jobs] == [None] * 6
+
+
+def test_queued_jobs_behind_a_hung_job(ihd, executor):
+    hashing = executor(workers=2, timeout=0.5)
+    hung = hashing.submit(time.sleep, 30)
+    jobs = [hashing.submit(time.sleep, 0.2) for _ in range(6)]
+    start = time.monotonic()
+    assert outcome(ihd, hung) == "timeout"
+    assert [outcome(ihd, job) for job in jobs] == [None] * 6
+    assert time.monotonic() - start < 5
+
+
+def sleep_then_pid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_timeout_only_replaces_its_process(ihd, executor):
+    # El trabajo sano sigue en su proceso mientras se mata al colgado
+    hashing = executor(workers=2, timeout=1.0)
+    hung = hashing.submit(time.sleep, 30)
+    time.sleep(0.5)
+    running = hashing.submit(sleep_then_pid, 0.8)
+    assert outcome(ihd, hung) == "timeout"
+    assert not running.done()
+    survivor = running.result()
+    pids = {job.result() for job in [hashing.submit(sleep_then_pid, 0.2) for _ in range(4)]}
+    assert survivor in pids and len(pids) == 2
+
+
+def test_crashed_process_only_fails_its_job(ihd, executor):
+    hashing = executor(workers=2)
+    running = hashing.submit(time.sleep, 0.3)
+    crashed = hashing.submit(os._exit, 1)
+    assert outcome(ihd, crashed) == "crashed"
+    assert outcome(ihd, running) is None
+    assert hashing.submit(pow, 2, 10).result() == 1024
+
+
+def test_errors_and_results_cross_processes(ihd, executor):
+    pil = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    pil.new("RGB", (64, 64), (10, 200, 10)).save(buffer, "PNG")
+    image_data = buffer.getvalue()
+
+    hashing = executor(workers=1, limits={"max_pixels": 100})
+    with pytest.raises(ihd.ImageRejected) as rejected:
+        hashing.hash(image_data, ["phash"])
+    assert rejected.value.kind == "too_many_pixels"
+
+    hashing = executor(workers=1)
+    expected = ihd.hash_image_bytes(image_data, ["phash", "dhash"])
+    assert hashing.hash(image_data, ["phash", "dhash"]) == expected
+    assert asyncio.run(hashing.hash_async(image_data, ["phash", "dhash"])) == expected
+
+
+def test_without_workers_runs_inline(ihd, executor):
+    hashing = executor(workers=0)
+    assert hashing.submit(os.getpid).result() == os.getpid()
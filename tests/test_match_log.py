@@ -0,0 +1,119 @@
+"""
+Registro JSONL de coincidencias: anexado, contadores, rotación por tamaño y
+por tiempo, y exportación de la sesión (o desde una marca) leyendo del disco.
+"""
+import json
+import time
+
+
+def match(n, source="web"):
+    return {"target_id": f"target_{n}", "found_url": f"https://ejemplo.com/{n}.jpg", "source": source}
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def log_files(tmp_path):
+    return sorted(path for path in tmp_path.iterdir() if path.name.startswith("matches"))
+
+
+def test_append_counters_and_recent(ihd, tmp_path):
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), max_recent=3)
+    for n in range(5):
+        log.append(match(n, source="web" if n % 2 else "Telegram - Canal"))
+    log.close()
+    assert log.total == 5
+    assert log.by_source == {"Telegram - Canal": 3, "web": 2}
+    assert log.last == match(4, source="Telegram - Canal")
+    assert [m["target_id"] for m in log.recent] == ["target_2", "target_3", "target_4"]
+    assert [m["target_id"] for m in read_lines(tmp_path / "matches.jsonl")] == [f"target_{n}" for n in range(5)]
+
+
+def test_rotation_by_size_keeps_every_line(ihd, tmp_path):
+    line_size = len(json.dumps(match(0)).encode()) + 1
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), max_bytes=3 * line_size)
+    for n in range(10):
+        log.append(match(n))
+    log.close()
+    files = log_files(tmp_path)
+    assert len(files) == 4
+    assert all(path.stat().st_size <= 3 * line_size for path in files)
+    # Los rotados llevan fecha y hora: el orden alfabético es el cronológico y el activo va al final
+    rotated = [path for path in files if path.name != "matches.jsonl"] + [tmp_path / "matches.jsonl"]
+    lines = [m["target_id"] for path in rotated for m in read_lines(path)]
+    assert lines == [f"target_{n}" for n in range(10)]
+
+
+def test_rotation_by_time(ihd, tmp_path):
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), rotate_interval=0.05)
+    log.append(match(0))
+    log.append(match(1))
+    time.sleep(0.1)
+    log.append(match(2))
+    log.close()
+    assert len(log_files(tmp_path)) == 2
+    assert [m["target_id"] for m in read_lines(tmp_path / "matches.jsonl")] == ["target_2"]
+
+
+def test_export_session_across_rotations(ihd, tmp_path):
+    path = tmp_path / "matches.jsonl"
+    previous = ihd.MatchLog(str(path))
+    previous.append(match(100))
+    previous.close()
+
+    line_size = len(json.dumps(match(0)).encode()) + 1
+    log = ihd.MatchLog(str(path), max_bytes=4 * line_size)
+    for n in range(7):
+        log.append(match(n))
+    exported = tmp_path / "export.json"
+    # Solo lo escrito en esta sesión, aunque haya rotado
+    assert log.export(str(exported)) == 7
+    assert [m["target_id"] for m in json.loads(exported.read_text())] == [f"target_{n}" for n in range(7)]
+    log.close()
+
+
+def test_export_since_mark(ihd, tmp_path):
+    line_size = len(json.dumps(match(0)).encode()) + 1
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), max_bytes=2 * line_size)
+    log.append(match(0))
+    log.append(match(1))
+    mark = log.mark()
+    for n in range(2, 6):
+        log.append(match(n))
+    exported = tmp_path / "export.json"
+    assert log.export(str(exported), since=mark) == 4
+    assert [m["target_id"] for m in json.loads(exported.read_text())] == [f"target_{n}" for n in range(2, 6)]
+
+    # Sin coincidencias nuevas el JSON es una lista vacía válida
+    assert log.export(str(exported), since=log.mark()) == 0
+    assert json.loads(exported.read_text()) == []
+    log.close()
+
+
+def test_backup_count_prunes_oldest_rotations(ihd, tmp_path):
+    (tmp_path / "matches.jsonl.bak").write_text("no es un registro rotado")
+    line_size = len(json.dumps(match(0)).encode()) + 1
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), max_bytes=2 * line_size, backup_count=2)
+    for n in range(10):
+        log.append(match(n))
+    rotated = [path for path in log_files(tmp_path) if path.name not in ("matches.jsonl", "matches.jsonl.bak")]
+    assert len(rotated) == 2
+    # Quedan las rotaciones más recientes; lo borrado ya no se exporta
+    lines = [m["target_id"] for path in rotated for m in read_lines(path)]
+    assert lines == [f"target_{n}" for n in range(4, 8)]
+    exported = tmp_path / "export.json"
+    assert log.export(str(exported)) == 6
+    assert [m["target_id"] for m in json.loads(exported.read_text())] == [f"target_{n}" for n in range(4, 10)]
+    log.close()
+    assert (tmp_path / "matches.jsonl.bak").exists()
+
+
+def test_backup_count_zero_keeps_everything(ihd, tmp_path):
+    line_size = len(json.dumps(match(0)).encode()) + 1
+    log = ihd.MatchLog(str(tmp_path / "matches.jsonl"), max_bytes=line_size, backup_count=0)
+    for n in range(15):
+        log.append(match(n))
+    log.close()
+    assert len(log_files(tmp_path)) == 15
@@ -0,0 +1,153 @@
+"""
+Los índices de hashes objetivo (BK-tree y vectorizado) deben devolver lo mismo
+que comparar la imagen contra cada objetivo, también tras agregar y quitar.
+"""
+import random
+
+import pytest
+
+THRESHOLDS = (0, 4, 10)
+
+
+def linear_scan(ihd, targets, image_hashes, threshold):
+    """Referencia: compara contra cada objetivo como compare_hashes (MD5 y no hexadecimales, exactos)"""
+    results = []
+    for target_id, target_data in targets.items():
+        distances = {}
+        for hash_type in ihd.HASH_TYPES:
+            if hash_type not in image_hashes or hash_type not in target_data["hashes"]:
+                continue
+            image_value, target_value = image_hashes[hash_type], target_data["hashes"][hash_type]
+            parsed_image = ihd.parse_hash(image_value) if hash_type != "md5" else None
+            parsed_target = ihd.parse_hash(target_value) if hash_type != "md5" else None
+            if parsed_image is None or parsed_target is None or parsed_image[1] != parsed_target[1]:
+                if image_value == target_value:
+                    distances[hash_type] = 0
+                continue
+            distance = ihd.hamming_distance(parsed_image[0], parsed_target[0])
+            if distance <= threshold:
+                distances[hash_type] = distance
+        if distances:
+            results.append((target_id, distances))
+    return results
+
+
+def random_target(rng, bases):
+    """Objetivo con hashes cercanos a una base, de 64 y 256 bits, MD5 y valores no hexadecimales"""
+    base = rng.choice(bases)
+    hashes = {"md5": f"{rng.getrandbits(128):032x}"}
+    for hash_type in ("phash", "ahash", "dhash"):
+        value = base[hash_type]
+        for _ in range(rng.randrange(8)):
+            value ^= 1 << rng.randrange(64)
+        hashes[hash_type] = f"{value:016x}"
+    if rng.random() < 0.3:
+        hashes["whash"] = f"{rng.getrandbits(256):064x}"
+    if rng.random() < 0.1:
+        hashes["phash"] = rng.choice(["manual", "zz-no-hex"])
+    if rng.random() < 0.1:
+        hashes["custom"] = "ffff"
+    return {"description": "", "tags": [], "hashes": hashes}
+
+
+def make_queries(ihd, rng, targets, bases, count=150):
+    """Consultas: objetivos con bits cambiados, valores exactos y hashes aleatorios"""
+    queries = []
+    target_list = list(targets.values())
+    for _ in range(count):
+        source = rng.choice(target_list)["hashes"]
+        query = {}
+        for hash_type, value in source.items():
+            parsed = ihd.parse_hash(value) if hash_type not in ("md5", "custom") else None
+            if parsed is not None and parsed[1] == 64:
+                flipped = parsed[0]
+                for _ in range(rng.randrange(12)):
+                    flipped ^= 1 << rng.randrange(64)
+                value = f"{flipped:016x}"
+            query[hash_type] = value
+        queries.append(query)
+    queries.append({"phash": f"{rng.getrandbits(64):016x}", "dhash": f"{rng.choice(bases)['dhash']:016x}"})
+    queries.append({"phash": "manual"})
+    queries.append({"md5": target_list[0]["hashes"]["md5"]})
+    queries.append({})
+    return queries
+
+
+def build_targets(seed, count=300):
+    rng = random.Random(seed)
+    bases = [{t: rng.getrandbits(64) for t in ("phash", "ahash", "dhash")} for _ in range(20)]
+    targets = {f"target_{i}": random_target(rng, bases) for i in range(count)}
+    return rng, bases, targets
+
+
+def assert_same_as_linear(ihd, index, targets, queries):
+    for threshold in THRESHOLDS:
+        expected = [linear_scan(ihd, targets, query, threshold) for query in queries]
+        assert index.query_batch(queries, threshold) == expected
+        assert [index.query(query, threshold) for query in queries[:10]] == expected[:10]
+
+
+def mutate(rng, bases, targets, index):
+    """Quita, reemplaza y agrega objetivos en el índice y en la referencia"""
+    for target_id in rng.sample(list(targets), 60):
+        del targets[target_id]
+        index.remove(target_id)
+    for target_id in rng.sample(list(targets), 30):
+        targets[target_id] = random_target(rng, bases)
+        index.add(target_id, targets[target_id])
+    for i in range(60):
+        target_id = f"new_{i}"
+        targets[target_id] = random_target(rng, bases)
+        index.add(target_id, targets[target_id])
+
+
+@pytest.mark.parametrize("matcher", ["bktree", "vector"])
+def test_matcher_equals_linear_scan(ihd, matcher):
+    rng, bases, targets = build_targets(seed=1)
+    index = ihd.MATCHERS[matcher](targets)
+    queries = make_queries(ihd, rng, targets, bases)
+    assert_same_as_linear(ihd, index, targets, queries)
+
+    mutate(rng, bases, targets, index)
+    queries = make_queries(ihd, rng, targets, bases)
+    assert_same_as_linear(ihd, index, targets, queries)
+
+
+@pytest.mark.parametrize("matcher", ["bktree", "vector"])
+def test_lookup_exact_and_hash_types(ihd, matcher):
+    _, _, targets = build_targets(seed=2, count=50)
+    index = ihd.MATCHERS[matcher](targets)
+    target_id = "target_7"
+    md5 = targets[target_id]["hashes"]["md5"]
+    assert index.lookup_exact("md5", md5) == [target_id]
+    assert index.lookup_exact("md5", "0" * 32) == []
+    # Los tipos no estándar se guardan pero no se indexan
+    assert "custom" not in index.hash_types()
+    index.remove(target_id)
+    assert index.lookup_exact("md5", md5) == []
+
+
+def test_benchmark_checks_against_original_loop(ihd, monkeypatch, capsys):
+    assert ihd.benchmark_matchers(sizes=(200,), queries=8) is True
+
+    class BrokenMatcher(ihd.VectorHashMatcher):
+        def _search(self, tree_key, queries, threshold):
+            return []
+
+    monkeypatch.setitem(ihd.MATCHERS, "vector", BrokenMatcher)
+    assert ihd.benchmark_matchers(sizes=(200,), queries=8) is False
+    assert "vector con 200 objetivos" in capsys.readouterr().out
+
+
+def test_vector_matcher_from_snapshot_equals_linear_scan(ihd, tmp_path):
+    rng, bases, targets = build_targets(seed=3)
+    path = str(tmp_path / "targets.snap")
+    ihd.TargetSnapshot.build(path, targets, [1, 2])
+    snapshot_targets = ihd.SnapshotTargets(ihd.TargetSnapshot(path))
+    index = ihd.VectorHashMatcher.from_targets(snapshot_targets)
+    queries = make_queries(ihd, rng, targets, bases)
+    assert_same_as_linear(ihd, index, targets, queries)
+
+    mutate(rng, bases, targets, index)
+    queries = make_queries(ihd, rng, targets, bases)
+    assert_same_as_linear(ihd, index, targets, queries)
@@ -0,0 +1,101 @@
+"""
+Ida y vuelta de la base de objetivos por el snapshot binario y por SQLite:
+mismos objetivos, mismos tipos de hash (también los no estándar) y mismo orden.
+"""
+import json
+
+import pytest
+
+TARGETS = {
+    "target_1": {"description": "uno", "tags": ["a", "b"], "added_date": "2024-01-01T00:00:00",
+                 "source": "uno.jpg",
+                 "hashes": {"md5": "0123456789abcdef0123456789abcdef", "phash": "00ff00ff00ff00ff",
+                            "ahash": "ffffffff00000000", "dhash": "0f0f0f0f0f0f0f0f", "whash": "1234567890abcdef"}},
+    # MD5 en mayúsculas y pHash corto: no se pueden empaquetar sin cambiar el texto
+    "manual_2": {"description": "manual", "tags": [], "added_date": "2024-01-02T00:00:00", "source": "manual",
+                 "hashes": {"phash": "aaaa", "md5": "ABCDEF"}},
+    # Tipo no estándar en medio, hash de 256 bits y campos extra
+    "target_3": {"description": "raro", "tags": ["x"], "added_date": "2024-01-03T00:00:00", "source": None,
+                 "hashes": {"dhash": "00ff00ff00ff00ff", "sha1": "da39a3ee", "whash": "ab" * 32},
+                 "origin": {"import": "lote.zip"}},
+    "manual_4": {"description": "", "tags": [], "added_date": "2024-01-04T00:00:00", "source": "manual",
+                 "hashes": {"PHash": "1234"}},
+}
+
+
+def assert_identical(loaded, expected):
+    """Igualdad incluyendo el orden de los objetivos y de sus tipos de hash"""
+    assert loaded == expected
+    assert list(loaded) == list(expected)
+    for target_id, target_data in expected.items():
+        assert list(loaded[target_id]["hashes"]) == list(target_data["hashes"])
+
+
+def test_snapshot_round_trip(ihd, tmp_path):
+    path = str(tmp_path / "targets.snap")
+    ihd.TargetSnapshot.build(path, TARGETS, [10, 20])
+    snapshot = ihd.TargetSnapshot(path)
+    targets = ihd.SnapshotTargets(snapshot)
+    assert len(targets) == len(TARGETS)
+    assert "manual_2" in targets and "missing" not in targets
+    assert_identical({target_id: targets[target_id] for target_id in targets}, TARGETS)
+
+
+def test_snapshot_freshness(ihd, tmp_path):
+    path = str(tmp_path / "targets.snap")
+    ihd.TargetSnapshot.build(path, TARGETS, [10, 20])
+    assert ihd.TargetSnapshot.open_if_fresh(path, [10, 20]) is not None
+    assert ihd.TargetSnapshot.open_if_fresh(path, [10, 21]) is None
+    assert ihd.TargetSnapshot.open_if_fresh(str(tmp_path / "missing.snap"), [10, 20]) is None
+
+
+def test_snapshot_targets_materialize_on_write(ihd, tmp_path):
+    path = str(tmp_path / "targets.snap")
+    ihd.TargetSnapshot.build(path, TARGETS, None)
+    targets = ihd.SnapshotTargets(ihd.TargetSnapshot(path))
+    del targets["manual_2"]
+    targets["nuevo"] = {"description": "", "tags": [], "hashes": {"phash": "ffffffffffffffff"}}
+    assert list(targets) == ["target_1", "target_3", "manual_4", "nuevo"]
+    assert targets["target_3"] == TARGETS["target_3"]
+
+
+def test_sqlite_round_trip(ihd, tmp_path):
+    store = ihd.SQLiteTargetStore(str(tmp_path / "targets.db"))
+    try:
+        with store.transaction():
+            for target_id, target_data in TARGETS.items():
+                store.put(target_id, target_data)
+        assert_identical(store.load(), TARGETS)
+
+        store.delete("manual_2")
+        changed = dict(TARGETS["target_1"], tags=["c"], hashes={"phash": "0000000000000000"})
+        store.put("target_1", changed)
+        expected = {"target_1": changed, "target_3": TARGETS["target_3"], "manual_4": TARGETS["manual_4"]}
+        assert_identical(store.load(), expected)
+    finally:
+        store.close()
+
+
+def test_sqlite_transaction_rolls_back(ihd, tmp_path):
+    store = ihd.SQLiteTargetStore(str(tmp_path / "targets.db"))
+    try:
+        store.put("target_1", TARGETS["target_1"])
+        with pytest.raises(RuntimeError):
+            with store.transaction():
+                store.put("manual_2", TARGETS["manual_2"])
+                raise RuntimeError("fallo a mitad del lote")
+        assert list(store.load()) == ["target_1"]
+    finally:
+        store.close()
+
+
+def test_migrate_json_to_sqlite_is_lossless(ihd, tmp_path):
+    json_path = tmp_path / "targets.json"
+    json_path.write_text(json.dumps(TARGETS))
+    sqlite_path = str(tmp_path / "targets.db")
+    assert ihd.migrate_json_to_sqlite(str(json_path), sqlite_path) == len(TARGETS)
+    store = ihd.SQLiteTargetStore(sqlite_path)
+    try:
+        assert_identical(store.load(), TARGETS)
+    finally:
+        store.close()